@@ -10,6 +10,8 @@
 # -----------------------------------------------------------------------------
 
 from ursina import *
+from engine_config import create_app
+from profiler import enable_profiler, profiler_scope
 import math, random, os
 
 # macOS GLSL compatibility tweak (optional, for shader errors)
@@ -19,7 +21,8 @@ if os.uname().sysname == 'Darwin':
 # -----------------------------------------------------------------------------
 # Window / App Setup
 # -----------------------------------------------------------------------------
-app = Ursina()
+app = create_app()
+profiler = enable_profiler(overlay=False)  # F3: per-scope frame timings
 window.title = "SM64 Mini Engine – Ursina Edition"
 window.size = (600, 400)
 window.color = color.rgb(135, 206, 235)
@@ -51,17 +54,18 @@ class LakituCamera(Entity):
             self.pitch -= mouse.velocity[1] * 120
             self.pitch = clamp(self.pitch, self.min_pitch, self.max_pitch)
 
-        # Compute desired position
-        target_pos = self.target.world_position
-        cam_offset = Vec3(
-            math.sin(math.radians(self.yaw)) * self.distance,
-            math.sin(math.radians(self.pitch)) * self.distance * 0.6,
-            math.cos(math.radians(self.yaw)) * self.distance
-        )
-        desired_cam = target_pos + cam_offset
+        with profiler_scope('camera'):
+            # Compute desired position
+            target_pos = self.target.world_position
+            cam_offset = Vec3(
+                math.sin(math.radians(self.yaw)) * self.distance,
+                math.sin(math.radians(self.pitch)) * self.distance * 0.6,
+                math.cos(math.radians(self.yaw)) * self.distance
+            )
+            desired_cam = target_pos + cam_offset
 
-        camera.world_position = lerp(camera.world_position, desired_cam, min(time.dt * self.smooth, 1))
-        camera.look_at(target_pos)
+            camera.world_position = lerp(camera.world_position, desired_cam, min(time.dt * self.smooth, 1))
+            camera.look_at(target_pos)
 
         # Expose yaw for player movement
         try:
@@ -102,18 +106,19 @@ class Mario(Entity):
         wish = self.input_move_dir(cam_yaw)
         self.position += wish * time.dt * 5
 
-        # Simple jump physics
-        if self.grounded and held_keys['space']:
-            self.vel_y = 7
-            self.grounded = False
+        with profiler_scope('physics'):
+            # Simple jump physics
+            if self.grounded and held_keys['space']:
+                self.vel_y = 7
+                self.grounded = False
 
-        self.y += self.vel_y * time.dt
-        self.vel_y -= 18 * time.dt
+            self.y += self.vel_y * time.dt
+            self.vel_y -= 18 * time.dt
 
-        if self.y < 0:
-            self.y = 0
-            self.vel_y = 0
-            self.grounded = True
+            if self.y < 0:
+                self.y = 0
+                self.vel_y = 0
+                self.grounded = True
 
 # -----------------------------------------------------------------------------
 # Scene Setup
@@ -1,19 +1,29 @@
 from ursina import *  # Import Ursina engine classes and functions
+from engine_config import create_app
+from texture_cache import load_cached_texture  # textures with prebuilt mipmaps
+from profiler import enable_profiler, profiler_scope
+from static_batching import bake_static
+from character_controller import CapsuleController
 
 # Constants for easy tuning
 MOVE_SPEED = 5      # horizontal movement speed
 JUMP_SPEED = 8      # jump impulse strength
 GRAVITY    = 15     # gravity strength (units per second^2)
+PLAYER_RADIUS = 0.4 # collision capsule around the 1x1x1 player cube
+STEP_HEIGHT = 0.3   # ledges up to this high are walked up
+MAX_SLOPE  = 45     # degrees; steeper surfaces are walls
 
 class Player(Entity):
-    def __init__(self, **kwargs):
+    def __init__(self, level, **kwargs):
         super().__init__(
             model='cube',
             color=color.orange,
             scale=(1,1,1),
             origin_y=-0.5,    # origin at base of the cube (feet level)
-            collider='box',   # add a box collider fitting the model
             **kwargs)
+        # Swept capsule against the level's triangles (level: bvh.MeshBVH in world space)
+        self.controller = CapsuleController(level, radius=PLAYER_RADIUS, height=self.scale_y,
+                                            step_height=STEP_HEIGHT, max_slope=MAX_SLOPE)
         # Movement attributes
         self.move_speed = MOVE_SPEED
         self.jump_speed = JUMP_SPEED
@@ -22,47 +32,31 @@ class Player(Entity):
         self.grounded = False  # whether player is on the ground
 
     def update(self):
-        # --- Horizontal Movement ---
-        direction = Vec3(
-            self.forward * (held_keys['w'] - held_keys['s']) + 
-            self.right   * (held_keys['d'] - held_keys['a'])
-        ).normalized()  # calculate direction vector from WASD input
+        with profiler_scope('physics'):  # capsule sweep against the level BVH, shown in the F3 overlay
+            # --- Horizontal Movement ---
+            direction = Vec3(
+                self.forward * (held_keys['w'] - held_keys['s']) + 
+                self.right   * (held_keys['d'] - held_keys['a'])
+            )
+            direction.y = 0  # the tilt below pitches forward/right, but walking stays level
+            direction = direction.normalized()  # calculate direction vector from WASD input
 
-        if direction.length() > 0:
-            # Check for wall/obstacle in the direction of movement
-            hit_info = raycast(self.position + self.up * 0.5, direction, 
-                               ignore=(self,), distance=0.5)
-            if not hit_info.hit:
-                # Move the player if no obstacle hit
-                self.position += direction * self.move_speed * time.dt
+            # --- Vertical Movement (Jumping/Gravity) ---
+            # If on ground, allow jumping
+            if self.grounded and held_keys['space']:
+                self.velocity_y = self.jump_speed
 
-        # --- Vertical Movement (Jumping/Gravity) ---
-        # If on ground, allow jumping
-        if self.grounded and held_keys['space']:
-            self.velocity_y = self.jump_speed
-            self.grounded = False
+            # Apply gravity always
+            self.velocity_y -= self.gravity * time.dt
 
-        # Apply gravity always
-        self.velocity_y -= self.gravity * time.dt
-        # Move vertically
-        self.y += self.velocity_y * time.dt
-
-        # Collision check below (raycast downwards)
-        # Start a bit above the player's base to avoid self-collision
-        ray_origin = self.position + (0, 0.1, 0)
-        ground_hit = raycast(ray_origin, Vec3(0, -1, 0), ignore=(self,))
-        if ground_hit.hit:
-            # If falling and hit ground (or platform)
-            if self.velocity_y < 0:
-                # Land on the ground/platform
-                self.grounded = True
+            # Sweep the capsule along the whole move: it slides along walls, steps up
+            # low ledges, lands on (rotated) ground and can't tunnel at any speed
+            move = direction * self.move_speed * time.dt + Vec3(0, self.velocity_y * time.dt, 0)
+            result = self.controller.move(self.position, move)
+            self.position = Vec3(*result.position)
+            self.grounded = result.grounded
+            if self.grounded or (result.hit_ceiling and self.velocity_y > 0):
                 self.velocity_y = 0
-                # Align player's feet with the top of the ground/platform
-                self.y = ground_hit.entity.world_y + ground_hit.entity.scale_y * 0.5
-
-        else:
-            # No ground directly below -> in air
-            self.grounded = False
 
         # --- Basic "Animation" ---
         # Tilt forward when moving, upright when stopped
@@ -75,23 +69,28 @@ class Player(Entity):
             self.rotation_x = clamp(self.velocity_y * 5, -30, 30)  # tilt forward/backward in air
 
 # Initialize the Ursina app
-app = Ursina()
+app = create_app()
+profiler = enable_profiler(overlay=False)  # F3: per-scope frame timings
 
 # Set up the environment
 # Ground (large platform)
-ground = Entity(model='cube', color=color.green, texture='white_cube', 
-                scale=(20, 1, 20), position=(0,0,0), origin_y=-0.5, collider='box')
+ground = Entity(model='cube', color=color.green, texture=load_cached_texture('white_cube'), 
+                scale=(20, 1, 20), position=(0,0,0), origin_y=-0.5)
 # Some floating platforms
-platform1 = Entity(model='cube', color=color.gray, texture='white_cube',
-                   scale=(3, 1, 3), position=(4, 2, 0), origin_y=-0.5, collider='box')
-platform2 = Entity(model='cube', color=color.gray, texture='white_cube',
-                   scale=(3, 1, 3), position=(8, 4, 0), origin_y=-0.5, collider='box')
+platform1 = Entity(model='cube', color=color.gray, texture=load_cached_texture('white_cube'),
+                   scale=(3, 1, 3), position=(4, 2, 0), origin_y=-0.5)
+platform2 = Entity(model='cube', color=color.gray, texture=load_cached_texture('white_cube'),
+                   scale=(3, 1, 3), position=(8, 4, 0), origin_y=-0.5)
 # An obstacle (wall or pillar)
-obstacle = Entity(model='cube', color=color.red, texture='white_cube',
-                  scale=(1, 3, 1), position=(0, 1.5, 5), origin_y=-0.5, collider='box')
+obstacle = Entity(model='cube', color=color.red, texture=load_cached_texture('white_cube'),
+                  scale=(1, 3, 1), position=(0, 1.5, 5), origin_y=-0.5)
+
+# The level never moves: bake it into one mesh per material and one BVH over its triangles
+level_pieces = [ground, platform1, platform2, obstacle]
+level = bake_static(level_pieces, collision=level_pieces)
 
 # Create the player
-player = Player(position=(0, 1, 0))  # start slightly above ground at center
+player = Player(level.bvh, position=(0, 1, 0))  # start on the ground at center
 
 # Camera setup: third-person view
 camera.parent = player    # make the camera follow the player
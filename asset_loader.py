@@ -0,0 +1,252 @@
+# asset_loader.py - Background model/texture loading with placeholder swap
+#
+# Loading an OBJ or decoding a PNG on the main thread stalls the window until
+# it's done, so a scene with a few large assets shows nothing for seconds.
+# AssetLoader runs the slow part (file reading, parsing, image decode, building
+# the unattached GeomNode/Texture) on worker threads and hands the result back
+# to the main thread, where it is attached to the scene:
+#   * requests return an AssetHandle immediately; the entity keeps its
+#     placeholder model/texture until the handle is ready,
+#   * pending requests run highest priority first and can be re-prioritized,
+#   * handles can be cancelled (pending ones never start; running ones are
+#     discarded when they finish),
+#   * at most max_workers loads run at once, and at most finalize_budget_ms
+#     per frame is spent attaching finished assets.
+#
+# Usage:
+#   from asset_loader import get_asset_loader
+#   asset_loader = get_asset_loader()
+#   head = Entity(model='cube', color=color.yellow)          # placeholder
+#   handle = asset_loader.load_model(head, 'marioshead.obj', priority=10,
+#                                    on_ready=lambda e: setattr(e, 'color', color.white))
+#   asset_loader.load_texture(head, 'marioshead_diffuse.png')
+#   handle.cancel()                                          # if no longer needed
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from panda3d.core import Filename
+from ursina import Entity, application
+
+from texture_cache import cached_panda_texture, wrap_texture
+
+MAX_WORKERS = 2
+FINALIZE_BUDGET_MS = 4.0
+
+PENDING, LOADING, READY, FAILED, CANCELLED = 'pending', 'loading', 'ready', 'failed', 'cancelled'
+
+
+class AssetHandle:
+    """Result slot for one request; state moves pending -> loading -> ready/failed/cancelled."""
+
+    def __init__(self, loader, name: str, load: Callable, apply: Optional[Callable], priority: float,
+                 on_ready: Optional[Callable], on_error: Optional[Callable]):
+        self.loader = loader
+        self.name = name
+        self.state = PENDING
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self._load = load
+        self._apply = apply
+        self._priority = priority
+        self._on_ready = on_ready
+        self._on_error = on_error
+
+    @property
+    def done(self) -> bool:
+        return self.state in (READY, FAILED, CANCELLED)
+
+    @property
+    def priority(self) -> float:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: float):
+        self._priority = value
+        if self.state == PENDING:
+            self.loader._push(self)
+
+    def cancel(self):
+        if not self.done:
+            self.state = CANCELLED
+
+    def __repr__(self):
+        return f'AssetHandle({self.name!r}, {self.state})'
+
+
+class AssetLoader(Entity):
+    """Owns the worker threads; an Entity so finished loads get attached once per frame."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, finalize_budget_ms: float = FINALIZE_BUDGET_MS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_workers = max_workers
+        self.finalize_budget_ms = finalize_budget_ms
+        self._heap = []                      # (-priority, sequence, handle)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._finished = queue.SimpleQueue()
+        self._workers = []
+        self._stopping = False
+
+    # === Requests ===
+
+    def submit(self, name: str, load: Callable, apply: Optional[Callable] = None, priority: float = 0,
+               on_ready: Optional[Callable] = None, on_error: Optional[Callable] = None) -> AssetHandle:
+        """Run load() on a worker, then apply(result) and on_ready(result) on the main thread."""
+        handle = AssetHandle(self, name, load, apply, priority, on_ready, on_error)
+        self._push(handle)
+        return handle
+
+    def _push(self, handle: AssetHandle):
+        # re-prioritizing pushes another entry; stale entries are skipped when popped
+        with self._lock:
+            heapq.heappush(self._heap, (-handle.priority, next(self._sequence), handle))
+            if len(self._workers) < self.max_workers and len(self._workers) < len(self._heap):
+                worker = threading.Thread(target=self._work, name=f'asset-loader-{len(self._workers)}', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._wake.notify()
+
+    def _next(self) -> Optional[AssetHandle]:
+        with self._lock:
+            while not self._stopping:
+                while self._heap:
+                    neg_priority, _, handle = heapq.heappop(self._heap)
+                    if handle.state == PENDING and -neg_priority == handle.priority:
+                        handle.state = LOADING
+                        return handle
+                self._wake.wait()
+            return None
+
+    def _work(self):
+        while True:
+            handle = self._next()
+            if handle is None:
+                return
+            try:
+                result, error = handle._load(), None
+            except Exception as e:
+                result, error = None, e
+            self._finished.put((handle, result, error))
+
+    # === Main thread ===
+
+    def update(self):
+        deadline = time.perf_counter() + self.finalize_budget_ms / 1000
+        while time.perf_counter() < deadline:
+            try:
+                handle, result, error = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            self._finalize(handle, result, error)
+
+    def _finalize(self, handle: AssetHandle, result, error):
+        if handle.state == CANCELLED:
+            return
+        if error is None and handle._apply is not None:
+            try:
+                handle._apply(result)
+            except Exception as e:
+                error = e
+        if error is not None:
+            handle.state, handle.error = FAILED, error
+            if handle._on_error:
+                handle._on_error(error)
+            else:
+                print(f'[asset_loader] failed to load {handle.name}: {error}')
+            return
+        handle.state, handle.result = READY, result
+        if handle._on_ready:
+            handle._on_ready(result)
+
+    def wait(self, *handles: AssetHandle, timeout: Optional[float] = None):
+        """Block until the handles are done (finalizing on this thread); for tools and tests."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not all(h.done for h in handles):
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                self._finalize(*self._finished.get(timeout=remaining))
+            except queue.Empty:
+                return False
+        return True
+
+    def on_destroy(self):
+        with self._lock:
+            self._stopping = True
+            for _, _, handle in self._heap:
+                handle.cancel()
+            self._heap.clear()
+            self._wake.notify_all()
+
+    # === Models and textures ===
+
+    def load_model(self, entity: Entity, path, priority: float = 0,
+                   on_ready: Optional[Callable] = None, on_error: Optional[Callable] = None) -> AssetHandle:
+        """Replace entity.model with the model at path once it's loaded; on_ready gets the entity."""
+        path = _resolve(path)
+
+        def load():
+            if path.suffix.lower() == '.obj':
+                from obj_loader import load_obj_model
+                return load_obj_model(path)
+            from panda3d.core import Loader, NodePath
+            node = Loader.get_global_ptr().load_sync(Filename.from_os_specific(str(path)))
+            if node is None:
+                raise FileNotFoundError(path)
+            return NodePath(node)
+
+        def apply(model):
+            if entity:
+                entity.model = model
+
+        return self.submit(path.name, load, apply, priority,
+                           on_ready=on_ready and (lambda _: on_ready(entity)), on_error=on_error)
+
+    def load_texture(self, entity: Entity, path, priority: float = 0, compression: Optional[str] = None,
+                     filtering='mipmap', on_ready: Optional[Callable] = None,
+                     on_error: Optional[Callable] = None) -> AssetHandle:
+        """Replace entity.texture with the image at path once it's loaded; on_ready gets the entity.
+
+        Goes through texture_cache, so after the first run this only reads the
+        prebuilt .txo (mips included) instead of decoding the image.
+        """
+        path = _resolve(path)
+
+        def load():
+            if not path.is_file():
+                raise FileNotFoundError(path)
+            return cached_panda_texture(path, compression)
+
+        def apply(texture):
+            if entity:
+                entity.texture = wrap_texture(texture, path, filtering)
+
+        return self.submit(path.name, load, apply, priority,
+                           on_ready=on_ready and (lambda _: on_ready(entity)), on_error=on_error)
+
+
+def _resolve(path) -> Path:
+    """Relative names are looked up in the asset folder, like Ursina's own loaders."""
+    path = Path(path)
+    if not path.is_absolute() and not path.exists():
+        path = Path(application.asset_folder) / path
+    return path
+
+
+_asset_loader: Optional[AssetLoader] = None
+
+
+def get_asset_loader() -> AssetLoader:
+    """The shared loader, created on first use (after the Ursina app exists)."""
+    global _asset_loader
+    if _asset_loader is None:
+        _asset_loader = AssetLoader()
+    return _asset_loader
@@ -0,0 +1,90 @@
+# benchmark_profiles.py - Compare engine profiles on the same scene
+#
+# Runs an entry script once per engine profile (engine_config.py), each in its
+# own process because PRC settings only take effect before the window opens.
+# The script must create its app with create_app(); in benchmark mode that app
+# renders `warmup` untimed frames, then `frames` timed ones, reports the frame
+# times and the profiler's per-scope percentiles, and exits.
+#
+# Usage:
+#   python benchmark_profiles.py                       # gamev0.py, every profile
+#   python benchmark_profiles.py enginev0.py --profiles balanced,low-latency --frames 600
+#   python benchmark_profiles.py gamev0.py --offscreen --csv results.csv
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from engine_config import BENCHMARK_ENV, BENCHMARK_MARKER, BENCHMARK_OFFSCREEN_ENV, PROFILE_ENV, PROFILES
+
+
+def run_profile(script: Path, profile: str, frames: int, warmup: int, offscreen: bool, timeout: float):
+    env = dict(os.environ, **{PROFILE_ENV: profile, BENCHMARK_ENV: f'{frames},{warmup}'})
+    if offscreen:
+        env[BENCHMARK_OFFSCREEN_ENV] = '1'
+    proc = subprocess.run([sys.executable, script.name], cwd=script.parent, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    for line in proc.stdout.splitlines():
+        if line.startswith(BENCHMARK_MARKER):
+            return json.loads(line[len(BENCHMARK_MARKER):])
+    tail = '\n'.join((proc.stderr or proc.stdout).strip().splitlines()[-5:])
+    print(f'[{profile}] no result (exit code {proc.returncode}):\n{tail}')
+    return None
+
+
+def summarize(result) -> dict:
+    frame_ms = np.array(result['frame_ms'])
+    render = result['scopes'].get('render submit', {})
+    return {
+        'profile': result['profile'],
+        'fps': 1000 / frame_ms.mean(),
+        'p50_ms': np.percentile(frame_ms, 50),
+        'p90_ms': np.percentile(frame_ms, 90),
+        'p99_ms': np.percentile(frame_ms, 99),
+        'max_ms': frame_ms.max(),
+        'render_p50_ms': render.get('p50', float('nan')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare engine profiles on one scene.')
+    parser.add_argument('script', nargs='?', default='gamev0.py')
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--offscreen', action='store_true', help='render to an offscreen buffer')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--csv', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    script = Path(args.script).resolve()
+    rows = []
+    for profile in args.profiles.split(','):
+        print(f'running {script.name} with profile {profile} ...', flush=True)
+        result = run_profile(script, profile, args.frames, args.warmup, args.offscreen, args.timeout)
+        if result:
+            rows.append(summarize(result))
+
+    if not rows:
+        return 1
+    columns = list(rows[0])
+    print()
+    print(f'{columns[0]:<14}' + ''.join(f'{c:>15}' for c in columns[1:]))
+    for row in rows:
+        print(f'{row["profile"]:<14}' + ''.join(f'{row[c]:15.2f}' for c in columns[1:]))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
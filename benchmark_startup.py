@@ -0,0 +1,120 @@
+# benchmark_startup.py - Time from launch to the first rendered frame, per entry script
+#
+# Runs each entry script several times, each in a fresh process. The script
+# must create its app with create_app(); in startup mode (engine_config.py)
+# app.run() renders one frame, reports how long each startup phase took and
+# exits:
+#   imports      interpreter start and every import before create_app()
+#   app_init     Ursina() and opening the window
+#   scene_build  the script's own setup until app.run()
+#   first_frame  rendering the first frame (shader compiles land here)
+# The table shows the mean of each phase over the runs; `wall` is the whole
+# process as the parent sees it, including shutdown.
+# With --importtime the slowest imports of the last run are listed as well
+# (python -X importtime).
+#
+# Usage:
+#   python benchmark_startup.py                          # launcher.py and the entry scripts
+#   python benchmark_startup.py launcher.py gamev0.py --runs 10 --offscreen
+#   python benchmark_startup.py titlev1.py --importtime --csv startup.csv
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from engine_config import BENCHMARK_OFFSCREEN_ENV, STARTUP_ENV, STARTUP_MARKER
+
+DEFAULT_SCRIPTS = ('launcher.py', 'gamev0.py', 'titlev1.py', 'enginev0.py')
+PHASES = ('imports', 'app_init', 'scene_build', 'first_frame', 'total', 'wall')
+
+
+def run_once(script: Path, offscreen: bool, importtime: bool, timeout: float):
+    env = dict(os.environ)
+    if offscreen:
+        env[BENCHMARK_OFFSCREEN_ENV] = '1'
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [script.name]
+    start = time.time_ns()
+    env[STARTUP_ENV] = str(start)
+    proc = subprocess.run(command, cwd=script.parent, env=env, capture_output=True, text=True, timeout=timeout)
+    wall = (time.time_ns() - start) / 1e6
+    for line in proc.stdout.splitlines():
+        if line.startswith(STARTUP_MARKER):
+            result = json.loads(line[len(STARTUP_MARKER):])
+            result['wall'] = wall
+            return result, proc.stderr
+    tail = '\n'.join((proc.stderr or proc.stdout).strip().splitlines()[-5:])
+    print(f'[{script.name}] no result (exit code {proc.returncode}):\n{tail}')
+    return None, proc.stderr
+
+
+def slowest_imports(stderr: str, count: int):
+    """(cumulative ms, module) of the slowest top-level imports in -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue            # the header line
+        name = fields[2].rstrip()
+        if name.startswith(' ') and not name.startswith('  '):
+            imports.append((int(fields[1]) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time to first frame of entry scripts.')
+    parser.add_argument('scripts', nargs='*', default=DEFAULT_SCRIPTS)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--offscreen', action='store_true', help='render to an offscreen buffer')
+    parser.add_argument('--importtime', action='store_true', help='list the slowest imports of each script')
+    parser.add_argument('--top', type=int, default=10, help='how many imports --importtime lists')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--csv', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.scripts:
+        script = Path(name).resolve()
+        print(f'running {script.name} x{args.runs} ...', flush=True)
+        results, stderr = [], ''
+        for _ in range(args.runs):
+            result, stderr = run_once(script, args.offscreen, args.importtime, args.timeout)
+            if result:
+                results.append(result)
+        if not results:
+            continue
+        row = {'script': script.name}
+        for phase in PHASES:
+            row[f'{phase}_ms'] = np.mean([r[phase] for r in results])
+        row['total_p50_ms'] = np.median([r['total'] for r in results])
+        row['modules'] = float(np.mean([r['modules'] for r in results]))
+        rows.append(row)
+        if args.importtime:
+            for ms, module in slowest_imports(stderr, args.top):
+                print(f'    {ms:9.1f} ms  {module}')
+
+    if not rows:
+        return 1
+    columns = list(rows[0])
+    print()
+    print(f'{columns[0]:<20}' + ''.join(f'{c:>15}' for c in columns[1:]))
+    for row in rows:
+        print(f'{row["script"]:<20}' + ''.join(f'{row[c]:15.1f}' for c in columns[1:]))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+# bvh.py - Bounding volume hierarchy over triangle meshes (NumPy only)
+#
+# MeshBVH is built once per mesh with binned SAH splits. The build, the refit
+# and the queries all work on whole levels of the tree at a time with NumPy,
+# so there is no per-node or per-triangle Python loop:
+#   * ray queries return the nearest hit (distance, triangle, point, normal),
+#   * sphere queries return the triangles touching a sphere together with the
+#     closest point on each of them,
+#   * refit() updates the node bounds after the vertices moved (deformation)
+#     without rebuilding the tree.
+#
+# Nothing here depends on Ursina, so headless code (physics, tests, tools) can
+# use it directly; bvh_collider.py plugs it into Ursina entities.
+#
+# Usage:
+#   bvh = MeshBVH(positions, triangles)         # (N, 3) floats, (T, 3) ints
+#   hit = bvh.raycast(origin, direction, max_distance=100)
+#   if hit: print(hit.distance, hit.triangle, hit.point)
+#   contacts = bvh.sphere_query(center, radius)
+#   bvh.refit(new_positions)
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+LEAF_SIZE = 4          # nodes with this many triangles or fewer are always leaves
+MAX_LEAF_SIZE = 16     # SAH may keep up to this many triangles in a leaf if splitting costs more
+SAH_BINS = 16
+TRAVERSAL_COST = 1.0   # SAH cost of visiting a node, relative to one triangle test
+
+
+@dataclass
+class RayHit:
+    distance: float
+    triangle: int
+    point: np.ndarray
+    normal: np.ndarray
+
+
+@dataclass
+class SphereContacts:
+    triangles: np.ndarray        # (K,) triangle indices touching the sphere
+    points: np.ndarray           # (K, 3) closest point on each triangle to the center
+    distances: np.ndarray        # (K,) distance from the center to that point
+
+
+def _area(bmin, bmax):
+    """Half surface area of boxes; empty boxes (min > max) count as 0."""
+    d = np.maximum(bmax - bmin, 0)
+    return d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0]
+
+
+def _segment_positions(starts, counts):
+    """Concatenate arange(start, start + count) for every segment."""
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    return np.arange(total) - np.repeat(offsets - starts, counts), offsets
+
+
+class MeshBVH:
+    def __init__(self, positions, triangles, leaf_size: int = LEAF_SIZE,
+                 max_leaf_size: int = MAX_LEAF_SIZE, bins: int = SAH_BINS):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int64).reshape(-1, 3)
+        if not len(self.triangles):
+            raise ValueError('MeshBVH: no triangles to build a tree over')
+        self.leaf_size = leaf_size
+        self.max_leaf_size = max(max_leaf_size, leaf_size)
+        self.bins = bins
+        self._build()
+
+    # === Build ===
+
+    def _triangle_bounds(self):
+        p = self.positions[self.triangles]          # (T, 3 corners, 3)
+        return p.min(axis=1), p.max(axis=1)
+
+    def _build(self):
+        tri_min, tri_max = self._triangle_bounds()
+        centroids = (tri_min + tri_max) * 0.5
+        T = len(self.triangles)
+        B = self.bins
+
+        self.order = np.arange(T)        # triangle indices, each leaf owns a contiguous range
+        node_min, node_max, node_left, node_start, node_count = [], [], [], [], []
+        self.levels = []                 # node indices per depth, root first
+
+        # nodes of the current level: global index, start in order, triangle count
+        level_nodes = np.array([0])
+        level_start = np.array([0])
+        level_count = np.array([T])
+        node_total = 1
+
+        while len(level_nodes):
+            self.levels.append(level_nodes)
+            pos, offsets = _segment_positions(level_start, level_count)
+            tris = self.order[pos]
+            n = len(level_nodes)
+
+            bmin = np.minimum.reduceat(tri_min[tris], offsets)
+            bmax = np.maximum.reduceat(tri_max[tris], offsets)
+            cmin = np.minimum.reduceat(centroids[tris], offsets)
+            cmax = np.maximum.reduceat(centroids[tris], offsets)
+            node_min.append(bmin)
+            node_max.append(bmax)
+            node_start.append(level_start)
+
+            # binned SAH on all three axes at once
+            local = np.repeat(np.arange(n), level_count)
+            extent = cmax - cmin
+            safe_extent = np.where(extent > 0, extent, 1)
+            bin_ids = ((centroids[tris] - cmin[local]) / safe_extent[local] * B).astype(np.int64)
+            bin_ids = np.clip(bin_ids, 0, B - 1)
+
+            best_cost = np.full(n, np.inf)
+            best_axis = np.zeros(n, np.int64)
+            best_split = np.zeros(n, np.int64)
+            for axis in range(3):
+                key = local * B + bin_ids[:, axis]
+                counts = np.bincount(key, minlength=n * B).reshape(n, B)
+                # per-bin bounds: sort by bin once and reduce the non-empty runs
+                sort = np.argsort(key, kind='stable')
+                used = np.flatnonzero(counts.reshape(-1))
+                runs = np.cumsum(counts.reshape(-1))[used] - counts.reshape(-1)[used]
+                bin_min = np.full((n * B, 3), np.inf)
+                bin_max = np.full((n * B, 3), -np.inf)
+                bin_min[used] = np.minimum.reduceat(tri_min[tris[sort]], runs)
+                bin_max[used] = np.maximum.reduceat(tri_max[tris[sort]], runs)
+                bin_min = bin_min.reshape(n, B, 3)
+                bin_max = bin_max.reshape(n, B, 3)
+
+                left_n = np.cumsum(counts, axis=1)[:, :-1]
+                right_n = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1][:, 1:]
+                left_area = _area(np.minimum.accumulate(bin_min, axis=1),
+                                  np.maximum.accumulate(bin_max, axis=1))[:, :-1]
+                right_area = _area(np.minimum.accumulate(bin_min[:, ::-1], axis=1)[:, ::-1],
+                                   np.maximum.accumulate(bin_max[:, ::-1], axis=1)[:, ::-1])[:, 1:]
+                cost = left_n * left_area + right_n * right_area
+                cost[(left_n == 0) | (right_n == 0)] = np.inf
+                cost[extent[:, axis] <= 0] = np.inf
+
+                split = np.argmin(cost, axis=1)
+                axis_cost = cost[np.arange(n), split]
+                better = axis_cost < best_cost
+                best_cost[better] = axis_cost[better]
+                best_axis[better] = axis
+                best_split[better] = split[better]
+
+            node_area = _area(bmin, bmax)
+            safe_area = np.where(node_area > 0, node_area, 1)
+            split_cost = TRAVERSAL_COST + best_cost / safe_area
+            leaf_cost = level_count.astype(np.float64)
+            is_leaf = (level_count <= self.leaf_size) | (
+                (level_count <= self.max_leaf_size) & (split_cost >= leaf_cost))
+            # identical centroids cannot be binned apart: split those ranges in the middle
+            median_split = ~is_leaf & ~np.isfinite(best_cost)
+
+            # partition every splitting node's range into [left | right]
+            side = bin_ids[np.arange(len(tris)), best_axis[local]] > best_split[local]
+            side[median_split[local]] = (pos - level_start[local] >= level_count[local] // 2)[median_split[local]]
+            side[is_leaf[local]] = False
+            perm = np.argsort(local * 2 + side, kind='stable')
+            self.order[pos] = tris[perm]
+            left_count = np.bincount(local[~side], minlength=n)
+
+            splitting = np.flatnonzero(~is_leaf)
+            left = np.full(n, -1, np.int64)
+            left[splitting] = node_total + 2 * np.arange(len(splitting))
+            node_left.append(left)
+            node_count.append(np.where(is_leaf, level_count, 0))
+            node_total += 2 * len(splitting)
+
+            child_start = np.stack([level_start[splitting], level_start[splitting] + left_count[splitting]], axis=1)
+            child_count = np.stack([left_count[splitting], level_count[splitting] - left_count[splitting]], axis=1)
+            level_nodes = np.stack([left[splitting], left[splitting] + 1], axis=1).reshape(-1)
+            level_start = child_start.reshape(-1)
+            level_count = child_count.reshape(-1)
+
+        # nodes were numbered level by level, so concatenating the levels keeps indices valid
+        self.node_min = np.concatenate(node_min)
+        self.node_max = np.concatenate(node_max)
+        self.node_left = np.concatenate(node_left)
+        self.node_start = np.concatenate(node_start)
+        self.node_count = np.concatenate(node_count)
+
+    def copy(self) -> 'MeshBVH':
+        """Independent copy (e.g. to refit one deformed instance of a shared mesh)."""
+        clone = MeshBVH.__new__(MeshBVH)
+        clone.__dict__.update({k: v.copy() if isinstance(v, np.ndarray) else v
+                               for k, v in self.__dict__.items()})
+        return clone
+
+    @property
+    def node_total(self) -> int:
+        return len(self.node_min)
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    # === Refit ===
+
+    def refit(self, positions=None):
+        """Recompute all node bounds bottom-up for moved vertices (same topology)."""
+        if positions is not None:
+            self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        tri_min, tri_max = self._triangle_bounds()
+
+        leaves = np.flatnonzero(self.node_count > 0)
+        pos, offsets = _segment_positions(self.node_start[leaves], self.node_count[leaves])
+        tris = self.order[pos]
+        self.node_min[leaves] = np.minimum.reduceat(tri_min[tris], offsets)
+        self.node_max[leaves] = np.maximum.reduceat(tri_max[tris], offsets)
+
+        for level in reversed(self.levels):
+            inner = level[self.node_count[level] == 0]
+            if len(inner) == 0:
+                continue
+            left = self.node_left[inner]
+            self.node_min[inner] = np.minimum(self.node_min[left], self.node_min[left + 1])
+            self.node_max[inner] = np.maximum(self.node_max[left], self.node_max[left + 1])
+
+    # === Queries ===
+
+    def _leaf_triangles(self, leaves):
+        pos, _ = _segment_positions(self.node_start[leaves], self.node_count[leaves])
+        return self.order[pos]
+
+    def raycast(self, origin, direction, max_distance: float = np.inf,
+                two_sided: bool = True) -> Optional[RayHit]:
+        """Nearest triangle hit along the ray; distance is in units of |direction|."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_dir = 1.0 / direction
+
+        best_t, best_tri = max_distance, -1
+        frontier = np.array([0])
+        while len(frontier):
+            # slab test on every node of the frontier at once
+            with np.errstate(invalid='ignore'):
+                t0 = (self.node_min[frontier] - origin) * inv_dir
+                t1 = (self.node_max[frontier] - origin) * inv_dir
+            t0 = np.nan_to_num(t0, nan=-np.inf)
+            t1 = np.nan_to_num(t1, nan=np.inf)
+            t_near = np.minimum(t0, t1).max(axis=1)
+            t_far = np.maximum(t0, t1).min(axis=1)
+            frontier = frontier[(t_near <= t_far) & (t_far >= 0) & (t_near <= best_t)]
+
+            is_leaf = self.node_count[frontier] > 0
+            leaves = frontier[is_leaf]
+            if len(leaves):
+                tris = self._leaf_triangles(leaves)
+                t = ray_triangles(origin, direction, self.positions, self.triangles[tris], two_sided)
+                if len(t) and t.min() < best_t:
+                    i = int(np.argmin(t))
+                    best_t, best_tri = float(t[i]), int(tris[i])
+
+            inner = frontier[~is_leaf]
+            left = self.node_left[inner]
+            frontier = np.concatenate([left, left + 1])
+
+        if best_tri < 0:
+            return None
+        a, b, c = self.positions[self.triangles[best_tri]]
+        normal = np.cross(b - a, c - a)
+        normal /= np.linalg.norm(normal) or 1.0
+        if two_sided and np.dot(normal, direction) > 0:
+            normal = -normal
+        return RayHit(best_t, best_tri, origin + direction * best_t, normal)
+
+    def sphere_query(self, center, radius: float) -> SphereContacts:
+        """All triangles within radius of center, with their closest points."""
+        center = np.asarray(center, dtype=np.float64)
+        found = []
+        frontier = np.array([0])
+        while len(frontier):
+            closest = np.clip(center, self.node_min[frontier], self.node_max[frontier])
+            d2 = ((closest - center) ** 2).sum(axis=1)
+            frontier = frontier[d2 <= radius * radius]
+            is_leaf = self.node_count[frontier] > 0
+            if is_leaf.any():
+                found.append(self._leaf_triangles(frontier[is_leaf]))
+            left = self.node_left[frontier[~is_leaf]]
+            frontier = np.concatenate([left, left + 1])
+
+        if not found:
+            return SphereContacts(np.zeros(0, np.int64), np.zeros((0, 3)), np.zeros(0))
+        tris = np.concatenate(found)
+        p = self.positions[self.triangles[tris]]
+        points = closest_points_on_triangles(center, p[:, 0], p[:, 1], p[:, 2])
+        distances = np.linalg.norm(points - center, axis=1)
+        inside = distances <= radius
+        return SphereContacts(tris[inside], points[inside], distances[inside])
+
+    def aabb_query(self, box_min, box_max) -> np.ndarray:
+        """Indices of triangles whose bounds overlap the box (broad phase for sweeps)."""
+        box_min = np.asarray(box_min, dtype=np.float64)
+        box_max = np.asarray(box_max, dtype=np.float64)
+        found = []
+        frontier = np.array([0])
+        while len(frontier):
+            overlap = ((self.node_min[frontier] <= box_max) & (self.node_max[frontier] >= box_min)).all(axis=1)
+            frontier = frontier[overlap]
+            is_leaf = self.node_count[frontier] > 0
+            if is_leaf.any():
+                found.append(self._leaf_triangles(frontier[is_leaf]))
+            left = self.node_left[frontier[~is_leaf]]
+            frontier = np.concatenate([left, left + 1])
+        return np.concatenate(found) if found else np.zeros(0, np.int64)
+
+
+def ray_triangles(origin, direction, positions, triangles, two_sided: bool = True) -> np.ndarray:
+    """Möller-Trumbore against many triangles; returns t per triangle (inf for misses)."""
+    a = positions[triangles[:, 0]]
+    e1 = positions[triangles[:, 1]] - a
+    e2 = positions[triangles[:, 2]] - a
+    pvec = np.cross(direction, e2)
+    det = (e1 * pvec).sum(axis=1)
+    valid = np.abs(det) > 1e-12 if two_sided else det > 1e-12
+    inv_det = 1.0 / np.where(valid, det, 1.0)
+    tvec = origin - a
+    u = (tvec * pvec).sum(axis=1) * inv_det
+    qvec = np.cross(tvec, e1)
+    v = (qvec @ direction) * inv_det
+    t = (e2 * qvec).sum(axis=1) * inv_det
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+def closest_points_on_triangles(p, a, b, c) -> np.ndarray:
+    """Closest point to p on each triangle (a[i], b[i], c[i]); Ericson's region tests, vectorized."""
+    p = np.asarray(p, dtype=np.float64)
+    ab, ac, ap = b - a, c - a, p - a
+    d1 = (ab * ap).sum(axis=1)
+    d2 = (ac * ap).sum(axis=1)
+    bp = p - b
+    d3 = (ab * bp).sum(axis=1)
+    d4 = (ac * bp).sum(axis=1)
+    cp = p - c
+    d5 = (ab * cp).sum(axis=1)
+    d6 = (ac * cp).sum(axis=1)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # inside the face
+        denom = va + vb + vc
+        v = vb / denom
+        w = vc / denom
+        result = a + ab * v[:, None] + ac * w[:, None]
+
+        # edge regions
+        bc_t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        on_bc = (va <= 0) & ((d4 - d3) >= 0) & ((d5 - d6) >= 0)
+        result = np.where(on_bc[:, None], b + (c - b) * bc_t[:, None], result)
+
+        ac_t = d2 / (d2 - d6)
+        on_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result = np.where(on_ac[:, None], a + ac * ac_t[:, None], result)
+
+        ab_t = d1 / (d1 - d3)
+        on_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result = np.where(on_ab[:, None], a + ab * ab_t[:, None], result)
+
+    # vertex regions
+    result = np.where(((d6 >= 0) & (d5 <= d6))[:, None], c, result)
+    result = np.where(((d3 >= 0) & (d4 <= d3))[:, None], b, result)
+    result = np.where(((d1 <= 0) & (d2 <= 0))[:, None], a, result)
+    return result
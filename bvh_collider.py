@@ -0,0 +1,246 @@
+# bvh_collider.py - Exact mesh collision for Ursina entities through a MeshBVH
+#
+# Ursina's 'mesh' collider turns every triangle into a CollisionPolygon, which
+# Panda3D then tests one by one for every ray (mouse picking runs one each
+# frame). BVHCollider instead:
+#   * builds a MeshBVH (bvh.py) once per distinct mesh and shares it between
+#     entities that use the same geometry,
+#   * registers only the mesh's bounding box with Panda3D, so mouse hover and
+#     ursina.raycast stay cheap and still report the entity,
+#   * answers exact ray and sphere queries against the triangles through the
+#     BVH (raycast() / mouse_raycast() below, or the collider's own methods),
+#   * can be refit after the mesh was deformed instead of rebuilt.
+#
+# Usage:
+#   from bvh_collider import BVHCollider, raycast, mouse_raycast
+#   head.collider = BVHCollider(head)              # instead of collider='mesh'
+#   hit = raycast(origin, direction, distance=10)  # exact for BVH colliders
+#   hit = mouse_raycast()                          # exact pick under the cursor
+#   head.model.vertices = new_vertices; head.model.generate()
+#   head.collider.refit()
+#   level = static_bvh([ground, *platforms])       # world space, for character_controller.py
+
+import hashlib
+from typing import Optional
+
+import numpy as np
+from panda3d.core import CollisionBox, GeomEnums, GeomNode, Point2, Point3
+from ursina import Vec3, application, camera, mouse, scene, window
+from ursina.collider import Collider
+from ursina.hit_info import HitInfo
+from ursina.raycast import raycast as ursina_raycast
+
+from bvh import MeshBVH, SphereContacts
+
+_INDEX_TYPES = {
+    GeomEnums.NT_uint8: np.uint8,
+    GeomEnums.NT_uint16: np.uint16,
+    GeomEnums.NT_uint32: np.uint32,
+}
+
+_bvh_cache = {}     # content hash of (positions, triangles) -> MeshBVH
+
+
+def model_geometry(model, relative_to=None):
+    """Positions (N, 3) and triangles (T, 3) of every Geom under model, in relative_to's space."""
+    relative_to = relative_to if relative_to is not None else model
+    geom_nodes = list(model.find_all_matches('**/+GeomNode'))
+    if isinstance(model.node(), GeomNode):
+        geom_nodes.insert(0, model)
+
+    positions, triangles, offset = [], [], 0
+    for node_path in geom_nodes:
+        mat = np.array(node_path.get_mat(relative_to), dtype=np.float64).reshape(4, 4)
+        for geom in node_path.node().get_geoms():
+            geom = geom.decompose()
+            vdata = geom.get_vertex_data()
+            if not vdata.has_column('vertex'):
+                continue
+            vertex = _column_array(vdata, 'vertex')
+            # Panda3D matrices are row-major with row vectors: p' = p @ M
+            vertex = vertex @ mat[:3, :3] + mat[3, :3]
+            for i in range(geom.get_num_primitives()):
+                prim = geom.get_primitive(i)
+                if prim.get_primitive_type() != GeomEnums.PT_polygons:
+                    continue
+                triangles.append(primitive_indices(prim).reshape(-1, 3) + offset)
+            positions.append(vertex)
+            offset += len(vertex)
+
+    if not positions:
+        return np.zeros((0, 3)), np.zeros((0, 3), np.int64)
+    return np.concatenate(positions), np.concatenate(triangles) if triangles else np.zeros((0, 3), np.int64)
+
+
+def _column_array(vdata, name) -> np.ndarray:
+    array_index, column = vdata.get_format().get_array_with(name), vdata.get_format().get_column(name)
+    array = vdata.get_array(array_index)
+    stride = array.get_array_format().get_stride()
+    raw = np.frombuffer(array.get_handle().get_data(), dtype=np.uint8).reshape(-1, stride)
+    dtype = np.float64 if column.get_numeric_type() == GeomEnums.NT_float64 else np.float32
+    width = column.get_num_components() * np.dtype(dtype).itemsize
+    values = raw[:, column.get_start():column.get_start() + width].copy().view(dtype)
+    return values[:, :3].astype(np.float64)
+
+
+def primitive_indices(prim) -> np.ndarray:
+    if not prim.is_indexed():
+        start = prim.get_first_vertex()
+        return np.arange(start, start + prim.get_num_vertices(), dtype=np.int64)
+    dtype = _INDEX_TYPES[prim.get_index_type()]
+    return np.frombuffer(prim.get_vertices().get_handle().get_data(), dtype=dtype).astype(np.int64)
+
+
+def shared_bvh(positions, triangles) -> MeshBVH:
+    """One MeshBVH per distinct geometry; identical meshes reuse the built tree."""
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    triangles = np.ascontiguousarray(triangles, dtype=np.int64)
+    key = hashlib.sha1(positions.tobytes() + b'|' + triangles.tobytes()).hexdigest()
+    bvh = _bvh_cache.get(key)
+    if bvh is None:
+        bvh = _bvh_cache[key] = MeshBVH(positions, triangles)
+    return bvh
+
+
+def static_bvh(entities) -> MeshBVH:
+    """One world space MeshBVH over the models of static entities (level geometry, any rotation or scale)."""
+    positions, triangles, offset = [], [], 0
+    for entity in entities:
+        if entity.model is None:
+            continue
+        p, t = model_geometry(entity.model, scene)
+        positions.append(p)
+        triangles.append(t + offset)
+        offset += len(p)
+    if not offset:
+        raise ValueError('static_bvh: the entities have no geometry')
+    # shared, so a BVHCollider over the same triangles (static_batching.py) reuses the tree
+    return shared_bvh(np.concatenate(positions), np.concatenate(triangles))
+
+
+class BVHCollider(Collider):
+    def __init__(self, entity, mesh=None, positions=None, triangles=None):
+        """Exact triangle collider for entity.
+
+        The geometry comes from positions/triangles (entity space) if given,
+        otherwise from mesh (a model NodePath/Mesh), defaulting to entity.model.
+        """
+        self.entity = entity
+        if positions is None:
+            positions, triangles = model_geometry(mesh if mesh is not None else entity.model, entity)
+        self.bvh = shared_bvh(positions, triangles)
+        self._shared = True
+        super().__init__(entity, self._bounds_box())
+        self.name = 'bvh'
+
+    def _bounds_box(self):
+        # the proxy only has to be hit whenever a triangle could be, so the root bounds suffice
+        bmin, bmax = self.bvh.node_min[0], self.bvh.node_max[0]
+        center = (bmin + bmax) / 2
+        half = np.maximum((bmax - bmin) / 2, 0.001)
+        return CollisionBox(Point3(*center), *half)
+
+    def refit(self, positions=None):
+        """Update the bounds after the mesh deformed (same triangles, moved vertices).
+
+        positions are in entity space; by default they're read back from entity.model.
+        """
+        if positions is None:
+            positions, _ = model_geometry(self.entity.model, self.entity)
+        if self._shared:
+            # the tree may be shared with entities that did not deform: refit a private copy
+            self.bvh = self.bvh.copy()
+            self._shared = False
+        self.bvh.refit(positions)
+        self.node_path.node().set_solid(0, self._bounds_box())
+
+    # === Queries (world space in, HitInfo out) ===
+
+    def raycast(self, origin, direction, distance=9999) -> HitInfo:
+        entity = self.entity
+        direction = Vec3(*direction).normalized()
+        local_origin = entity.get_relative_point(scene, Vec3(*origin))
+        local_direction = entity.get_relative_vector(scene, direction)
+        # with a unit world direction, t along the local direction is the world distance
+        hit = self.bvh.raycast(np.array(local_origin), np.array(local_direction), max_distance=distance)
+        if hit is None:
+            return HitInfo(hit=False, distance=distance)
+
+        point = Vec3(*hit.point)
+        normal = Vec3(*hit.normal)
+        # normals transform by the inverse transpose (row vectors: n' = n @ inv(M)^T); plain
+        # get_relative_vector would tilt them on non-uniformly scaled entities like a 20x1x20 ground
+        mat = np.array(entity.get_mat(scene), dtype=np.float64).reshape(4, 4)
+        world_normal = np.array(normal) @ np.linalg.inv(mat[:3, :3]).T
+        return HitInfo(
+            hit=True,
+            entity=entity,
+            entities=[entity],
+            distance=hit.distance,
+            point=point,
+            world_point=Vec3(*scene.get_relative_point(entity, point)),
+            normal=normal,
+            world_normal=Vec3(*(world_normal / np.linalg.norm(world_normal))),
+        )
+
+    def sphere_query(self, center, radius) -> SphereContacts:
+        """Triangles within radius of a world-space point; the query runs in entity space.
+
+        The radius is converted with the entity's smallest world scale, so it's
+        exact for uniformly scaled entities and conservative otherwise; the
+        returned points and distances are in entity space.
+        """
+        local_center = self.entity.get_relative_point(scene, Vec3(*center))
+        scale = min(abs(s) for s in self.entity.world_scale) or 1
+        return self.bvh.sphere_query(np.array(local_center), radius / scale)
+
+
+def _bvh_colliders(traverse_target, ignore):
+    for entity in list(scene.collidables):
+        collider = getattr(entity, 'collider', None)
+        if not isinstance(collider, BVHCollider) or entity in ignore or not entity.enabled:
+            continue
+        if traverse_target is not scene and traverse_target != entity and not traverse_target.is_ancestor_of(entity):
+            continue
+        yield collider
+
+
+def raycast(origin, direction=(0, 0, 1), distance=9999, traverse_target=scene, ignore: Optional[list] = None) -> HitInfo:
+    """ursina.raycast, with exact triangle hits for entities that use a BVHCollider."""
+    ignore = list(ignore or [])
+    bvh_colliders = list(_bvh_colliders(traverse_target, ignore))
+    hits = [collider.raycast(origin, direction, distance) for collider in bvh_colliders]
+    hits = [hit for hit in hits if hit.hit]
+
+    # everything else goes through Panda3D as usual; the BVH proxies are skipped there
+    other = ursina_raycast(origin, direction, distance=distance, traverse_target=traverse_target,
+                           ignore=ignore + [c.entity for c in bvh_colliders])
+    if other.hit:
+        hits.append(other)
+    if not hits:
+        return HitInfo(hit=False, distance=distance)
+
+    hits.sort(key=lambda hit: hit.distance)
+    nearest = hits[0]
+    entities = [e for hit in hits for e in hit.entities]
+    nearest.entities = sorted(set(entities), key=entities.index)
+    return nearest
+
+
+def mouse_ray():
+    """World space (origin, direction) of the ray through the cursor, or None if the lens can't extrude it."""
+    near, far = Point3(), Point3()
+    lens_point = Point2(mouse.x * 2 / window.aspect_ratio, mouse.y * 2)
+    if not camera.lens.extrude(lens_point, near, far):
+        return None
+    # camera.lens_node is a bare LensNode; the lens is placed in the scene by base.cam (a child of camera)
+    lens = application.base.cam
+    return scene.get_relative_point(lens, near), scene.get_relative_vector(lens, far - near)
+
+
+def mouse_raycast(distance=9999, traverse_target=scene, ignore: Optional[list] = None) -> HitInfo:
+    """Exact raycast through the cursor, from the camera into the scene."""
+    ray = mouse_ray()
+    if ray is None:
+        return HitInfo(hit=False, distance=distance)
+    return raycast(*ray, distance, traverse_target, ignore)
@@ -1,15 +1,17 @@
 # test.py - Procedurally render the Super Mario 64 Render96 title in Ursina
 
 # === 1. Engine and Graphics Configuration (for macOS M1 OpenGL 4.1 core) ===
-from panda3d.core import loadPrcFileData
-# Force OpenGL 4.1 core profile (required for advanced OpenGL on macOS M1)&#8203;:contentReference[oaicite:6]{index=6}
-loadPrcFileData('', 'gl-version 4 1')        # Request OpenGL 4.1 context
-# (Optional performance tweaks: e.g., disable vsync or enable certain Panda3D optimizations if needed)
+# engine_config applies the OpenGL 4.1 core profile request on macOS and the
+# selected performance profile (HACKERPY64_PROFILE) before the window opens.
+from engine_config import create_app
 
-from ursina import Ursina, Mesh, Entity, Shader, color, window, camera
+from ursina import color, window, camera
+from shader_cache import get_shader, precompile_shaders
+from scene_lighting import set_scene_lighting
+from text3d import Text3D, default_font, MAX_INSTANCES
 
 # === 2. Initialize Ursina app ===
-app = Ursina()
+app = create_app()
 window.title = "Render96 Title Demo"        # Window title
 window.fps_counter.enabled = True          # Enable FPS counter display&#8203;:contentReference[oaicite:7]{index=7}
 # window.exit_button.visible = False       # (Optional) Hide window close button if not needed
@@ -72,96 +74,10 @@ letter_colors = {
     '4': color.cyan        # cyan/light-blue
 }
 
-# Now procedurally generate the mesh data (vertices, triangles, normals, colors)
-vertices = []
-triangles = []
-normals = []
-colors = []
-
-# We will build all letters combined, with a small gap between them.
+# Glyph meshes are built once by text3d (from the cells above) and the title is
+# drawn by instancing them, one draw per distinct letter.
+title_font = default_font().extended(letters)
 text = "MARIO64"
-# Calculate total width for centering
-total_width = 0
-for ch in text:
-    total_width += letters[ch][0]
-    if ch != text[-1]:
-        total_width += 1  # gap of 1 unit between letters
-
-# Starting offset so that the whole text is centered at x=0
-offset_x = -total_width / 2.0
-current_x = offset_x
-
-# Helper to add a face (two triangles) given four corner vertex indices
-def add_face(v0, v1, v2, v3, normal_vec):
-    """Add two triangles (v0,v1,v2) and (v0,v2,v3) with a given normal."""
-    start_index = len(vertices)
-    # Add vertices with the same normal
-    vertices.extend([v0, v1, v2, v3])
-    normals.extend([normal_vec, normal_vec, normal_vec, normal_vec])
-    # Use the base color for all four vertices
-    # (Color will be appended outside this function for clarity in code below)
-    # Define triangles (using the indices 0,1,2,3 relative to this face's start_index)
-    triangles.extend([
-        start_index + 0, start_index + 1, start_index + 2,
-        start_index + 0, start_index + 2, start_index + 3
-    ])
-
-# Loop through each letter and construct its faces
-for ch in text:
-    w, h, filled_cells = letters[ch]
-    base_col = letter_colors.get(ch, color.white)
-    # Iterate through each filled cell of the letter
-    for (cx, cy) in filled_cells:
-        # Calculate the 3D coordinates of the cell's corners on the front (z=0) and back (z=depth)
-        # Front-face (toward camera) corners:
-        x0 = current_x + cx
-        x1 = current_x + cx + 1
-        y0 = cy
-        y1 = cy + 1
-        z_front = 0.0
-        z_back  = 0.5  # depth/thickness of letters
-        # Corner positions
-        top_left_front     = (x0, y1, z_front)
-        bottom_left_front  = (x0, y0, z_front)
-        bottom_right_front = (x1, y0, z_front)
-        top_right_front    = (x1, y1, z_front)
-        top_left_back      = (x0, y1, z_back)
-        bottom_left_back   = (x0, y0, z_back)
-        bottom_right_back  = (x1, y0, z_back)
-        top_right_back     = (x1, y1, z_back)
-
-        # Front face (facing camera, normal points -Z outward)
-        add_face(top_left_front, bottom_left_front, bottom_right_front, top_right_front, normal_vec=(0,0,-1))
-        # Back face (facing away from camera, normal +Z)
-        add_face(bottom_left_back, top_left_back, top_right_back, bottom_right_back, normal_vec=(0,0,1))
-        # Left face (if no neighbor to the left of this cell)
-        if (cx-1, cy) not in filled_cells:
-            add_face(top_left_back, bottom_left_back, bottom_left_front, top_left_front, normal_vec=(-1,0,0))
-        # Right face
-        if (cx+1, cy) not in filled_cells:
-            add_face(bottom_right_back, top_right_back, top_right_front, bottom_right_front, normal_vec=(1,0,0))
-        # Bottom face
-        if (cx, cy-1) not in filled_cells:
-            add_face(bottom_left_front, bottom_left_back, bottom_right_back, bottom_right_front, normal_vec=(0,-1,0))
-        # Top face
-        if (cx, cy+1) not in filled_cells:
-            add_face(top_left_back, top_left_front, top_right_front, top_right_back, normal_vec=(0,1,0))
-        # Assign color to the last added vertices (the ones we just added for all faces of this cell)
-        # Each face added 4 vertices; we added 6 faces max (front, back, left, right, bottom, top).
-        # To simplify, we'll append the base color for any new vertex added after adding faces.
-        new_vertices_count = len(vertices) - len(colors)
-        colors.extend([base_col] * new_vertices_count)
-    # Move the current x position to start of next letter (including a 1 unit gap)
-    current_x += w + 1
-
-# Create the Ursina Mesh from the generated data
-title_mesh = Mesh(
-    vertices=vertices,
-    triangles=triangles,
-    normals=normals,
-    colors=colors,
-    static=True  # hint that geometry is not going to change (optimization)
-)
 
 # === 4. Define the custom GLSL shader for lighting (vertex and fragment) ===
 vertex_shader_code = """
@@ -169,6 +85,8 @@ vertex_shader_code = """
 uniform mat4 p3d_ModelViewProjectionMatrix;
 uniform mat4 p3d_ModelViewMatrix;
 uniform mat3 p3d_NormalMatrix;
+uniform vec4 instance_offsets[%d];  // per-letter offset, filled in by Text3D
+uniform vec4 instance_colors[%d];   // per-letter color, filled in by Text3D
 in vec3 vertex;
 in vec3 normal;
 in vec4 color;
@@ -176,15 +94,17 @@ out vec3 v_normal;
 out vec3 v_position_view;
 out vec4 v_color;
 void main() {
+    // Move the shared glyph mesh to this letter's place in the title
+    vec4 position = vec4(vertex + instance_offsets[gl_InstanceID].xyz, 1.0);
     // Transform vertex to clip space
-    gl_Position = p3d_ModelViewProjectionMatrix * vec4(vertex, 1.0);
+    gl_Position = p3d_ModelViewProjectionMatrix * position;
     // Pass transformed normal and position to fragment shader
     v_normal = p3d_NormalMatrix * normal;
-    v_position_view = (p3d_ModelViewMatrix * vec4(vertex, 1.0)).xyz;
-    // Pass through the vertex color
-    v_color = color;
+    v_position_view = (p3d_ModelViewMatrix * position).xyz;
+    // Pass through the vertex color, tinted with the letter color
+    v_color = color * instance_colors[gl_InstanceID];
 }
-"""
+""" % (MAX_INSTANCES, MAX_INSTANCES)
 
 fragment_shader_code = """
 #version 330 core
@@ -222,27 +142,23 @@ void main() {
 }
 """
 
-# Create the Shader object
-custom_shader = Shader(language=Shader.GLSL, vertex=vertex_shader_code, fragment=fragment_shader_code)
+# Get the Shader object from the shared registry (compiled once, binary cached on disk)
+custom_shader = get_shader(vertex=vertex_shader_code, fragment=fragment_shader_code, name='title_shader')
 
-# === 5. Create the Entity for the title using our mesh and shader ===
-title_entity = Entity(model=title_mesh, shader=custom_shader)
+# === 5. Create the Entity for the title using the instanced glyphs and our shader ===
+title_entity = Text3D(text, font=title_font, char_colors=letter_colors, depth=0.5, shader=custom_shader)
 
-# Set up the shader inputs for lighting (these values can be tweaked for different effects)
+# Lighting inputs live once on the scene root and are shared by every entity
+# using the lit shaders (these values can be tweaked for different effects).
 # Directional light: pointing from above and left, towards the title.
-# We provide the direction vector from surface to light.
-light_direction = (-0.2, 0.8, -0.3)  # e.g., light coming from top-left-front
-# Normalize the light direction vector
-from math import sqrt
-Lx,Ly,Lz = light_direction
-length = sqrt(Lx*Lx + Ly*Ly + Lz*Lz)
-light_dir_norm = (Lx/length, Ly/length, Lz/length)
-# Send uniform inputs to the shader for all relevant entities (the title in this case)
-title_entity.set_shader_input("light_dir", light_dir_norm)
-title_entity.set_shader_input("light_color", (1.0, 1.0, 1.0))    # white light
-title_entity.set_shader_input("ambient_color", (0.2, 0.2, 0.2))  # dim white ambient
-title_entity.set_shader_input("spec_color", (1.0, 1.0, 1.0))     # white specular highlight
-title_entity.set_shader_input("shininess", 64)                   # specular shininess factor
+# We provide the direction vector from surface to light (normalized by scene_lighting).
+lighting = set_scene_lighting(
+    light_dir=(-0.2, 0.8, -0.3),   # e.g., light coming from top-left-front
+    light_color=(1.0, 1.0, 1.0),   # white light
+    ambient_color=(0.2, 0.2, 0.2), # dim white ambient
+    spec_color=(1.0, 1.0, 1.0),    # white specular highlight
+    shininess=64,                  # specular shininess factor
+)
 
 # === 6. Position the camera and lighting ===
 # In this example, we manually position the camera to frame the title.
@@ -252,4 +168,5 @@ camera.look_at((0, 2, 0))              # point camera at the center of the title
 # (No explicit DirectionalLight entity used since we pass light to shader directly)
 
 # === 7. Run the app ===
+precompile_shaders()                   # compile now instead of hitching on the first frame
 app.run()
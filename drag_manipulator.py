@@ -0,0 +1,162 @@
+# drag_manipulator.py - Drag entities along analytic planes, spheres and axes under the mouse
+#
+# Dragging by spawning a big invisible Entity with collider='mesh' and
+# reading mouse.world_point creates a collision solid on every drag start and
+# makes the collision traverser test it every frame of the drag. Here the
+# mouse ray (bvh_collider.mouse_ray) is intersected with the constraint's
+# shape directly, so a drag creates no nodes and no colliders:
+#   PlaneConstraint   moves along a plane (e.g. facing the camera)
+#   SphereConstraint  slides around a sphere's center (e.g. along the head's
+#                     surface); missing the sphere uses the closest point
+#                     on its silhouette
+#   AxisConstraint    moves along a line, to its point closest to the ray
+# DragManipulator drags any number of entities together: each keeps its
+# offset from where the drag started. With snap > 0 the drag moves in steps:
+# along the plane's two axes or the line (world units) or, on a sphere,
+# in degrees of rotation.
+#
+# Usage:
+#   from drag_manipulator import DragManipulator, PlaneConstraint
+#   drag = DragManipulator()
+#   drag.begin([eye, nose], PlaneConstraint(eye.world_position, camera.forward))
+#   drag.update(snap=0.05)          # every frame while the button is held
+#   drag.end()
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+from ursina import Entity, Vec3
+
+from bvh_collider import mouse_ray
+
+EPSILON = 1e-9
+
+
+def _unit(v) -> np.ndarray:
+    v = np.asarray(v, dtype=np.float64)
+    return v / np.linalg.norm(v)
+
+
+def _snap(value, step: float):
+    return np.round(value / step) * step if step > 0 else value
+
+
+def _rotate(vectors: np.ndarray, axis: np.ndarray, angle: float) -> np.ndarray:
+    """Rodrigues rotation of (N, 3) vectors around a unit axis."""
+    c, s = np.cos(angle), np.sin(angle)
+    return vectors * c + np.cross(axis, vectors) * s + np.outer(vectors @ axis, axis) * (1 - c)
+
+
+class PlaneConstraint:
+    def __init__(self, point, normal):
+        self.point = np.asarray(point, dtype=np.float64)
+        self.normal = _unit(normal)
+        # two in-plane axes for snapping
+        helper = np.array([0.0, 1.0, 0.0]) if abs(self.normal[1]) < 0.9 else np.array([1.0, 0.0, 0.0])
+        self.u = _unit(np.cross(helper, self.normal))
+        self.v = np.cross(self.normal, self.u)
+
+    def intersect(self, origin, direction) -> Optional[np.ndarray]:
+        facing = direction @ self.normal
+        if abs(facing) < EPSILON:
+            return None
+        t = (self.point - origin) @ self.normal / facing
+        return origin + direction * t if t >= 0 else None
+
+    def move(self, starts: np.ndarray, grab: np.ndarray, hit: np.ndarray, snap: float = 0) -> np.ndarray:
+        delta = hit - grab
+        delta = _snap(delta @ self.u, snap) * self.u + _snap(delta @ self.v, snap) * self.v
+        return starts + delta
+
+
+class AxisConstraint:
+    def __init__(self, point, direction):
+        self.point = np.asarray(point, dtype=np.float64)
+        self.direction = _unit(direction)
+
+    def intersect(self, origin, direction) -> Optional[np.ndarray]:
+        # closest points of two lines: solve for the parameter along the axis
+        b = self.direction @ direction
+        denominator = 1 - b * b
+        if denominator < EPSILON:
+            return None
+        w = self.point - origin
+        s = (b * (direction @ w) - self.direction @ w) / denominator
+        return self.point + self.direction * s
+
+    def move(self, starts: np.ndarray, grab: np.ndarray, hit: np.ndarray, snap: float = 0) -> np.ndarray:
+        return starts + _snap((hit - grab) @ self.direction, snap) * self.direction
+
+
+class SphereConstraint:
+    def __init__(self, center, radius: float):
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = radius
+
+    def intersect(self, origin, direction) -> Optional[np.ndarray]:
+        to_center = self.center - origin
+        along = to_center @ direction
+        closest = origin + direction * along
+        miss = np.linalg.norm(closest - self.center)
+        if miss > self.radius:
+            # off the sphere: the point on its silhouette nearest to the ray
+            return self.center + _unit(closest - self.center) * self.radius
+        t = along - np.sqrt(self.radius ** 2 - miss ** 2)
+        return origin + direction * t if t >= 0 else None
+
+    def move(self, starts: np.ndarray, grab: np.ndarray, hit: np.ndarray, snap: float = 0) -> np.ndarray:
+        """Rotate everything around the center by the rotation taking grab to hit (snap in degrees)."""
+        a, b = _unit(grab - self.center), _unit(hit - self.center)
+        axis = np.cross(a, b)
+        length = np.linalg.norm(axis)
+        if length < EPSILON:
+            return starts.copy()
+        angle = _snap(np.degrees(np.arctan2(length, a @ b)), snap)
+        return self.center + _rotate(starts - self.center, axis / length, np.radians(angle))
+
+
+class DragManipulator:
+    def __init__(self):
+        self.entities: List[Entity] = []
+        self.constraint = None
+        self._starts: Optional[np.ndarray] = None
+        self._grab: Optional[np.ndarray] = None
+
+    @property
+    def dragging(self) -> bool:
+        return self.constraint is not None
+
+    def _mouse_hit(self) -> Optional[np.ndarray]:
+        ray = mouse_ray()
+        if ray is None:
+            return None
+        origin, direction = ray
+        return self.constraint.intersect(np.array(origin, dtype=np.float64), _unit(direction))
+
+    def begin(self, entities: Sequence[Entity], constraint) -> bool:
+        """Start dragging from the point under the mouse; False if the mouse ray misses the constraint."""
+        self.constraint = constraint
+        grab = self._mouse_hit()
+        if grab is None:
+            self.end()
+            return False
+        self.entities = list(entities)
+        self._starts = np.array([tuple(e.world_position) for e in self.entities], dtype=np.float64)
+        self._grab = grab
+        return True
+
+    def update(self, snap: float = 0) -> bool:
+        """Move the entities to follow the mouse; False if nothing moved (not dragging, or the ray missed)."""
+        if not self.dragging:
+            return False
+        hit = self._mouse_hit()
+        if hit is None:
+            return False
+        for entity, position in zip(self.entities, self.constraint.move(self._starts, self._grab, hit, snap)):
+            entity.world_position = Vec3(*position)
+        return True
+
+    def end(self):
+        self.entities = []
+        self.constraint = None
+        self._starts = self._grab = None
@@ -0,0 +1,181 @@
+# engine_config.py - Named engine performance profiles applied before the app starts
+#
+# Panda3D reads most of its tuning knobs (PRC variables) once, when the window
+# and graphics pipe are created, so they have to be set before Ursina(). Every
+# entry script creates its app through create_app(), which applies one of the
+# PROFILES below the same way everywhere:
+#   balanced       vsync on, GL error checks off (the previous enginev0 setup)
+#   low-latency    vsync off and glFinish each frame, so the GPU never queues
+#                  frames behind input
+#   throughput     vsync off, no glFinish, immutable texture storage, render
+#                  while textures are still loading
+#   multithreaded  cull and draw on their own threads (threading-model Cull/Draw)
+#   debug          GL error checks and GL debug output on
+#
+# The profile is picked by create_app(profile=...), else by the
+# HACKERPY64_PROFILE environment variable, else DEFAULT_PROFILE. Keyword
+# arguments a script passes to create_app() still win over the profile.
+# benchmark_profiles.py runs a script once per profile and compares frame times;
+# benchmark_startup.py times how long a script takes to its first frame.
+#
+# Usage:
+#   from engine_config import create_app
+#   app = create_app(development_mode=False)       # instead of Ursina(...)
+#   HACKERPY64_PROFILE=low-latency python enginev0.py
+
+import json
+import os
+import platform
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from panda3d.core import loadPrcFileData
+
+DEFAULT_PROFILE = 'balanced'
+PROFILE_ENV = 'HACKERPY64_PROFILE'
+BENCHMARK_ENV = 'HACKERPY64_BENCHMARK'       # "frames,warmup": set by benchmark_profiles.py
+BENCHMARK_OFFSCREEN_ENV = 'HACKERPY64_BENCHMARK_OFFSCREEN'
+BENCHMARK_MARKER = 'BENCHMARK_RESULT '
+STARTUP_ENV = 'HACKERPY64_STARTUP'           # launch time in time.time_ns(): set by benchmark_startup.py
+STARTUP_MARKER = 'STARTUP_RESULT '
+
+# Applied under every profile
+BASE_PRC = {
+    'gl-force-fbo': 'true',         # offscreen buffers (shadow maps, filters) as FBOs
+    'gl-check-errors': 'false',     # glGetError after every call stalls the driver
+}
+if platform.system() == 'Darwin':
+    # macOS only gives a core profile context (needed for GLSL 3.30+) when asked
+    BASE_PRC['gl-version'] = '4 1'
+
+
+@dataclass
+class EngineProfile:
+    name: str
+    description: str
+    prc: Dict[str, str] = field(default_factory=dict)
+    ursina: Dict[str, object] = field(default_factory=dict)   # Ursina() keyword arguments
+
+
+PROFILES = {profile.name: profile for profile in (
+    EngineProfile('balanced', 'vsync on, GL error checks off',
+                  ursina={'vsync': True}),
+    EngineProfile('low-latency', 'vsync off, glFinish every frame (no queued frames)',
+                  prc={'gl-finish': 'true'},
+                  ursina={'vsync': False}),
+    EngineProfile('throughput', 'vsync off, immutable textures, incomplete render allowed',
+                  prc={'gl-finish': 'false', 'gl-immutable-texture-storage': 'true',
+                       'allow-incomplete-render': 'true'},
+                  ursina={'vsync': False}),
+    EngineProfile('multithreaded', 'cull and draw on separate threads, vsync on',
+                  prc={'threading-model': 'Cull/Draw'},
+                  ursina={'vsync': True}),
+    EngineProfile('debug', 'GL error checks and debug output on',
+                  prc={'gl-check-errors': 'true', 'gl-debug': 'true'},
+                  ursina={'vsync': True}),
+)}
+
+active_profile: Optional[EngineProfile] = None
+
+
+def get_profile(name: Optional[str] = None) -> EngineProfile:
+    name = name or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f'unknown engine profile {name!r}, expected one of {", ".join(PROFILES)}')
+    return PROFILES[name]
+
+
+def apply_profile(name: Optional[str] = None) -> EngineProfile:
+    """Load the profile's PRC settings; must run before the window is created."""
+    global active_profile
+    profile = get_profile(name)
+    for key, value in {**BASE_PRC, **profile.prc}.items():
+        loadPrcFileData(f'engine profile {profile.name}', f'{key} {value}')
+    active_profile = profile
+    return profile
+
+
+def create_app(profile: Optional[str] = None, **kwargs):
+    """Apply an engine profile, then create the Ursina app with its settings (kwargs override)."""
+    create_ns = time.time_ns()
+    profile = apply_profile(profile)
+    from ursina import Ursina
+
+    benchmark = os.environ.get(BENCHMARK_ENV)
+    startup = os.environ.get(STARTUP_ENV)
+    if (benchmark or startup) and os.environ.get(BENCHMARK_OFFSCREEN_ENV):
+        kwargs['window_type'] = 'offscreen'
+    app = Ursina(**{**profile.ursina, **kwargs})
+    if not hasattr(app.win, 'request_properties'):
+        _ignore_window_properties()
+    print(f'[engine_config] profile: {profile.name} ({profile.description})')
+    if benchmark:
+        frames, warmup = (int(v) for v in benchmark.split(','))
+        _install_benchmark(app, profile, frames, warmup)
+    elif startup:
+        _install_startup_probe(app, int(startup), create_ns, time.time_ns())
+    return app
+
+
+def _ignore_window_properties():
+    """Offscreen buffers have no window properties; make window.fullscreen = ... a no-op there.
+
+    Ursina's other window setters already skip outputs without request_properties,
+    so scripts that set up their window (sm64decomppyv0, 1.0hackerv0) run offscreen too.
+    """
+    from ursina import window
+    window_type = type(window)
+
+    def fullscreen(self, value):
+        self._fullscreen = value
+
+    window_type.fullscreen = property(window_type.fullscreen.fget, fullscreen)
+
+
+def _install_benchmark(app, profile: EngineProfile, frames: int, warmup: int):
+    """Replace app.run with a fixed number of timed frames that reports and exits."""
+    from profiler import enable_profiler
+
+    def run(*args, **kwargs):
+        profiler = enable_profiler(overlay=False, history=frames)
+        for _ in range(warmup):
+            app.step()
+        frame_ms = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            app.step()
+            frame_ms.append((time.perf_counter() - start) * 1000)
+        result = {
+            'profile': profile.name,
+            'frames': frames,
+            'frame_ms': frame_ms,
+            'scopes': {name: profiler.percentiles(name) for name in profiler.scope_names},
+        }
+        print(BENCHMARK_MARKER + json.dumps(result), flush=True)
+        app.userExit()
+
+    app.run = run
+
+
+def _install_startup_probe(app, launch_ns: int, create_ns: int, app_ns: int):
+    """Replace app.run with one frame, then report where the startup time went and exit."""
+    import sys
+
+    def run(*args, **kwargs):
+        run_ns = time.time_ns()
+        app.step()
+        frame_ns = time.time_ns()
+        ms = lambda a, b: (b - a) / 1e6
+        result = {
+            'imports': ms(launch_ns, create_ns),       # interpreter start + everything imported before create_app()
+            'app_init': ms(create_ns, app_ns),         # Ursina() and the window
+            'scene_build': ms(app_ns, run_ns),         # the script's own setup until app.run()
+            'first_frame': ms(run_ns, frame_ns),
+            'total': ms(launch_ns, frame_ns),
+            'modules': len(sys.modules),
+        }
+        print(STARTUP_MARKER + json.dumps(result), flush=True)
+        app.userExit()
+
+    app.run = run
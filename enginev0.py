@@ -16,19 +16,13 @@ from panda3d.core import loadPrcFileData
 # Set window title (optional)
 loadPrcFileData('', 'window-title SM64 Mario Head')
 
-# Force OpenGL 4.1 core profile (useful on macOS)
-loadPrcFileData('', 'gl-version 4 1')
-
-# Required for modern GL usage
-loadPrcFileData('', 'gl-force-fbo true')
-
-# Optionally skip OpenGL error checks for performance
-loadPrcFileData('', 'gl-check-errors false')
-
-# (Optional) If you need multi-threaded rendering:
-# loadPrcFileData('', 'threading-model Cull/Draw')
+# OpenGL 4.1 core profile (macOS), FBOs, GL error checks, vsync and threading
+# come from the engine profile; pick one with HACKERPY64_PROFILE, e.g.
+#   HACKERPY64_PROFILE=multithreaded python enginev0.py   (threading-model Cull/Draw)
+# and compare them with: python benchmark_profiles.py enginev0.py
 
 # (Optional) Enable PStats performance monitoring
+# (profiler.py below gives per-scope timings without a PStats server)
 # loadPrcFileData('', 'want-pstats true')
 # loadPrcFileData('', 'pstats-python-profiler true')
 
@@ -40,8 +34,18 @@ loadPrcFileData('', 'gl-check-errors false')
 ##################################
 from ursina import *
 import platform, sys, time
+from engine_config import create_app
+from shader_cache import get_shader, precompile_shaders
+from asset_loader import get_asset_loader
+from screen_lod import LODManager, load_lod_models
+from profiler import enable_profiler
+from gpu_picking import enable_gpu_picking
+from shadow_manager import ShadowManager
+
+app = create_app(development_mode=False)
 
-app = Ursina(vsync=True, development_mode=False)
+# F3 toggles the timing overlay, F4 writes a Chrome trace and a per-frame CSV
+profiler = enable_profiler(overlay=False)
 
 # macOS fix for locked cursor in FirstPerson-like views:
 if platform.system() == 'Darwin':
@@ -52,17 +56,30 @@ if platform.system() == 'Darwin':
 ##################################
 # Provide your own "marioshead.obj" and "marioshead_diffuse.png"
 # If they are named differently, update the lines below.
+# The OBJ is parsed once with NumPy and cached as "marioshead.obj.npmesh";
+# later runs memory-map the cache instead of parsing the text again.
+# Simplified LOD levels (50%, 25%, 10% of the triangles) are built once and
+# cached the same way; lod_manager picks one by the head's size on screen.
+# Both files load on worker threads: a yellow cube stands in for the head
+# (and stays if the files are missing) until the real model is ready.
 
-try:
-    marioshead = Entity(model='marioshead.obj', 
-                        texture='marioshead_diffuse.png', 
-                        scale=1.0)
-    marioshead.position = (0, 0, 0)
-except Exception as e:
-    print("Failed to load marioshead model:", e)
-    # Fallback to a simple cube if Mario’s head is not available
-    marioshead = Entity(model='cube', color=color.yellow, scale=1.0)
-    marioshead.position = (0, 0, 0)
+asset_loader = get_asset_loader()
+lod_manager = LODManager()
+marioshead = Entity(model='cube', color=color.yellow, scale=1.0)
+marioshead.position = (0, 0, 0)
+
+def on_head_loaded(models):
+    marioshead.color = color.white
+    shadows.set_caster_lod(marioshead, models[-1])
+
+def on_head_failed(error):
+    print("Failed to load marioshead model:", error)
+
+asset_loader.submit('marioshead.obj',
+                    load=lambda: load_lod_models(application.asset_folder / 'marioshead.obj'),
+                    apply=lambda models: lod_manager.add(marioshead, models),
+                    priority=10, on_ready=on_head_loaded, on_error=on_head_failed)
+asset_loader.load_texture(marioshead, 'marioshead_diffuse.png', priority=5)
 
 ##################################
 # 4) (Optional) Custom shader
@@ -95,17 +112,21 @@ void main() {
 """
 
 try:
-    marioshead.shader = Shader(
-        language=Shader.GLSL,
+    marioshead.shader = get_shader(
         vertex=vertex_shader_code,
-        fragment=fragment_shader_code
+        fragment=fragment_shader_code,
+        name='marioshead_shader'
     )
 except Exception as err:
     print("Shader compilation error:", err)
     marioshead.shader = None  # Revert to default if shader fails
 
-# If you want collision on the model (for raycasting, clicks, etc.)
-marioshead.collider = 'mesh'
+# Hover and clicks are picked on the GPU (picker.hovered_entity): a few pixels
+# around the cursor are rendered with entity IDs, so the head needs no collider
+# and picking costs the same for the placeholder cube and every LOD of the real mesh.
+# (For ray hits with positions, use bvh_collider.BVHCollider / mouse_raycast.)
+picker = enable_gpu_picking()
+picker.register(marioshead)
 
 ##################################
 # 5) Lighting setup (optional)
@@ -114,6 +135,9 @@ marioshead.collider = 'mesh'
 # shader, you must handle lights yourself. Below is an example directional light.
 directional_light = DirectionalLight(shadows=True)
 directional_light.look_at(marioshead)
+# Fit the shadow map to the head every frame and size it to its screen
+# coverage; once loaded, the shadow pass draws the head's coarsest LOD.
+shadows = ShadowManager(directional_light, casters=[marioshead])
 directional_light.color = color.white
 light_entity = Entity(light=directional_light, 
                       rotation=(45, -45, 45))  # adjust rotation as needed
@@ -130,6 +154,10 @@ def input(key):
     elif key == 'f':
         # Toggle wireframe mode
         marioshead.wireframe = not marioshead.wireframe
+    elif key == 'f4':
+        # Dump the profiler's recorded frames for offline analysis
+        print('wrote', profiler.export_chrome_trace('enginev0_trace.json'),
+              'and', profiler.export_csv('enginev0_frames.csv'))
 
 ##################################
 # 7) Update loop
@@ -144,4 +172,5 @@ window.fps_counter.enabled = True
 ##################################
 # 8) Run the application
 ##################################
+precompile_shaders()  # compile registered shaders up front (cached binaries on later runs)
 app.run()
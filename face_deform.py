@@ -0,0 +1,213 @@
+# face_deform.py - KD-tree point picking and radial-basis deformation of dense meshes (NumPy only)
+#
+# Face rigs have thousands of control points and tens of thousands of
+# vertices, so neither picking nor deformation can loop over them in Python:
+#   * KDTree splits the points at the median of their widest axis down to
+#     small leaves. nearest() walks it best-first for one query (picking),
+#     pairs_within() finds every (query, point) pair closer than a radius for
+#     many queries at once, one tree level per step like bvh.py,
+#   * RBFDeformer moves every vertex by a smooth displacement field that
+#     passes exactly through the control points' displacements. Its kernel is
+#     Wendland's compactly supported C2 function, so each vertex only depends
+#     on the control points within `radius` of its rest position; those
+#     weights are found once, at rest, and kept as sparse rows. deform()
+#     solves the sparse control-point system with conjugate gradients
+#     (warm-started from the last solution) and applies it to all vertices
+#     in one reduceat pass. Dragging moves one point at a time: move() solves
+#     that point's influence on the vertices once, when it is first moved,
+#     and from then on every drag step is one multiply-add over the vertices.
+#
+# Usage:
+#   from face_deform import KDTree, RBFDeformer
+#   tree = KDTree(control_points)
+#   index, distance = tree.nearest(mouse_point, max_distance=0.2)     # -1 if none
+#   deformer = RBFDeformer(vertices, control_points, radius=1.5)
+#   vertices = deformer.move(index, new_position)         # while dragging one point
+#   vertices = deformer.deform(moved_control_points)      # all of them
+
+from typing import Tuple
+
+import numpy as np
+
+LEAF_SIZE = 8
+RBF_RADIUS = 1.5            # kernel support, in mesh units
+CG_TOLERANCE = 1e-8         # relative residual the control-point solve stops at
+
+
+class KDTree:
+    def __init__(self, points, leaf_size: int = LEAF_SIZE):
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self._build()
+
+    def _build(self):
+        self.order = np.arange(len(self.points))      # point indices, each leaf owns a contiguous range
+        bmin, bmax, left, right, start, count = [], [], [], [], [], []
+
+        def add(lo, hi):
+            points = self.points[self.order[lo:hi]]
+            bmin.append(points.min(axis=0) if hi > lo else np.zeros(3))
+            bmax.append(points.max(axis=0) if hi > lo else np.zeros(3))
+            left.append(-1)
+            right.append(-1)
+            start.append(lo)
+            count.append(hi - lo)
+            return len(bmin) - 1
+
+        stack = [add(0, len(self.points))]
+        while stack:
+            node = stack.pop()
+            lo, n = start[node], count[node]
+            if n <= self.leaf_size:
+                continue
+            axis = int(np.argmax(bmax[node] - bmin[node]))
+            mid = n // 2
+            segment = self.order[lo:lo + n]
+            self.order[lo:lo + n] = segment[np.argpartition(self.points[segment, axis], mid)]
+            left[node], right[node] = add(lo, lo + mid), add(lo + mid, lo + n)
+            stack += [left[node], right[node]]
+
+        self.bmin, self.bmax = np.array(bmin), np.array(bmax)
+        self.left, self.right = np.array(left), np.array(right)
+        self.start, self.count = np.array(start), np.array(count)
+
+    def _box_distance(self, nodes, points) -> np.ndarray:
+        gap = np.maximum(self.bmin[nodes] - points, 0) + np.maximum(points - self.bmax[nodes], 0)
+        return np.sqrt((gap * gap).sum(axis=-1))
+
+    def nearest(self, point, max_distance: float = np.inf) -> Tuple[int, float]:
+        """Index of the point closest to `point` and its distance; (-1, inf) if none is within max_distance."""
+        point = np.asarray(point, dtype=np.float64)
+        best, best_distance = -1, max_distance
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, point) >= best_distance:
+                continue
+            if self.left[node] < 0:
+                indices = self.order[self.start[node]:self.start[node] + self.count[node]]
+                distances = np.linalg.norm(self.points[indices] - point, axis=1)
+                i = int(np.argmin(distances))
+                if distances[i] < best_distance:
+                    best, best_distance = int(indices[i]), float(distances[i])
+                continue
+            # nearer child last, so it is searched first and prunes the other
+            children = [self.left[node], self.right[node]]
+            distances = self._box_distance(np.array(children), point)
+            stack += [children[1], children[0]] if distances[0] <= distances[1] else children
+        return best, (best_distance if best >= 0 else np.inf)
+
+    def pairs_within(self, queries, radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All (query index, point index, distance) with distance < radius, for (Q, 3) queries at once."""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        query = np.arange(len(queries))
+        node = np.zeros(len(queries), np.int64)
+        found_query, found_point, found_distance = [], [], []
+        while len(query):
+            near = self._box_distance(node, queries[query]) < radius
+            query, node = query[near], node[near]
+            leaf = self.left[node] < 0
+
+            # leaves: test their points
+            leaf_query, leaf_node = query[leaf], node[leaf]
+            counts = self.count[leaf_node]
+            offsets = np.repeat(np.cumsum(counts) - counts, counts)
+            points = self.order[np.arange(counts.sum()) - offsets + np.repeat(self.start[leaf_node], counts)]
+            point_query = np.repeat(leaf_query, counts)
+            distances = np.linalg.norm(self.points[points] - queries[point_query], axis=1)
+            hit = distances < radius
+            found_query.append(point_query[hit])
+            found_point.append(points[hit])
+            found_distance.append(distances[hit])
+
+            # inner nodes: descend into both children
+            query = np.concatenate([query[~leaf], query[~leaf]])
+            node = np.concatenate([self.left[node[~leaf]], self.right[node[~leaf]]])
+        return np.concatenate(found_query), np.concatenate(found_point), np.concatenate(found_distance)
+
+
+def wendland(r: np.ndarray, radius: float) -> np.ndarray:
+    """Wendland's C2 kernel: 1 at r = 0, 0 from r = radius on; positive definite in 3D."""
+    q = np.clip(r / radius, 0, 1)
+    return (1 - q) ** 4 * (4 * q + 1)
+
+
+class RBFDeformer:
+    """Current control points and vertices of one mesh; move() and deform() update both."""
+
+    def __init__(self, rest_vertices, rest_controls, radius: float = RBF_RADIUS):
+        self.rest_vertices = np.ascontiguousarray(rest_vertices, dtype=np.float64).reshape(-1, 3)
+        self.rest_controls = np.ascontiguousarray(rest_controls, dtype=np.float64).reshape(-1, 3)
+        self.radius = radius
+        tree = KDTree(self.rest_controls)
+
+        # sparse control x control kernel matrix (symmetric positive definite) and sparse
+        # vertex x control kernel matrix, both fixed because they are evaluated at rest
+        self._system = self._sparse_rows(*tree.pairs_within(self.rest_controls, radius))
+        self._vertex = self._sparse_rows(*tree.pairs_within(self.rest_vertices, radius))
+
+        self.weights = np.zeros_like(self.rest_controls)
+        self.controls = self.rest_controls.copy()
+        self.vertices = self.rest_vertices.astype(np.float32)
+        self._influences = {}           # control index -> (its weight column, its vertex field)
+
+    def _sparse_rows(self, rows, cols, distances):
+        """Entries sorted by row, plus the rows that have any and where their runs start (for reduceat)."""
+        sort = np.argsort(rows, kind='stable')
+        rows, cols = rows[sort], cols[sort]
+        used, starts = np.unique(rows, return_index=True)
+        return used, starts, cols, wendland(distances[sort], self.radius)[:, None]
+
+    @staticmethod
+    def _product(matrix, x: np.ndarray, rows: int) -> np.ndarray:
+        used, starts, cols, values = matrix
+        out = np.zeros((rows, x.shape[1]))
+        if len(cols):
+            out[used] = np.add.reduceat(values * x[cols], starts, axis=0)
+        return out
+
+    def solve(self, b: np.ndarray, x0: np.ndarray = None, max_iterations: int = 0) -> np.ndarray:
+        """Weights w with sum_j kernel(c_i, c_j) w_j = b_i for (M, K) right-hand sides (conjugate gradients)."""
+        b = np.asarray(b, dtype=np.float64).reshape(len(self.rest_controls), -1)
+        x = np.zeros_like(b) if x0 is None else x0.copy()
+        r = b - self._product(self._system, x, len(b))
+        p = r.copy()
+        rr = (r * r).sum(axis=0)
+        limit = CG_TOLERANCE ** 2 * np.maximum((b * b).sum(axis=0), 1e-30)
+        for _ in range(max_iterations or len(b)):
+            if (rr <= limit).all():
+                break
+            ap = self._product(self._system, p, len(b))
+            alpha = rr / np.maximum((p * ap).sum(axis=0), 1e-30)
+            x += alpha * p
+            r -= alpha * ap
+            rr_new = (r * r).sum(axis=0)
+            p = r + rr_new / np.maximum(rr, 1e-30) * p
+            rr = rr_new
+        return x
+
+    def deform(self, control_positions) -> np.ndarray:
+        """Move all control points at once; returns the new (N, 3) float32 vertices."""
+        self.controls = np.array(control_positions, dtype=np.float64).reshape(-1, 3)
+        self.weights = self.solve(self.controls - self.rest_controls, x0=self.weights)
+        self.vertices[:] = self.rest_vertices + self._product(self._vertex, self.weights, len(self.rest_vertices))
+        return self.vertices
+
+    def influence(self, index: int) -> np.ndarray:
+        """How far each vertex moves per unit of movement of one control point, shape (N,)."""
+        if index not in self._influences:
+            unit = np.zeros((len(self.rest_controls), 1))
+            unit[index] = 1
+            column = self.solve(unit)
+            self._influences[index] = column[:, 0], self._product(self._vertex, column, len(self.rest_vertices))[:, 0]
+        return self._influences[index][1]
+
+    def move(self, index: int, position) -> np.ndarray:
+        """Move one control point. The field is linear in the displacements, so after the first
+        call for a point (one solve) this is a single multiply-add over the vertices."""
+        delta = np.asarray(position, dtype=np.float64) - self.controls[index]
+        field = self.influence(index)
+        self.weights += self._influences[index][0][:, None] * delta
+        self.vertices += (field[:, None] * delta).astype(np.float32)
+        self.controls[index] = position
+        return self.vertices
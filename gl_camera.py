@@ -0,0 +1,141 @@
+# gl_camera.py - Projection/modelview matrices and unprojection on the CPU, for the PyOpenGL tools
+#
+# Reading the matrices back with glGetDoublev(GL_MODELVIEW_MATRIX /
+# GL_PROJECTION_MATRIX) and glGetIntegerv(GL_VIEWPORT) for gluUnProject makes
+# the driver finish every queued command before it can answer, which stalls
+# the pipeline once per frame. GLCamera owns those matrices instead:
+#   * it builds them like gluPerspective / glTranslatef / glRotatef do (same
+#     math, NumPy float64, column vectors),
+#   * apply() loads them into GL with glLoadMatrixd, only after they changed,
+#   * unproject() and mouse_ray() invert the cached model-view-projection
+#     matrix on the CPU; pick_plane() intersects the mouse ray with a z plane.
+# Nothing here reads from GL, and the math works without a GL context.
+#
+# Usage:
+#   from gl_camera import GLCamera
+#   camera = GLCamera(viewport=(0, 0, 800, 600))
+#   camera.set_perspective(45, 0.1, 50.0)
+#   camera.translate(0, 0, -5)
+#   camera.apply()                                  # once per change, not per frame
+#   point = camera.pick_plane(mouse_x, mouse_y)     # pygame mouse coords -> world point on z=0
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def perspective(fovy: float, aspect: float, near: float, far: float) -> np.ndarray:
+    """The matrix gluPerspective multiplies in (fovy in degrees)."""
+    f = 1 / math.tan(math.radians(fovy) / 2)
+    return np.array([
+        [f / aspect, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ])
+
+
+def translation(x: float, y: float, z: float) -> np.ndarray:
+    matrix = np.eye(4)
+    matrix[:3, 3] = x, y, z
+    return matrix
+
+
+def rotation(angle: float, x: float, y: float, z: float) -> np.ndarray:
+    """The matrix glRotatef multiplies in (angle in degrees around the axis x, y, z)."""
+    axis = np.array([x, y, z], dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    cross = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = c * np.eye(3) + s * cross + (1 - c) * np.outer(axis, axis)
+    return matrix
+
+
+class GLCamera:
+    def __init__(self, viewport: Sequence[int] = (0, 0, 800, 600)):
+        self.viewport = tuple(int(v) for v in viewport)     # x, y, width, height like glViewport
+        self.projection = np.eye(4)
+        self.modelview = np.eye(4)
+        self._inverse_mvp: Optional[np.ndarray] = None
+        self._applied = False
+
+    def _changed(self):
+        self._inverse_mvp = None
+        self._applied = False
+
+    # === Building the matrices ===
+
+    def set_viewport(self, x: int, y: int, width: int, height: int):
+        self.viewport = (int(x), int(y), int(width), int(height))
+        self._changed()
+
+    @property
+    def aspect(self) -> float:
+        return self.viewport[2] / max(self.viewport[3], 1)
+
+    def set_perspective(self, fovy: float, near: float, far: float, aspect: Optional[float] = None):
+        self.projection = perspective(fovy, aspect or self.aspect, near, far)
+        self._changed()
+
+    def load_identity(self):
+        self.modelview = np.eye(4)
+        self._changed()
+
+    def translate(self, x: float, y: float, z: float):
+        self.modelview = self.modelview @ translation(x, y, z)
+        self._changed()
+
+    def rotate(self, angle: float, x: float, y: float, z: float):
+        self.modelview = self.modelview @ rotation(angle, x, y, z)
+        self._changed()
+
+    def apply(self, force: bool = False):
+        """Load the matrices (and viewport) into GL if they changed since the last apply()."""
+        if self._applied and not force:
+            return
+        from OpenGL.GL import GL_MODELVIEW, GL_PROJECTION, glLoadMatrixd, glMatrixMode, glViewport
+        glViewport(*self.viewport)
+        glMatrixMode(GL_PROJECTION)
+        glLoadMatrixd(self.projection.T)        # GL wants column-major
+        glMatrixMode(GL_MODELVIEW)
+        glLoadMatrixd(self.modelview.T)
+        self._applied = True
+
+    # === Unprojection ===
+
+    @property
+    def inverse_mvp(self) -> np.ndarray:
+        if self._inverse_mvp is None:
+            self._inverse_mvp = np.linalg.inv(self.projection @ self.modelview)
+        return self._inverse_mvp
+
+    def unproject(self, window_points) -> np.ndarray:
+        """Window coordinates (x, y from the bottom left, depth 0..1), shape (3,) or (N, 3), to object space."""
+        points = np.asarray(window_points, dtype=np.float64)
+        x, y, width, height = self.viewport
+        ndc = np.empty(points.shape[:-1] + (4,))
+        ndc[..., 0] = (points[..., 0] - x) / width * 2 - 1
+        ndc[..., 1] = (points[..., 1] - y) / height * 2 - 1
+        ndc[..., 2] = points[..., 2] * 2 - 1
+        ndc[..., 3] = 1
+        world = ndc @ self.inverse_mvp.T
+        return world[..., :3] / world[..., 3:]
+
+    def mouse_ray(self, mouse_x: float, mouse_y: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Origin (on the near plane) and unit direction of the ray under a mouse position (top-left origin)."""
+        window_y = self.viewport[3] - mouse_y
+        near, far = self.unproject([[mouse_x, window_y, 0.0], [mouse_x, window_y, 1.0]])
+        direction = far - near
+        return near, direction / np.linalg.norm(direction)
+
+    def pick_plane(self, mouse_x: float, mouse_y: float, z: float = 0.0) -> Optional[np.ndarray]:
+        """Where the mouse ray meets the plane at height z, or None if it runs parallel to it or points away."""
+        origin, direction = self.mouse_ray(mouse_x, mouse_y)
+        if abs(direction[2]) < 1e-9:
+            return None
+        distance = (z - origin[2]) / direction[2]
+        if distance < 0:
+            return None
+        return origin + direction * distance
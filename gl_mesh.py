@@ -0,0 +1,100 @@
+# gl_mesh.py - Vertex buffer meshes for the PyOpenGL tools, re-uploading only what changed
+#
+# Immediate mode (glBegin / glVertex3f per vertex) costs one Python call per
+# vertex per frame. GLMesh keeps the vertices in a vertex buffer object filled
+# straight from a float32 NumPy array and draws them with one glDrawElements
+# (or glDrawArrays) call. After the array is edited in place, sync() compares
+# it with a copy of what the buffer holds, merges the changed vertices into
+# contiguous ranges (gaps shorter than `merge_gap` vertices are uploaded too,
+# fewer calls beat fewer bytes) and sends only those with glBufferSubData.
+#
+# Usage:
+#   from gl_mesh import GLMesh
+#   mesh = GLMesh(vertices, quads, mode=GL_QUADS)     # after the GL context exists
+#   vertices[10:20] += offset                         # edit the array in place
+#   mesh.sync()                                       # uploads vertices 10..19
+#   mesh.draw()
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from OpenGL.GL import (GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW, GL_ELEMENT_ARRAY_BUFFER, GL_FLOAT, GL_STATIC_DRAW,
+                       GL_TRIANGLES, GL_UNSIGNED_INT, GL_VERTEX_ARRAY, glBindBuffer, glBufferData,
+                       glBufferSubData, glDeleteBuffers, glDisableClientState, glDrawArrays, glDrawElements,
+                       glEnableClientState, glGenBuffers, glVertexPointer)
+
+MERGE_GAP = 64          # unchanged vertices between two changed runs that are uploaded anyway
+MAX_RANGES = 32         # beyond this many ranges, upload one span from the first to the last change
+
+
+class GLMesh:
+    def __init__(self, vertices: np.ndarray, indices: Optional[np.ndarray] = None, mode=GL_TRIANGLES,
+                 merge_gap: int = MERGE_GAP):
+        self.vertices = vertices                    # (N, 3) float32, edited in place by the caller
+        self.mode = mode
+        self.merge_gap = merge_gap
+        self._uploaded = np.array(vertices, dtype=np.float32)
+        self._stride = self._uploaded.itemsize * 3
+        self.uploaded_bytes = self._uploaded.nbytes     # by the last sync()
+
+        self.vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self._uploaded.nbytes, self._uploaded, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self.index_buffer = None
+        self.index_count = len(self._uploaded)
+        if indices is not None:
+            indices = np.ascontiguousarray(indices, dtype=np.uint32).ravel()
+            self.index_count = len(indices)
+            self.index_buffer = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def dirty_ranges(self, vertices: np.ndarray) -> List[Tuple[int, int]]:
+        """[start, end) vertex ranges where vertices differ from the buffer, merged across small gaps."""
+        changed = np.flatnonzero((vertices != self._uploaded).any(axis=1))
+        if not len(changed):
+            return []
+        breaks = np.flatnonzero(np.diff(changed) > self.merge_gap + 1)
+        starts = changed[np.r_[0, breaks + 1]]
+        ends = changed[np.r_[breaks, len(changed) - 1]] + 1
+        if len(starts) > MAX_RANGES:
+            return [(int(starts[0]), int(ends[-1]))]
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def sync(self, vertices: Optional[np.ndarray] = None) -> int:
+        """Upload the changed parts of vertices (default: the array given at creation); returns the bytes sent."""
+        if vertices is not None:
+            self.vertices = vertices
+        vertices = np.ascontiguousarray(self.vertices, dtype=np.float32)
+        ranges = self.dirty_ranges(vertices)
+        self.uploaded_bytes = 0
+        if not ranges:
+            return 0
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        for start, end in ranges:
+            glBufferSubData(GL_ARRAY_BUFFER, start * self._stride, (end - start) * self._stride, vertices[start:end])
+            self._uploaded[start:end] = vertices[start:end]
+            self.uploaded_bytes += (end - start) * self._stride
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return self.uploaded_bytes
+
+    def draw(self):
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        if self.index_buffer is not None:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+            glDrawElements(self.mode, self.index_count, GL_UNSIGNED_INT, None)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        else:
+            glDrawArrays(self.mode, 0, self.index_count)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def delete(self):
+        buffers = [b for b in (self.vertex_buffer, self.index_buffer) if b is not None]
+        glDeleteBuffers(len(buffers), buffers)
+        self.vertex_buffer = self.index_buffer = None
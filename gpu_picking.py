@@ -0,0 +1,211 @@
+# gpu_picking.py - Hover and click picking by rendering entity IDs around the cursor
+#
+# mouse.hovered_entity needs a collider on everything pickable, and a mesh
+# collider on a detailed model costs the collision traverser a test against
+# every triangle, every frame. GPUPicker renders the scene a second time
+# instead, into a tiny offscreen buffer (PICK_RADIUS pixels around the
+# cursor; the main lens cropped to that square), with every registered
+# entity drawn in a flat color that encodes its ID and everything else in
+# black. What's under the cursor is then a pixel lookup, and picking costs
+# the same for a cube and a million-triangle head: the GPU rasterizes a
+# few pixels, depth testing resolves occlusion.
+# The buffer is copied to RAM (RTM_copy_ram) at the end of its render. That
+# copy is a synchronous read: with Panda3D's default single-threaded pipeline
+# the main thread waits there for the GPU to finish the pick pass. The
+# transfer itself is only a few pixels, but the wait is a pipeline stall, so
+# the pass only renders on frames where the answer can change: after the
+# cursor moved, on a mouse click, or after refresh() (call it when pickable
+# entities move under a still cursor). Otherwise the buffer stays inactive
+# and hovered_entity keeps the last answer. The copy is read in the next
+# frame's update(), so hovered_entity is one frame old.
+# Registered entities need no collider. With tolerance > 0, a miss takes the
+# nearest ID within that many pixels, which makes thin features easier to hit.
+# The ID pass draws rest geometry: vertex-shader deformation (e.g.
+# morph_targets.py) isn't picked, which is fine for small blend shapes.
+#
+# Usage:
+#   from gpu_picking import enable_gpu_picking
+#   picker = enable_gpu_picking()                   # after Ursina()
+#   picker.register(head)                           # the head and its children
+#   for feature in features: picker.register(feature)
+#   def input(key):
+#       if key == 'left mouse down' and picker.hovered_entity is head: ...
+
+from typing import Dict, Optional
+
+import numpy as np
+from panda3d.core import (Camera, ColorBlendAttrib, FrameBufferProperties, GraphicsOutput, GraphicsPipe,
+                          OrthographicLens, RenderState, ShaderAttrib, Texture, TransparencyAttrib,
+                          WindowProperties)
+from ursina import Entity, application, camera
+
+from shader_cache import get_shader
+
+PICK_RADIUS = 2             # the buffer is (2 * radius + 1) pixels square, centred on the cursor
+PICK_TOLERANCE = 0          # pixels a miss may be off from the nearest registered entity
+TAG_KEY = 'pick_id'
+OVERRIDE = 1000             # beats the priority-0 shaders, colors and transparency entities set
+
+PICK_VERTEX = '''
+#version 150
+uniform mat4 p3d_ModelViewProjectionMatrix;
+in vec4 p3d_Vertex;
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+}
+'''
+
+PICK_FRAGMENT = '''
+#version 150
+uniform vec4 pick_color;
+out vec4 fragment_color;
+void main() {
+    fragment_color = pick_color;
+}
+'''
+
+
+def id_color(pick_id: int):
+    """24-bit ID as an exact 8-bit-per-channel color."""
+    return ((pick_id & 255) / 255, ((pick_id >> 8) & 255) / 255, ((pick_id >> 16) & 255) / 255, 1)
+
+
+class GPUPicker(Entity):
+    def __init__(self, radius: int = PICK_RADIUS, tolerance: int = PICK_TOLERANCE, **kwargs):
+        super().__init__(ignore_paused=True, **kwargs)
+        self.size = 2 * radius + 1
+        self.tolerance = tolerance
+        self.hovered_entity: Optional[Entity] = None
+        self.hovered_id = 0
+        self.entities: Dict[int, Entity] = {}
+        self._next_id = 1
+        self._rendering = False     # the buffer renders (and copies to RAM) this frame
+        self._mouse = None          # cursor position of the last pick pass
+        self._refresh = False
+        yx = np.mgrid[:self.size, :self.size] - radius
+        self._distance = np.hypot(*yx)
+
+        base = application.base
+        fb = FrameBufferProperties()
+        fb.set_rgba_bits(8, 8, 8, 8)
+        fb.set_depth_bits(24)
+        self.buffer = base.graphicsEngine.make_output(
+            base.pipe, 'pick_buffer', -100, fb, WindowProperties.size(self.size, self.size),
+            GraphicsPipe.BF_refuse_window, base.win.get_gsg(), base.win)
+        self.texture = Texture('pick_ids')
+        self.buffer.add_render_texture(self.texture, GraphicsOutput.RTM_copy_ram)
+        self.buffer.set_clear_color((0, 0, 0, 0))
+        self.buffer.set_active(False)
+
+        shader = get_shader(vertex=PICK_VERTEX, fragment=PICK_FRAGMENT, name='pick_shader')._shader
+        self._shader = ShaderAttrib.make(shader, OVERRIDE)
+        self._node = Camera('pick_camera')
+        self._node.set_initial_state(self._state(0))        # unregistered geometry occludes as "nothing"
+        self._node.set_tag_state_key(TAG_KEY)
+        self._lens = None
+        self.camera = base.cam.attach_new_node(self._node)
+        self.buffer.make_display_region().set_camera(self.camera)
+
+    def _state(self, pick_id: int) -> RenderState:
+        return RenderState.make(self._shader.set_shader_input('pick_color', id_color(pick_id)),
+                                TransparencyAttrib.make(TransparencyAttrib.M_none), ColorBlendAttrib.make_off(),
+                                OVERRIDE)
+
+    # === Registration ===
+
+    def register(self, entity: Entity) -> int:
+        """Make entity (and its untagged children) pickable; returns its ID."""
+        pick_id = self._next_id
+        self._next_id += 1
+        self.entities[pick_id] = entity
+        entity.set_tag(TAG_KEY, str(pick_id))
+        self._node.set_tag_state(str(pick_id), self._state(pick_id))
+        return pick_id
+
+    def unregister(self, entity: Entity):
+        for pick_id, registered in list(self.entities.items()):
+            if registered is entity:
+                del self.entities[pick_id]
+                self._node.clear_tag_state(str(pick_id))
+                if not entity.is_empty():
+                    entity.clear_tag(TAG_KEY)
+
+    # === Per frame ===
+
+    def _read(self) -> int:
+        if not self.texture.has_ram_image():
+            return 0
+        pixels = np.frombuffer(self.texture.get_ram_image_as('RGB'), np.uint8).reshape(self.size, self.size, 3)
+        ids = pixels[..., 0].astype(np.int64) | pixels[..., 1].astype(np.int64) << 8 | pixels[..., 2].astype(np.int64) << 16
+        center = self.size // 2
+        if ids[center, center] or not self.tolerance:
+            return int(ids[center, center])
+        distance = np.where((ids > 0) & (self._distance <= self.tolerance), self._distance, np.inf)
+        nearest = np.unravel_index(np.argmin(distance), distance.shape)
+        return int(ids[nearest]) if np.isfinite(distance[nearest]) else 0
+
+    def _aim(self, mouse_x: float, mouse_y: float):
+        """Crop the main lens to the pick square around the cursor (film coordinates, -1..1)."""
+        lens = camera.lens
+        if self._lens is None or isinstance(self._lens, OrthographicLens) != isinstance(lens, OrthographicLens):
+            self._lens = lens.make_copy()
+            self._node.set_lens(self._lens)
+        width, height = application.base.win.get_size()
+        film = lens.get_film_size()
+        self._lens.set_near_far(lens.get_near(), lens.get_far())
+        self._lens.set_film_size(film[0] * self.size / width, film[1] * self.size / height)
+        if not isinstance(lens, OrthographicLens):
+            self._lens.set_focal_length(lens.get_focal_length())
+        offset = lens.get_film_offset()
+        self._lens.set_film_offset(offset[0] + mouse_x * film[0] / 2, offset[1] + mouse_y * film[1] / 2)
+
+    def refresh(self):
+        """Run the pick pass next frame even if the cursor didn't move."""
+        self._refresh = True
+
+    def input(self, key):
+        if key.endswith('mouse down'):
+            self.refresh()
+
+    def update(self):
+        if self._rendering:         # copied to RAM at the end of last frame's render
+            self.hovered_id = self._read()
+
+        watcher = getattr(application.base, 'mouseWatcherNode', None)
+        mouse = tuple(watcher.get_mouse()) if watcher is not None and watcher.has_mouse() else None
+        if mouse is None or not self.entities:
+            self.hovered_id = 0
+        entity = self.entities.get(self.hovered_id)
+        self.hovered_entity = entity if entity is not None and not entity.is_empty() else None
+
+        rendering = bool(self.entities) and mouse is not None and (mouse != self._mouse or self._refresh)
+        if rendering:
+            self._aim(*mouse)
+            self._mouse = mouse
+        self._refresh = False
+        self._rendering = rendering
+        # also catches render_on_demand.py waking the buffer up with the rest of the outputs
+        if rendering != self.buffer.is_active():
+            self.buffer.set_active(rendering)
+
+    def on_destroy(self):
+        global _gpu_picker
+        self.camera.remove_node()
+        application.base.graphicsEngine.remove_window(self.buffer)
+        if _gpu_picker is self:
+            _gpu_picker = None
+
+
+_gpu_picker: Optional[GPUPicker] = None
+
+
+def get_gpu_picker() -> Optional[GPUPicker]:
+    return _gpu_picker
+
+
+def enable_gpu_picking(**kwargs) -> GPUPicker:
+    """Create the picker (once); call after Ursina()."""
+    global _gpu_picker
+    if _gpu_picker is None:
+        _gpu_picker = GPUPicker(**kwargs)
+    return _gpu_picker
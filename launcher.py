@@ -0,0 +1,59 @@
+# launcher.py - Start any registered scene; imports nothing heavy until the scene is built
+#
+# Only the standard library is imported at startup. The engine, NumPy and the
+# shaders come in when the chosen scene is built (scenes/__init__.py), so
+# listing scenes or checking arguments stays instant. Options are passed to
+# the scene's build() as key=value pairs. Scenes only render while something
+# changes (render_on_demand.py) unless --continuous is given.
+#
+# Usage:
+#   python launcher.py                           # mario_head
+#   python launcher.py mario_head render_mode=sdf
+#   python launcher.py --list
+#   python launcher.py mario_head --continuous       # render every frame
+#   HACKERPY64_PROFILE=low-latency python launcher.py mario_head
+
+import argparse
+import sys
+
+from scenes import SCENES, build_scene
+
+DEFAULT_SCENE = 'mario_head'
+
+
+def run(name: str = DEFAULT_SCENE, continuous: bool = False, **options):
+    """Build the scene, compile its shaders before the first frame and run the app."""
+    app, scene = build_scene(name, **options)
+    from render_on_demand import enable_render_on_demand
+    from shader_cache import precompile_shaders
+    enable_render_on_demand(continuous=continuous)
+    precompile_shaders()
+    app.run()
+
+
+def _parse_options(pairs):
+    options = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f'options are key=value, got {pair!r}')
+        options[key] = value
+    return options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a scene.')
+    parser.add_argument('scene', nargs='?', default=DEFAULT_SCENE)
+    parser.add_argument('options', nargs='*', help='key=value options for the scene')
+    parser.add_argument('--list', action='store_true', help='list the scenes and exit')
+    parser.add_argument('--continuous', action='store_true', help='render every frame, even when nothing changes')
+    args = parser.parse_args(argv)
+    if args.list:
+        print('\n'.join(SCENES))
+        return 0
+    run(args.scene, continuous=args.continuous, **_parse_options(args.options))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
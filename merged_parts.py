@@ -0,0 +1,215 @@
+# merged_parts.py - One draw call for a multi-part model that keeps per-part animation
+#
+# A head built from ~15 Entity spheres and cubes costs ~15 draw calls (twice
+# that with the shadow pass), and Entity.combine() would fix that only by
+# freezing every part in place. merge_parts() keeps both:
+#   * every part's triangles are baked into one vertex buffer in the root's
+#     space, with the part's color as vertex color and its index in a 'part'
+#     vertex column,
+#   * the part entities stay in the scene, hidden, as plain transforms, so
+#     existing code (animate_scale, invoke, rotation...) keeps driving them,
+#   * every frame MergedParts uploads "bind pose -> current pose" of each part
+#     into a small uniform matrix array, and the vertex shader moves every
+#     vertex by its part's matrix; the lit_with_shadows lighting is unchanged.
+#
+# Usage:
+#   from merged_parts import merge_parts
+#   merged = merge_parts(mario)           # after all parts are created
+#   nose.animate_scale(2, duration=0.2)   # still works, drawn by `merged`
+#   destroy(merged)                       # back to separately drawn parts
+
+from typing import List, Optional
+
+import numpy as np
+from panda3d.core import (BoundingSphere, Geom, GeomNode, GeomTriangles, GeomVertexArrayFormat, GeomVertexData,
+                          GeomVertexFormat, GeomEnums, InternalName, Mat3, Mat4, NodePath, PTA_LMatrix3f,
+                          PTA_LMatrix4f)
+from ursina import Entity
+from ursina.shaders import lit_with_shadows_shader
+
+from bvh_collider import primitive_indices
+from shader_cache import get_shader
+
+MAX_PARTS = 32          # size of the uniform arrays; the head uses 15
+BOUNDS_PADDING = 1.5    # parts can grow past their bind pose (the nose stretches to 1.5x)
+
+_array = GeomVertexArrayFormat()
+_array.add_column(InternalName.get_vertex(), 3, Geom.NT_float32, Geom.C_point)
+_array.add_column(InternalName.get_normal(), 3, Geom.NT_float32, Geom.C_normal)
+_array.add_column(InternalName.get_color(), 4, Geom.NT_float32, Geom.C_color)
+_array.add_column(InternalName.make('part'), 1, Geom.NT_float32, Geom.C_other)
+MERGED_FORMAT = GeomVertexFormat.register_format(_array)
+_FLOATS_PER_VERTEX = 11
+
+merged_vertex_shader = f'''#version 150
+uniform struct {{
+    vec4 position;
+    vec3 color;
+    vec3 attenuation;
+    vec3 spotDirection;
+    float spotCosCutoff;
+    float spotExponent;
+    sampler2DShadow shadowMap;
+    mat4 shadowViewMatrix;
+}} p3d_LightSource[1];
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform mat4 part_transforms[{MAX_PARTS}];
+uniform mat3 part_normal_matrices[{MAX_PARTS}];
+
+in vec4 vertex;
+in vec3 normal;
+in vec4 p3d_Color;
+in float part;
+
+in vec2 p3d_MultiTexCoord0;
+uniform vec2 texture_scale;
+uniform vec2 texture_offset;
+out vec2 texcoords;
+
+out vec3 vpos;
+out vec3 norm;
+out vec4 shad[1];
+out vec4 vertex_color;
+
+void main() {{
+    int i = int(part + 0.5);
+    vec4 posed = part_transforms[i] * vertex;
+    gl_Position = p3d_ModelViewProjectionMatrix * posed;
+    vpos = vec3(p3d_ModelViewMatrix * posed);
+    norm = normalize(p3d_NormalMatrix * (part_normal_matrices[i] * normal));
+    shad[0] = p3d_LightSource[0].shadowViewMatrix * vec4(vpos, 1);
+    texcoords = (p3d_MultiTexCoord0 * texture_scale) + texture_offset;
+    vertex_color = p3d_Color;
+}}
+'''
+
+
+def merged_lit_shader():
+    """lit_with_shadows_shader with per-part vertex transforms; shared through shader_cache."""
+    return get_shader(vertex=merged_vertex_shader, fragment=lit_with_shadows_shader.fragment,
+                      name='merged_parts_lit', default_input=lit_with_shadows_shader.default_input)
+
+
+def _descendants_with_models(root: Entity) -> List[Entity]:
+    parts = []
+    for child in root.children:
+        if isinstance(child, MergedParts):
+            continue
+        if child.model is not None:
+            parts.append(child)
+        parts.extend(_descendants_with_models(child))
+    return parts
+
+
+def _part_vertices(part: Entity, root: Entity, part_id: int):
+    """Interleaved MERGED_FORMAT rows and triangle indices of one part, in root space."""
+    rows, triangles, offset = [], [], 0
+    geom_nodes = list(part.model.find_all_matches('**/+GeomNode'))
+    if isinstance(part.model.node(), GeomNode):
+        geom_nodes.insert(0, part.model)
+    color = np.array(part.color, dtype=np.float32)
+
+    for node_path in geom_nodes:
+        mat = np.array(node_path.get_mat(root), dtype=np.float64).reshape(4, 4)
+        # Panda3D matrices are row-major with row vectors: p' = p @ M, n' = n @ inv(M)^T
+        normal_mat = np.linalg.inv(mat[:3, :3]).T
+        for geom in node_path.node().get_geoms():
+            geom = geom.decompose()
+            source = geom.get_vertex_data()
+            if not source.has_column('vertex'):
+                continue
+            vdata = source.convert_to(MERGED_FORMAT)
+            data = np.frombuffer(vdata.get_array(0).get_handle().get_data(), np.float32)
+            data = data.reshape(-1, _FLOATS_PER_VERTEX).copy()
+            data[:, 0:3] = data[:, 0:3] @ mat[:3, :3] + mat[3, :3]
+            if source.has_column('normal'):
+                normals = data[:, 3:6] @ normal_mat
+                data[:, 3:6] = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+            data[:, 6:10] = data[:, 6:10] * color if source.has_column('color') else color
+            data[:, 10] = part_id
+
+            for i in range(geom.get_num_primitives()):
+                prim = geom.get_primitive(i)
+                if prim.get_primitive_type() == GeomEnums.PT_polygons:
+                    triangles.append(primitive_indices(prim).reshape(-1, 3) + offset)
+            rows.append(data)
+            offset += len(data)
+    return rows, triangles
+
+
+def build_merged_geom(root: Entity, parts: List[Entity], name: str = 'merged_parts') -> GeomNode:
+    """Bake parts (in their current pose) into a single Geom in root's space."""
+    rows, triangles, offset = [], [], 0
+    for part_id, part in enumerate(parts):
+        part_rows, part_triangles = _part_vertices(part, root, part_id)
+        rows.extend(part_rows)
+        triangles.extend(t + offset for t in part_triangles)
+        offset += sum(len(r) for r in part_rows)
+    vertices = np.concatenate(rows) if rows else np.zeros((0, _FLOATS_PER_VERTEX), np.float32)
+    indices = np.concatenate(triangles) if triangles else np.zeros((0, 3), np.int64)
+
+    vdata = GeomVertexData(name, MERGED_FORMAT, Geom.UH_static)
+    vdata.unclean_set_num_rows(len(vertices))
+    memoryview(vdata.modify_array(0)).cast('B')[:] = np.ascontiguousarray(vertices, np.float32).tobytes()
+    prim = GeomTriangles(Geom.UH_static)
+    prim.set_index_type(Geom.NT_uint32)
+    index_array = prim.modify_vertices()
+    index_array.unclean_set_num_rows(indices.size)
+    memoryview(index_array).cast('B')[:] = np.ascontiguousarray(indices, np.uint32).tobytes()
+
+    geom = Geom(vdata)
+    geom.add_primitive(prim)
+    node = GeomNode(name)
+    node.add_geom(geom)
+    return node
+
+
+class MergedParts(Entity):
+    """Draws root's parts as one mesh and follows their transforms every frame."""
+
+    def __init__(self, root: Entity, parts: Optional[List[Entity]] = None, shader=None, **kwargs):
+        parts = list(parts) if parts is not None else _descendants_with_models(root)
+        if len(parts) > MAX_PARTS:
+            raise ValueError(f'{len(parts)} parts, merged meshes support at most {MAX_PARTS}')
+        geom_node = build_merged_geom(root, parts, f'{root.name}_merged')
+        super().__init__(parent=root, model=NodePath(geom_node), shader=shader or merged_lit_shader(), **kwargs)
+        self.root = root
+        self.parts = parts
+        self._inverse_bind = [Mat4(part.get_mat(root)) for part in parts]
+        for mat in self._inverse_bind:
+            mat.invert_in_place()
+
+        self._transforms = PTA_LMatrix4f([Mat4.ident_mat()] * MAX_PARTS)
+        self._normal_matrices = PTA_LMatrix3f([Mat3.ident_mat()] * MAX_PARTS)
+        self.set_shader_input('part_transforms', self._transforms)
+        self.set_shader_input('part_normal_matrices', self._normal_matrices)
+
+        bounds = geom_node.get_bounds()
+        if not bounds.is_empty():
+            geom_node.set_bounds(BoundingSphere(bounds.get_center(), bounds.get_radius() * BOUNDS_PADDING))
+        for part in parts:
+            part.visible = False
+        self.update()
+
+    def update(self):
+        for i, (part, inverse_bind) in enumerate(zip(self.parts, self._inverse_bind)):
+            if not part:
+                continue
+            mat = inverse_bind * part.get_mat(self.root)
+            self._transforms[i] = mat
+            normal_mat = mat.get_upper_3()
+            normal_mat.invert_transpose_from(mat.get_upper_3())
+            self._normal_matrices[i] = normal_mat
+
+    def on_destroy(self):
+        for part in self.parts:
+            if part:
+                part.visible = True
+
+
+def merge_parts(root: Entity, parts: Optional[List[Entity]] = None, shader=None) -> MergedParts:
+    """Draw every part under root (or the given ones) in a single draw call from now on."""
+    return MergedParts(root, parts, shader)
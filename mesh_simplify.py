@@ -0,0 +1,235 @@
+# mesh_simplify.py - Quadric error mesh simplification and cached LOD chains (NumPy only)
+#
+# simplify() reduces an ObjMesh (obj_loader.py) with Garland-Heckbert quadric
+# error metrics. Instead of collapsing one edge at a time from a priority
+# queue, every pass works on the whole mesh at once:
+#   * each vertex carries the area-weighted quadric of its triangles' planes,
+#   * every edge gets the error of collapsing it into either endpoint
+#     (half-edge collapse, so surviving vertices keep their own uv/normal),
+#   * an edge is collapsed when it's the cheapest edge of both endpoints, so
+#     all collapses of a pass are vertex-disjoint and can be applied together,
+#   * collapses that would flip a triangle are rejected.
+# Border and UV/normal seam vertices (edges with only one triangle in the
+# welded mesh) are never moved, which keeps outlines and textures intact.
+#
+# load_obj_lods() builds a chain of levels (each simplified from the previous
+# one) at import time and stores every level next to the OBJ as
+# '<model>.obj.lod<i>.npmesh', in obj_loader's cache format.
+#
+# Usage:
+#   from mesh_simplify import simplify, load_obj_lods
+#   half = simplify(mesh, ratio=0.5)
+#   lods = load_obj_lods('marioshead.obj')      # [full, 50%, 25%, 10%]
+
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from obj_loader import ObjMesh, cache_path_for, load_obj, read_cache, read_cache_header, write_cache
+
+LOD_RATIOS = (1.0, 0.5, 0.25, 0.1)     # triangle count of each level relative to the source
+MIN_FLIP_COS = 0.2                     # a moved triangle's normal may turn at most ~78 degrees
+MAX_PASSES = 100
+
+
+def _quadrics(positions, triangles) -> np.ndarray:
+    """Per-vertex sum of the area-weighted plane quadrics of its triangles, (N, 4, 4)."""
+    p = positions[triangles]
+    normals = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    double_area = np.linalg.norm(normals, axis=1)
+    normals = normals / np.where(double_area > 0, double_area, 1)[:, None]
+    planes = np.concatenate([normals, -(normals * p[:, 0]).sum(axis=1, keepdims=True)], axis=1)
+    face_q = (planes[:, :, None] * planes[:, None, :] * (double_area / 2)[:, None, None]).reshape(-1, 16)
+
+    ids = triangles.reshape(-1)
+    q = np.stack([np.bincount(ids, weights=np.repeat(face_q[:, k], 3), minlength=len(positions))
+                  for k in range(16)], axis=1)
+    return q.reshape(-1, 4, 4)
+
+
+def _edges(triangles, n: int):
+    """Unique undirected edges (a < b) and how many triangles use each."""
+    e = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    e.sort(axis=1)
+    keys, counts = np.unique(e[:, 0] * n + e[:, 1], return_counts=True)
+    return np.stack([keys // n, keys % n], axis=1), counts
+
+
+def _first_of_duplicates(triangles, n: int) -> np.ndarray:
+    """Sorted indices of the first triangle of each distinct corner set."""
+    s = np.sort(triangles, axis=1)
+    order = np.lexsort((s[:, 2], s[:, 0] * n + s[:, 1]))
+    s = s[order]
+    new = np.ones(len(s), bool)
+    new[1:] = (s[1:] != s[:-1]).any(axis=1)
+    return np.sort(order[new])
+
+
+def _collapse_error(quadrics, positions, src, dst):
+    v = np.concatenate([positions[dst], np.ones((len(dst), 1))], axis=1)
+    q = quadrics[src] + quadrics[dst]
+    return np.abs(np.einsum('ni,nij,nj->n', v, q, v))
+
+
+def _face_normals(positions, triangles):
+    a, b, c = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    return np.cross(b - a, c - a)
+
+
+def _flips(positions, triangles, face_normals, src, dst) -> np.ndarray:
+    """For each collapse src -> dst on its own: would it flip one of src's remaining triangles?"""
+    n = len(positions)
+    corners = triangles.reshape(-1)
+    by_vertex = np.argsort(corners, kind='stable')
+    counts = np.bincount(corners, minlength=n)
+    starts = np.cumsum(counts) - counts
+
+    # one row per (collapse, triangle around its src)
+    reps = counts[src]
+    row = np.repeat(np.arange(len(src)), reps)
+    local = np.arange(len(row)) - np.repeat(np.cumsum(reps) - reps, reps)
+    tri_index = by_vertex[np.repeat(starts[src], reps) + local] // 3
+    tri = triangles[tri_index]
+    s, d = src[row, None], dst[row, None]
+    moved = np.where(tri == s, d, tri)
+
+    old_n = face_normals[tri_index]
+    new_n = _face_normals(positions, moved)
+    lengths = np.linalg.norm(old_n, axis=1) * np.linalg.norm(new_n, axis=1)
+    # triangles that contain dst disappear with the collapse
+    bad = ((old_n * new_n).sum(axis=1) <= MIN_FLIP_COS * lengths) & ~(tri == d).any(axis=1)
+    return np.bincount(row, weights=bad, minlength=len(src)) > 0
+
+
+def simplify(mesh: ObjMesh, ratio: float = 0.5, target_triangles: Optional[int] = None,
+             max_error: float = np.inf) -> ObjMesh:
+    """Simplified copy of mesh with about ratio * its triangles (or target_triangles).
+
+    Stops early when no collapse below max_error (in squared distance units)
+    is left, or when only locked border/seam vertices remain.
+    """
+    positions = np.asarray(mesh.positions, dtype=np.float64)
+    triangles = np.asarray(mesh.triangles, dtype=np.int64)
+    if target_triangles is None:
+        target_triangles = int(len(triangles) * ratio)
+    n = len(positions)
+
+    quadrics = _quadrics(positions, triangles)
+    edges, uses = _edges(triangles, n)
+    locked = np.zeros(n, bool)
+    locked[edges[uses == 1].reshape(-1)] = True
+
+    for _ in range(MAX_PASSES):
+        excess = len(triangles) - target_triangles
+        if excess <= 0:
+            break
+        edges, _ = _edges(triangles, n)
+        a, b = edges[:, 0], edges[:, 1]
+
+        # cheapest direction per edge; locked vertices can't be the one that moves
+        cost_ab = np.where(locked[a], np.inf, _collapse_error(quadrics, positions, a, b))
+        cost_ba = np.where(locked[b], np.inf, _collapse_error(quadrics, positions, b, a))
+        a_moves = cost_ab <= cost_ba
+        src, dst = np.where(a_moves, a, b), np.where(a_moves, b, a)
+        cost = np.minimum(cost_ab, cost_ba)
+        candidate = cost <= max_error
+        face_normals = _face_normals(positions, triangles)
+        candidate[candidate] = ~_flips(positions, triangles, face_normals, src[candidate], dst[candidate])
+        if not candidate.any():
+            break
+
+        # an edge wins when it's the cheapest edge at both of its endpoints (ranks break ties)
+        rank = np.empty(len(cost), np.int64)
+        rank[np.argsort(np.where(candidate, cost, np.inf), kind='stable')] = np.arange(len(cost))
+        best = np.full(n, len(cost), np.int64)
+        np.minimum.at(best, a[candidate], rank[candidate])
+        np.minimum.at(best, b[candidate], rank[candidate])
+        chosen = np.flatnonzero(candidate & (best[a] == rank) & (best[b] == rank))
+        # each interior collapse removes two triangles; don't overshoot the target
+        chosen = chosen[np.argsort(rank[chosen])][:max(1, (excess + 1) // 2)]
+
+        # neighbouring collapses can still flip a triangle they share: drop those,
+        # re-checking until the set is stable (each round removes at least one)
+        while True:
+            remap = np.arange(n)
+            remap[src[chosen]] = dst[chosen]
+            moved = remap[triangles]
+            touched = (moved != triangles).any(axis=1)
+            alive = (moved[:, 0] != moved[:, 1]) & (moved[:, 1] != moved[:, 2]) & (moved[:, 2] != moved[:, 0])
+            check = np.flatnonzero(touched & alive)
+            old_n = face_normals[check]
+            new_n = _face_normals(positions, moved[check])
+            lengths = np.linalg.norm(old_n, axis=1) * np.linalg.norm(new_n, axis=1)
+            bad = (old_n * new_n).sum(axis=1) <= MIN_FLIP_COS * lengths
+            if not bad.any():
+                break
+            reject = np.zeros(n, bool)
+            reject[triangles[check[bad]].reshape(-1)] = True
+            chosen = chosen[~reject[src[chosen]]]
+        if len(chosen) == 0:
+            break
+
+        np.add.at(quadrics, dst[chosen], quadrics[src[chosen]])
+        triangles = moved[alive]
+        # two collapses can fold a pair of triangles onto the same corners
+        triangles = triangles[_first_of_duplicates(triangles, n)]
+
+    used, triangles = np.unique(triangles, return_inverse=True)
+    return ObjMesh(
+        np.ascontiguousarray(mesh.positions[used], dtype=np.float32),
+        np.ascontiguousarray(mesh.normals[used], dtype=np.float32),
+        np.ascontiguousarray(mesh.uvs[used], dtype=np.float32),
+        triangles.reshape(-1, 3).astype(np.uint32),
+    )
+
+
+def build_lod_chain(mesh: ObjMesh, ratios: Sequence[float] = LOD_RATIOS) -> List[ObjMesh]:
+    """One mesh per ratio; each level is simplified from the previous one."""
+    levels, current = [], mesh
+    for ratio in ratios:
+        if ratio < 1:
+            current = simplify(current, target_triangles=int(mesh.triangle_count * ratio))
+        levels.append(current)
+    return levels
+
+
+def lod_cache_path(source, level: int) -> Path:
+    source = Path(source)
+    return source.with_name(f'{source.name}.lod{level}{cache_path_for(source).suffix}')
+
+
+def load_obj_lods(path, ratios: Sequence[float] = LOD_RATIOS, use_cache: bool = True) -> List[ObjMesh]:
+    """LOD chain for an OBJ, simplified once and then memory-mapped from '.lod<i>.npmesh' files.
+
+    Level caches are tied to the source through the base cache's content hash.
+    """
+    path = Path(path)
+    mesh = load_obj(path, use_cache)
+    if not use_cache:
+        return build_lod_chain(mesh, ratios)
+
+    base = read_cache_header(cache_path_for(path)) or {}
+    source_hash = base.get('source_sha1')
+    levels = [mesh]
+    for i, ratio in enumerate(ratios[1:], start=1):
+        header = read_cache_header(lod_cache_path(path, i))
+        if (header is None or source_hash is None or header.get('source_sha1') != source_hash
+                or header.get('ratio') != ratio):
+            break
+        levels.append(read_cache(lod_cache_path(path, i), header))
+    else:
+        return levels
+
+    # rebuild from the first missing/stale level on
+    current = levels[-1]
+    for i, ratio in enumerate(ratios[len(levels):], start=len(levels)):
+        current = simplify(current, target_triangles=int(mesh.triangle_count * ratio))
+        levels.append(current)
+        if source_hash is None:
+            continue
+        try:
+            write_cache(current, lod_cache_path(path, i), {'source_sha1': source_hash, 'ratio': ratio})
+        except OSError as e:
+            print('Could not write LOD cache', lod_cache_path(path, i), ':', e)
+    return levels
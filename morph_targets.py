@@ -0,0 +1,154 @@
+# morph_targets.py - Blend shapes evaluated in the vertex shader from a float texture
+#
+# Animating a face by moving whole entities (or rewriting vertex arrays) costs
+# CPU time per feature per frame, and every new expression needs more of it.
+# MorphTargets stores a mesh's blend shapes once, as per-vertex position
+# offsets in a float texture (one block of rows per target), and wraps the
+# entity's shader so the vertex shader adds
+#     sum_i weight_i * offset_i[gl_VertexID]
+# to every vertex. Each weight is one uniform; changing it costs one shader
+# input however many vertices the mesh has, and the shadow pass deforms with
+# it. Weights are plain attributes named after the targets, so tweens.py can
+# animate them like any other property. Normals are not morphed, so targets
+# should be shapes lighting doesn't give away (shifts, stretches, bends).
+# The mesh's bounds grow with the weights so a deformed mesh isn't culled.
+#
+# Usage:
+#   from morph_targets import MorphTargets
+#   morph = MorphTargets(mouth, {
+#       'open': lambda rest: rest * (0, 1.5, 0),         # offsets from the rest positions
+#       'smile': smile_offsets,                         # or an (N, 3) array
+#   })
+#   morph.smile = 0.5
+#   tween_engine().tween(morph, 'open', 1, duration=0.2)
+
+import re
+from typing import Callable, Dict, Union
+
+import numpy as np
+from panda3d.core import BoundingBox, GeomNode, GeomVertexReader, Point3, SamplerState, Texture
+from ursina import Entity
+from ursina.shaders import unlit_shader
+
+from shader_cache import get_shader
+
+MAX_MORPH_TARGETS = 8
+TEXTURE_WIDTH = 1024        # vertices per texture row; each target takes ceil(N / width) rows
+
+MORPH_GLSL = '''
+uniform sampler2D morph_offsets;
+uniform float morph_weights[%d];
+uniform int morph_count;
+uniform int morph_rows;
+
+vec3 morph_offset() {
+    ivec2 texel = ivec2(gl_VertexID %% %d, gl_VertexID / %d);
+    vec3 offset = vec3(0.0);
+    for (int i = 0; i < morph_count; i++) {
+        if (morph_weights[i] != 0.0)
+            offset += morph_weights[i] * texelFetch(morph_offsets, texel + ivec2(0, i * morph_rows), 0).xyz;
+    }
+    return offset;
+}
+''' % (MAX_MORPH_TARGETS, TEXTURE_WIDTH, TEXTURE_WIDTH)
+
+Target = Union[np.ndarray, Callable[[np.ndarray], np.ndarray]]
+
+
+def morph_shader(shader):
+    """The same Ursina shader with morph offsets added to its vertex input (p3d_Vertex or vertex)."""
+    name = 'p3d_Vertex' if re.search(r'in\s+vec4\s+p3d_Vertex\s*;', shader.vertex) else 'vertex'
+    match = re.search(r'void\s+main\s*\(\s*\)\s*{', shader.vertex)
+    if match is None or not re.search(r'in\s+vec4\s+%s\s*;' % name, shader.vertex):
+        raise ValueError(f'{shader.name}: no vec4 {name} input and main() to add morph targets to')
+    body = re.sub(r'\b%s\b' % name, 'morphed_vertex', shader.vertex[match.end():])
+    vertex = (shader.vertex[:match.start()] + MORPH_GLSL + '\n' + match.group(0)
+              + f'\n    vec4 morphed_vertex = {name} + vec4(morph_offset(), 0.0);' + body)
+    return get_shader(vertex=vertex, fragment=shader.fragment, geometry=shader.geometry,
+                      name=f'{shader.name}_morph', language=shader.language,
+                      default_input=dict(shader.default_input))
+
+
+def rest_positions(entity: Entity) -> np.ndarray:
+    """(N, 3) model space vertex positions of the entity's mesh, in vertex buffer order."""
+    nodes = [entity.model.node()] if isinstance(entity.model.node(), GeomNode) else \
+        [path.node() for path in entity.model.find_all_matches('**/+GeomNode')]
+    datas = {geom.get_vertex_data() for node in nodes for geom in node.get_geoms()}
+    if len(datas) != 1:
+        raise ValueError(f'{entity.name}: morph targets need a mesh with one vertex buffer, found {len(datas)}')
+    data = datas.pop()
+    reader = GeomVertexReader(data, 'vertex')
+    positions = np.empty((data.get_num_rows(), 3), np.float32)
+    for i in range(len(positions)):
+        positions[i] = tuple(reader.get_data3())
+    return positions
+
+
+class MorphTargets:
+    def __init__(self, entity: Entity, targets: Dict[str, Target]):
+        if len(targets) > MAX_MORPH_TARGETS:
+            raise ValueError(f'at most {MAX_MORPH_TARGETS} morph targets, got {len(targets)}')
+        object.__setattr__(self, 'entity', entity)
+        object.__setattr__(self, '_index', {name: i for i, name in enumerate(targets)})
+        self.rest = rest_positions(entity)
+        self.weights = np.zeros(MAX_MORPH_TARGETS)
+        offsets = np.zeros((len(targets), len(self.rest), 3), np.float32)
+        for i, target in enumerate(targets.values()):
+            offsets[i] = target(self.rest) if callable(target) else target
+        self._extent = np.abs(offsets).max(axis=1) if len(targets) else np.zeros((0, 3))
+        self._bounds = self.rest.min(axis=0), self.rest.max(axis=0)
+
+        # rows of TEXTURE_WIDTH vertices, target after target
+        rows = -(-len(self.rest) // TEXTURE_WIDTH)
+        texels = np.zeros((len(targets) * rows * TEXTURE_WIDTH, 3), np.float32)
+        for i in range(len(targets)):
+            texels[i * rows * TEXTURE_WIDTH:i * rows * TEXTURE_WIDTH + len(self.rest)] = offsets[i]
+        self.texture = Texture('morph_offsets')
+        self.texture.setup_2d_texture(TEXTURE_WIDTH, max(rows * len(targets), 1), Texture.T_float, Texture.F_rgb32)
+        self.texture.set_minfilter(SamplerState.FT_nearest)
+        self.texture.set_magfilter(SamplerState.FT_nearest)
+        self.texture.set_ram_image(texels[:, ::-1].tobytes())      # Panda3D stores BGR
+
+        entity.shader = morph_shader(entity.shader or unlit_shader)     # Panda3D's auto shader can't be wrapped
+        entity.set_shader_input('morph_offsets', self.texture)
+        entity.set_shader_input('morph_count', len(targets))
+        entity.set_shader_input('morph_rows', rows)
+        self._apply()
+
+    @property
+    def names(self):
+        return list(self._index)
+
+    def __bool__(self):
+        return not self.entity.is_empty()      # lets tweens drop a destroyed entity's weights
+
+    def __getattr__(self, name):
+        index = self.__dict__.get('_index', {}).get(name)
+        if index is None:
+            raise AttributeError(name)
+        return float(self.weights[index])
+
+    def __setattr__(self, name, value):
+        if name in self._index:
+            self.set_weights(**{name: value})
+        else:
+            object.__setattr__(self, name, value)
+
+    def set_weights(self, **weights: float):
+        for name, value in weights.items():
+            self.weights[self._index[name]] = value
+        self._apply()
+
+    def reset(self):
+        self.weights[:] = 0
+        self._apply()
+
+    def _apply(self):
+        # a new list every time: a changed render state is what render_on_demand.py sees
+        self.entity.set_shader_input('morph_weights', self.weights.tolist())
+        grow = np.abs(self.weights[:len(self._extent)]) @ self._extent
+        lo, hi = self._bounds
+        for path in [self.entity.model] + list(self.entity.model.find_all_matches('**/+GeomNode')):
+            if isinstance(path.node(), GeomNode):
+                path.node().set_bounds(BoundingBox(Point3(*(lo - grow)), Point3(*(hi + grow))))
+                path.node().set_final(True)
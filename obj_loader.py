@@ -0,0 +1,313 @@
+# obj_loader.py - Vectorized OBJ import with a memory-mapped binary cache
+#
+# Ursina's own OBJ import walks every line in Python and produces an unindexed
+# triangle soup, which takes seconds for the ripped/decomp-exported models
+# (hundreds of thousands of triangles). This loader:
+#   * parses v/vt/vn/f records with NumPy in bulk (n-gons are fan triangulated),
+#   * welds vertices that share a position (within WELD_EPSILON) and merges
+#     identical position/uv/normal corners into one indexed vertex,
+#   * writes the result to '<model>.obj.npmesh' next to the source, and on later
+#     loads memory-maps that file instead of parsing the OBJ again.
+# The cache is rebuilt when the source's size or content hash changes; a
+# changed mtime alone only triggers a hash check.
+#
+# Usage:
+#   from obj_loader import load_obj_model
+#   head = Entity(model=load_obj_model('marioshead.obj'), texture='marioshead_diffuse.png')
+#
+# Coordinates follow Ursina's importer (x is mirrored into Ursina's left-handed space).
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from panda3d.core import (Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat,
+                          NodePath)
+
+CACHE_SUFFIX = '.npmesh'
+CACHE_MAGIC = b'HPY64MESH1\n'
+CACHE_ALIGN = 16
+WELD_EPSILON = 1e-6
+
+
+@dataclass
+class ObjMesh:
+    """Indexed triangle mesh; arrays may be read-only views into a memory-mapped cache."""
+    positions: np.ndarray        # (N, 3) float32
+    normals: np.ndarray          # (N, 3) float32
+    uvs: np.ndarray              # (N, 2) float32, zeros when the OBJ has no texcoords
+    triangles: np.ndarray        # (T, 3) uint32
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions)
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.triangles)
+
+
+def _floats(lines, columns: int) -> np.ndarray:
+    """Parse 'x y z ...' records into an (n, columns) array, ignoring extra columns."""
+    if not lines:
+        return np.zeros((0, columns), np.float32)
+    width = len(lines[0].split())
+    flat = np.fromstring(b' '.join(lines), dtype=np.float32, sep=' ')
+    if width >= columns and flat.size == width * len(lines):
+        return flat.reshape(-1, width)[:, :columns]
+    # records of varying width (optional w / vertex colors); pad or cut each one
+    out = np.zeros((len(lines), columns), np.float32)
+    for i, line in enumerate(lines):
+        values = line.split()[:columns]
+        out[i, :len(values)] = [float(v) for v in values]
+    return out
+
+
+def _resolve_indices(idx: np.ndarray, count: int) -> np.ndarray:
+    """OBJ indices are 1-based, negative ones are relative to the end; 0 means absent (-1)."""
+    return np.where(idx > 0, idx - 1, np.where(idx < 0, count + idx, -1))
+
+
+def parse_obj(path) -> ObjMesh:
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines()      # \n, \r\n or \r
+
+    v_lines, vt_lines, vn_lines, f_lines = [], [], [], []
+    for line in lines:
+        if line.startswith(b'v '):
+            v_lines.append(line[2:])
+        elif line.startswith(b'vt '):
+            vt_lines.append(line[3:])
+        elif line.startswith(b'vn '):
+            vn_lines.append(line[3:])
+        elif line.startswith(b'f '):
+            f_lines.append(line[2:].split())
+
+    positions = _floats(v_lines, 3)
+    texcoords = _floats(vt_lines, 2)
+    vertex_normals = _floats(vn_lines, 3)
+    if not f_lines:
+        raise ValueError(f'{path}: no faces')
+
+    # every corner becomes (v, vt, vn); missing parts are written as 0. Files may mix
+    # 'v', 'v/vt', 'v//vn' and 'v/vt/vn' corners, so each corner's layout is its own
+    corner_counts = np.fromiter((len(face) for face in f_lines), dtype=np.int64, count=len(f_lines))
+    corners = b' '.join(b' '.join(face) for face in f_lines).replace(b'//', b'/0/')
+    chars = np.frombuffer(corners, dtype=np.uint8)
+    corner_of_char = np.cumsum(chars == ord(' '))
+    fields = np.bincount(corner_of_char[chars == ord('/')], minlength=int(corner_counts.sum())) + 1
+    values = np.fromstring(corners.replace(b'/', b' '), dtype=np.int64, sep=' ')
+    if values.size != fields.sum() or fields.max() > 3:
+        raise ValueError(f'{path}: malformed face record')
+    rows = np.repeat(np.arange(len(fields)), fields)
+    columns = np.arange(len(values)) - np.repeat(np.cumsum(fields) - fields, fields)
+    corners = np.zeros((len(fields), 3), np.int64)
+    corners[rows, columns] = values
+    v_idx = _resolve_indices(corners[:, 0], len(positions))
+    vt_idx = _resolve_indices(corners[:, 1], len(texcoords)) if len(texcoords) else np.full(len(corners), -1)
+    vn_idx = _resolve_indices(corners[:, 2], len(vertex_normals)) if len(vertex_normals) else np.full(len(corners), -1)
+
+    # fan-triangulate every face: (first, i, i + 1) for i in 1..n-2
+    face_starts = np.concatenate([[0], np.cumsum(corner_counts)[:-1]])
+    tris_per_face = corner_counts - 2
+    face_of_tri = np.repeat(np.arange(len(f_lines)), tris_per_face)
+    step = np.arange(len(face_of_tri)) - np.repeat(np.cumsum(tris_per_face) - tris_per_face, tris_per_face) + 1
+    first = face_starts[face_of_tri]
+    tri_corners = np.stack([first, first + step, first + step + 1], axis=1)
+
+    return weld(positions, texcoords, vertex_normals, v_idx, vt_idx, vn_idx, tri_corners)
+
+
+def weld(positions, texcoords, vertex_normals, v_idx, vt_idx, vn_idx, tri_corners,
+         epsilon: float = WELD_EPSILON) -> ObjMesh:
+    """Merge coincident positions and identical corners into one indexed vertex list."""
+    quantized = np.round(positions / epsilon).astype(np.int64)
+    _, first_of_pos, pos_remap = np.unique(quantized, axis=0, return_index=True, return_inverse=True)
+    pos_remap = pos_remap.reshape(-1)
+    welded_v = pos_remap[v_idx]
+
+    # pack (position, uv, normal) into one int64 key so the corner dedupe is a 1D unique
+    vt_range = int(vt_idx.max()) + 2
+    vn_range = int(vn_idx.max()) + 2
+    keys = (welded_v.astype(np.int64) * vt_range + (vt_idx + 1)) * vn_range + (vn_idx + 1)
+    _, first_corner, corner_remap = np.unique(keys, return_index=True, return_inverse=True)
+    corner_remap = corner_remap.reshape(-1)
+
+    triangles = corner_remap[tri_corners]
+    degenerate = ((triangles[:, 0] == triangles[:, 1]) | (triangles[:, 1] == triangles[:, 2])
+                  | (triangles[:, 0] == triangles[:, 2]))
+    triangles = triangles[~degenerate].astype(np.uint32)
+
+    out_pos = positions[first_of_pos][welded_v[first_corner]].astype(np.float32)
+
+    corner_vt = vt_idx[first_corner]
+    out_uv = np.zeros((len(first_corner), 2), np.float32)
+    if len(texcoords):
+        has_uv = corner_vt >= 0
+        out_uv[has_uv] = texcoords[corner_vt[has_uv]]
+
+    corner_vn = vn_idx[first_corner]
+    if len(vertex_normals) and (corner_vn >= 0).all():
+        out_normals = vertex_normals[corner_vn].astype(np.float32)
+    else:
+        out_normals = smooth_normals(out_pos, triangles, welded_v[first_corner])
+
+    out_pos[:, 0] *= -1
+    out_normals[:, 0] *= -1
+    return ObjMesh(out_pos, out_normals, out_uv, triangles)
+
+
+def smooth_normals(positions, triangles, position_ids=None) -> np.ndarray:
+    """Area-weighted vertex normals; vertices sharing a position_id share a normal."""
+    if position_ids is None:
+        position_ids = np.arange(len(positions))
+    p = positions[triangles]
+    face_normals = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    ids = position_ids[triangles].reshape(-1)
+    count = int(position_ids.max()) + 1
+    accum = np.stack([np.bincount(ids, weights=np.repeat(face_normals[:, axis], 3), minlength=count)
+                      for axis in range(3)], axis=1)
+    normals = accum[position_ids]
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+
+
+# === Binary cache ===
+
+def _file_hash(path) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path_for(source) -> Path:
+    source = Path(source)
+    return source.with_name(source.name + CACHE_SUFFIX)
+
+
+def read_cache_header(cache_path: Path) -> Optional[dict]:
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            header_size = int.from_bytes(f.read(4), 'little')
+            header = json.loads(f.read(header_size))
+            header['header_size'] = header_size
+            return header
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(mesh: ObjMesh, cache_path: Path, source_info: dict):
+    """Layout: magic, header length, JSON header, then each array at an aligned offset.
+
+    Offsets in the header are relative to the (aligned) end of the header.
+    """
+    arrays = {'positions': mesh.positions, 'normals': mesh.normals,
+              'uvs': mesh.uvs, 'triangles': mesh.triangles}
+    entries, offset = {}, 0
+    for name, a in arrays.items():
+        entries[name] = [offset, a.dtype.str, list(a.shape)]
+        offset += _aligned(a.nbytes)
+    header = json.dumps({**source_info, 'arrays': entries}).encode()
+    data_start = _aligned(len(CACHE_MAGIC) + 4 + len(header))
+
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(data_start + entries[name][0])
+            f.write(np.ascontiguousarray(a).tobytes())
+    os.replace(tmp_path, cache_path)
+
+
+def _aligned(n: int) -> int:
+    return -(-n // CACHE_ALIGN) * CACHE_ALIGN
+
+
+def read_cache(cache_path: Path, header: dict) -> ObjMesh:
+    data = np.memmap(cache_path, dtype=np.uint8, mode='r')
+    data_start = _aligned(len(CACHE_MAGIC) + 4 + header['header_size'])
+    arrays = {}
+    for name, (offset, dtype, shape) in header['arrays'].items():
+        dtype = np.dtype(dtype)
+        start = data_start + offset
+        count = int(np.prod(shape))
+        arrays[name] = data[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+    return ObjMesh(**arrays)
+
+
+def load_obj(path, use_cache: bool = True) -> ObjMesh:
+    """Load an OBJ as an ObjMesh, going through the '.npmesh' cache when possible."""
+    path = Path(path)
+    if not use_cache:
+        return parse_obj(path)
+
+    stat = path.stat()
+    cache_path = cache_path_for(path)
+    header = read_cache_header(cache_path)
+    if header is not None and header.get('source_size') == stat.st_size:
+        if header.get('source_mtime_ns') == stat.st_mtime_ns:
+            return read_cache(cache_path, header)
+        source_hash = _file_hash(path)
+        if header.get('source_sha1') == source_hash:
+            mesh = read_cache(cache_path, header)
+            # same content, new mtime (copied/touched): refresh the header
+            mesh = ObjMesh(*(np.array(a) for a in (mesh.positions, mesh.normals, mesh.uvs, mesh.triangles)))
+            _try_write_cache(mesh, cache_path, stat, source_hash)
+            return mesh
+    else:
+        source_hash = None
+
+    mesh = parse_obj(path)
+    _try_write_cache(mesh, cache_path, stat, source_hash or _file_hash(path))
+    return mesh
+
+
+def _try_write_cache(mesh, cache_path, stat, source_hash):
+    try:
+        write_cache(mesh, cache_path, {'source_size': stat.st_size,
+                                       'source_mtime_ns': stat.st_mtime_ns,
+                                       'source_sha1': source_hash})
+    except OSError as e:
+        print('Could not write model cache', cache_path, ':', e)
+
+
+# === Panda3D geometry ===
+
+def mesh_to_geom_node(mesh: ObjMesh, name: str = 'obj_mesh', static: bool = True) -> GeomNode:
+    """Copy the arrays straight into a GeomVertexData/GeomTriangles without per-vertex Python."""
+    usage = Geom.UH_static if static else Geom.UH_dynamic
+    vdata = GeomVertexData(name, GeomVertexFormat.get_v3n3t2(), usage)
+    vdata.unclean_set_num_rows(mesh.vertex_count)
+    interleaved = np.empty((mesh.vertex_count, 8), np.float32)
+    interleaved[:, 0:3] = mesh.positions
+    interleaved[:, 3:6] = mesh.normals
+    interleaved[:, 6:8] = mesh.uvs
+    memoryview(vdata.modify_array(0)).cast('B')[:] = interleaved.tobytes()
+
+    prim = GeomTriangles(usage)
+    prim.set_index_type(Geom.NT_uint32)
+    indices = prim.modify_vertices()
+    indices.unclean_set_num_rows(mesh.triangle_count * 3)
+    memoryview(indices).cast('B')[:] = np.ascontiguousarray(mesh.triangles, np.uint32).tobytes()
+
+    geom = Geom(vdata)
+    geom.add_primitive(prim)
+    node = GeomNode(name)
+    node.add_geom(geom)
+    return node
+
+
+def load_obj_model(path, use_cache: bool = True) -> NodePath:
+    """Load an OBJ into a NodePath usable as Entity(model=...)."""
+    mesh = load_obj(path, use_cache)
+    return NodePath(mesh_to_geom_node(mesh, Path(path).stem))
@@ -0,0 +1,225 @@
+# profiler.py - Per-frame scope timing with an on-screen overlay and trace/CSV export
+#
+# FPS says that a frame got slower, not where the milliseconds went. The
+# FrameProfiler times named scopes every frame:
+#   * 'input', 'update', 'collision' and 'render submit' are measured by
+#     wrapping Panda3D's own tasks (dataLoop + eventManager, Ursina's update,
+#     collisionLoop, igLoop), so every entry script gets them for free,
+#   * game code adds its own scopes (e.g. 'physics', 'camera') with
+#     `with profiler.scope('physics'):`; scopes nest,
+#   * the last HISTORY_FRAMES frames of every scope are kept in a ring buffer
+#     for rolling percentiles (p50/p90/p99/max),
+#   * F3 toggles an overlay with those numbers; export_chrome_trace() writes
+#     the recorded events for chrome://tracing / Perfetto and export_csv()
+#     writes one row per frame.
+#
+# Usage:
+#   from profiler import enable_profiler, profiler_scope
+#   profiler = enable_profiler()          # after Ursina(), before app.run()
+#   ...
+#   with profiler_scope('physics'):       # anywhere; a no-op while disabled
+#       step_physics()
+#   profiler.export_chrome_trace('frame_trace.json')
+
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+from ursina import Entity, Text, application, camera, color
+
+HISTORY_FRAMES = 300        # frames kept for percentiles and CSV export
+TRACE_FRAMES = 600          # frames of individual events kept for the trace export
+OVERLAY_INTERVAL = 0.25     # seconds between overlay refreshes
+TOGGLE_KEY = 'f3'
+
+# Panda3D task -> scope it's timed under
+TASK_SCOPES = {
+    'dataLoop': 'input',
+    'eventManager': 'input',
+    'update': 'update',
+    'collisionLoop': 'collision',
+    'igLoop': 'render submit',
+}
+
+
+class FrameProfiler(Entity):
+    """Collects scope timings per frame; an Entity so it can draw its overlay and take input."""
+
+    def __init__(self, history: int = HISTORY_FRAMES, overlay: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.history = history
+        self.scope_names: List[str] = ['frame']
+        self._samples = np.zeros((history, 1))        # ms per (frame slot, scope)
+        self._frame_index = np.full(history, -1, np.int64)
+        self.frame = 0
+        self._frame_start = None
+        self._current: Dict[str, float] = {}          # ms per scope in the running frame
+        self._events = deque(maxlen=TRACE_FRAMES * 16)  # (name, start_ns, duration_ns, thread id)
+        self._t0 = time.perf_counter_ns()
+        self._wrapped = {}
+
+        self.overlay = Text(parent=camera.ui, position=(-0.87, 0.47), origin=(-0.5, 0.5), scale=0.75,
+                            color=color.white, background=True, enabled=overlay)
+        self._overlay_timer = 0.0
+
+    # === Timing ===
+
+    @contextmanager
+    def scope(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter_ns() - start)
+
+    def _record(self, name: str, start_ns: int, duration_ns: int):
+        self._current[name] = self._current.get(name, 0.0) + duration_ns / 1e6
+        self._events.append((name, start_ns, duration_ns, threading.get_ident()))
+
+    def _begin_frame(self, task):
+        now = time.perf_counter_ns()
+        if self._frame_start is not None:
+            self._current['frame'] = (now - self._frame_start) / 1e6
+            self._end_frame()
+        self._frame_start = now
+        return task.cont
+
+    def _end_frame(self):
+        for name in self._current:
+            if name not in self.scope_names:
+                self.scope_names.append(name)
+                self._samples = np.concatenate([self._samples, np.zeros((self.history, 1))], axis=1)
+        slot = self.frame % self.history
+        self._samples[slot] = 0
+        for name, ms in self._current.items():
+            self._samples[slot, self.scope_names.index(name)] = ms
+        self._frame_index[slot] = self.frame
+        self._events.append(('frame', self._frame_start, int(self._current['frame'] * 1e6), threading.get_ident()))
+        self._current = {}
+        self.frame += 1
+
+    def install(self, task_scopes: Optional[Dict[str, str]] = None):
+        """Time Panda3D's tasks under scope names, and start counting frames."""
+        task_mgr = application.base.taskMgr
+        for task_name, scope_name in (task_scopes or TASK_SCOPES).items():
+            for task in task_mgr.getTasksNamed(task_name):
+                if task_name in self._wrapped:
+                    continue
+                self._wrapped[task_name] = (task, task.get_function())
+                task.set_function(self._timed(task.get_function(), scope_name))
+        task_mgr.add(self._begin_frame, 'profiler-frame', sort=-100)
+
+    def uninstall(self):
+        for task, function in self._wrapped.values():
+            task.set_function(function)
+        self._wrapped.clear()
+        application.base.taskMgr.remove('profiler-frame')
+
+    def _timed(self, function, scope_name):
+        def timed(task):
+            with self.scope(scope_name):
+                return function(task)
+        return timed
+
+    # === Statistics ===
+
+    def samples(self, name: str) -> np.ndarray:
+        """Milliseconds spent in a scope for each of the recorded frames, oldest first."""
+        valid = self._frame_index >= 0
+        order = np.argsort(self._frame_index[valid])
+        return self._samples[valid, self.scope_names.index(name)][order]
+
+    def percentiles(self, name: str, q=(50, 90, 99)) -> Dict[str, float]:
+        values = self.samples(name)
+        if len(values) == 0:
+            return {}
+        stats = {f'p{p}': float(v) for p, v in zip(q, np.percentile(values, q))}
+        stats['max'] = float(values.max())
+        return stats
+
+    def histogram(self, name: str, bins: int = 20):
+        """(counts, edges) of the recorded frame times of a scope."""
+        return np.histogram(self.samples(name), bins=bins)
+
+    def report(self) -> str:
+        lines = [f'{"scope":<14}{"p50":>7}{"p90":>7}{"p99":>7}{"max":>7}  ms']
+        for name in self.scope_names:
+            stats = self.percentiles(name)
+            if stats:
+                lines.append(f'{name:<14}' + ''.join(f'{stats[k]:7.2f}' for k in ('p50', 'p90', 'p99', 'max')))
+        return '\n'.join(lines)
+
+    # === Overlay ===
+
+    def update(self):
+        if not self.overlay.enabled:
+            return
+        self._overlay_timer -= time.dt       # Ursina keeps the frame delta on the time module
+        if self._overlay_timer <= 0:
+            self._overlay_timer = OVERLAY_INTERVAL
+            self.overlay.text = self.report()
+
+    def input(self, key):
+        if key == TOGGLE_KEY:
+            self.overlay.enabled = not self.overlay.enabled
+
+    # === Export ===
+
+    def export_chrome_trace(self, path):
+        """Write recorded events in the Trace Event format (chrome://tracing, ui.perfetto.dev)."""
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self._t0) / 1000, 'dur': duration / 1000,
+                   'pid': pid, 'tid': tid, 'cat': 'frame' if name == 'frame' else 'scope'}
+                  for name, start, duration, tid in self._events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def export_csv(self, path):
+        """One row per recorded frame: frame number, then milliseconds per scope."""
+        valid = np.flatnonzero(self._frame_index >= 0)
+        valid = valid[np.argsort(self._frame_index[valid])]
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + [f'{name}_ms' for name in self.scope_names])
+            for slot in valid:
+                writer.writerow([int(self._frame_index[slot])] + [f'{v:.4f}' for v in self._samples[slot]])
+        return path
+
+    def on_destroy(self):
+        global _profiler
+        self.uninstall()
+        if _profiler is self:
+            _profiler = None
+
+
+_profiler: Optional[FrameProfiler] = None
+
+
+def get_profiler() -> Optional[FrameProfiler]:
+    return _profiler
+
+
+def enable_profiler(overlay: bool = True, history: int = HISTORY_FRAMES) -> FrameProfiler:
+    """Create the profiler (once) and hook it into the task loop; call after Ursina()."""
+    global _profiler
+    if _profiler is None:
+        _profiler = FrameProfiler(history=history, overlay=overlay)
+        _profiler.install()
+    return _profiler
+
+
+@contextmanager
+def profiler_scope(name: str):
+    """Time a block under name if the profiler is enabled; free otherwise."""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.scope(name):
+        yield
@@ -0,0 +1,196 @@
+# render_on_demand.py - Only render frames while something on screen changes
+#
+# Ursina renders every frame as fast as vsync allows, even while the scene
+# stands still, so an editor left open all day keeps the CPU and GPU busy.
+# RenderOnDemand checks once per frame whether anything could have changed
+# the image:
+#   * an entity's transform, render state (color, shader, ...) or enabled
+#     flag, or the set of entities itself; these are compared as Panda3D's
+#     interned TransformState/RenderState objects, so each check is cheap,
+#   * the window size, or the camera's lens,
+#   * a running animation (tweens.py, or an Ursina Sequence/animate()),
+#   * input, or a request_redraw() call.
+# With no change for a few frames, every window and offscreen buffer stops
+# rendering and the main loop is capped at `idle_fps`. Panda3D's loop can't
+# block on OS events, so this slow loop keeps polling input and running
+# update() until the next change. After `idle_timeout` seconds without input,
+# looping animations (idle head shakes, bobbing mouths) are frozen too, so an
+# untouched window really goes quiet; the next input thaws them.
+# `continuous = True` (or toggle_key) goes back to rendering every frame.
+#
+# Usage:
+#   from render_on_demand import enable_render_on_demand
+#   on_demand = enable_render_on_demand()           # after Ursina()
+#   on_demand.request_redraw()                      # after changing something it can't see
+#   on_demand.continuous = True                     # e.g. while profiling
+
+import os
+from typing import List, Optional
+
+from panda3d.core import ClockObject
+from ursina import Entity, application, camera, scene, window
+
+from engine_config import BENCHMARK_ENV
+from tweens import get_tween_engine
+
+IDLE_FPS = 20               # main loop rate while nothing changes (input polling)
+IDLE_TIMEOUT = 30.0         # seconds without input before looping animations freeze; None: never
+SETTLE_FRAMES = 2           # frames still rendered after the last change (shadow maps lag a frame)
+TOGGLE_KEY = 'f7'
+
+
+class RenderOnDemand(Entity):
+    def __init__(self, continuous: bool = False, idle_fps: float = IDLE_FPS,
+                 idle_timeout: Optional[float] = IDLE_TIMEOUT, toggle_key: Optional[str] = TOGGLE_KEY, **kwargs):
+        super().__init__(ignore_paused=True, **kwargs)
+        self.idle_fps = idle_fps
+        self.idle_timeout = idle_timeout
+        self.toggle_key = toggle_key
+        self.rendering = True
+        self.frozen = False
+        self._clock = ClockObject.get_global_clock()
+        self._clock_mode = self._clock.get_mode()
+        self._paused_outputs: List = []
+        self._paused_sequences: List = []
+        self._snapshot = None
+        self._view = None
+        self._mouse = None
+        self._frames_left = SETTLE_FRAMES
+        self._idle_time = 0.0
+        self.continuous = continuous
+
+    @property
+    def continuous(self) -> bool:
+        return self._continuous
+
+    @continuous.setter
+    def continuous(self, value: bool):
+        self._continuous = value
+        if value:
+            self._thaw()
+            self._set_rendering(True)
+
+    def request_redraw(self, frames: int = SETTLE_FRAMES):
+        self._frames_left = max(self._frames_left, frames)
+
+    # === Change detection ===
+
+    def _scene_changed(self) -> bool:
+        snapshot = [(e.node().get_transform(), e.node().get_state(), e.enabled) for e in scene.entities]
+        changed = snapshot != self._snapshot
+        self._snapshot = snapshot
+        return changed
+
+    def _view_changed(self) -> bool:
+        view = (tuple(window.size), camera.fov, camera.orthographic)
+        changed = view != self._view
+        self._view = view
+        return changed
+
+    def _animating(self) -> bool:
+        engine = get_tween_engine()
+        if engine is not None and engine.animating:
+            return True
+        return any(not s.paused and not s.finished for s in application.sequences)
+
+    def _activity(self):
+        """Input happened: wake up and restart the idle timeout."""
+        self._idle_time = 0.0
+        self._thaw()
+        self.request_redraw()
+
+    def input(self, key):
+        if self.toggle_key and key == self.toggle_key:
+            self.continuous = not self.continuous
+        self._activity()
+
+    def update(self):
+        watcher = getattr(application.base, 'mouseWatcherNode', None)    # none on offscreen buffers
+        position = tuple(watcher.get_mouse()) if watcher is not None and watcher.has_mouse() else None
+        if position != self._mouse:         # hover effects show up as entity changes
+            self._mouse = position
+            self._activity()
+
+        # evaluate every check so the snapshots stay current
+        changed = self._scene_changed() | self._view_changed() | (not self.frozen and self._animating())
+        if changed:
+            self.request_redraw()
+
+        if self.continuous:
+            return
+        self._idle_time += min(self._clock.get_dt(), 1 / self.idle_fps)    # loading hitches don't count
+        if self.idle_timeout is not None and self._idle_time > self.idle_timeout:
+            self._freeze()
+        if self._frames_left > 0:
+            self._frames_left -= 1
+            self._set_rendering(True)
+        else:
+            self._set_rendering(False)
+
+    # === Idle state ===
+
+    def _set_rendering(self, on: bool):
+        if on == self.rendering:
+            return
+        self.rendering = on
+        if on:
+            for output in self._paused_outputs:
+                output.set_active(True)
+            self._paused_outputs = []
+            self._clock.set_mode(self._clock_mode)
+        else:
+            # the main window and every offscreen buffer (shadow maps, filters)
+            engine = application.base.graphicsEngine
+            self._paused_outputs = [engine.get_window(i) for i in range(engine.get_num_windows())
+                                    if engine.get_window(i).is_active()]
+            for output in self._paused_outputs:
+                output.set_active(False)
+            self._clock_mode = self._clock.get_mode()
+            self._clock.set_mode(ClockObject.M_limited)
+            self._clock.set_frame_rate(self.idle_fps)
+
+    def _freeze(self):
+        if self.frozen:
+            return
+        self.frozen = True
+        engine = get_tween_engine()
+        if engine is not None:
+            engine.enabled = False
+        self._paused_sequences = [s for s in application.sequences if s.loop and not s.paused]
+        for sequence in self._paused_sequences:
+            sequence.pause()
+
+    def _thaw(self):
+        if not self.frozen:
+            return
+        self.frozen = False
+        engine = get_tween_engine()
+        if engine is not None:
+            engine.enabled = True
+        for sequence in self._paused_sequences:
+            sequence.resume()
+        self._paused_sequences = []
+
+    def on_destroy(self):
+        global _render_on_demand
+        self._thaw()
+        self._set_rendering(True)
+        if _render_on_demand is self:
+            _render_on_demand = None
+
+
+_render_on_demand: Optional[RenderOnDemand] = None
+
+
+def get_render_on_demand() -> Optional[RenderOnDemand]:
+    return _render_on_demand
+
+
+def enable_render_on_demand(**kwargs) -> RenderOnDemand:
+    """Create the render-on-demand controller (once); call after Ursina(). Benchmarks always render."""
+    global _render_on_demand
+    if _render_on_demand is None:
+        if os.environ.get(BENCHMARK_ENV):
+            kwargs['continuous'] = True
+        _render_on_demand = RenderOnDemand(**kwargs)
+    return _render_on_demand
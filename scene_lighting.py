@@ -0,0 +1,144 @@
+# scene_lighting.py - Scene-wide lighting inputs for the custom GLSL shaders
+#
+# The custom shaders (clientv0.py, text3d.py) read the uniforms
+#   light_dir, light_color, ambient_color, spec_color, shininess
+# Instead of calling set_shader_input for each of them on every entity, the
+# values live in one set of shared arrays (PTA_*) that is attached once to the
+# scene root. Every node under it inherits the same inputs, so nodes keep
+# identical render states and Panda3D can batch them; changing the light only
+# writes into the shared arrays, which the shaders see on the next draw without
+# any state change on the nodes.
+#
+# Usage:
+#   from scene_lighting import SceneLighting
+#   lighting = SceneLighting(light_dir=(-0.2, 0.8, -0.3), ambient_color=(0.2, 0.2, 0.2))
+#   lighting.light_color = (1.0, 0.9, 0.8)      # all consumers see it next frame
+#   lighting.follow(sun)                         # or track a DirectionalLight each frame
+
+from typing import Optional
+
+from panda3d.core import LVecBase3f, PTA_LVecBase3f, PTA_float
+from ursina import Entity, application
+
+DEFAULT_LIGHT_DIR = (-0.2, 0.8, -0.3)
+DEFAULT_LIGHT_COLOR = (1.0, 1.0, 1.0)
+DEFAULT_AMBIENT_COLOR = (0.2, 0.2, 0.2)
+DEFAULT_SPEC_COLOR = (1.0, 1.0, 1.0)
+DEFAULT_SHININESS = 64.0
+
+
+def _normalized(v) -> LVecBase3f:
+    v = LVecBase3f(*v)
+    length = v.length()
+    return v / length if length > 0 else v
+
+
+class SceneLighting(Entity):
+    """Owns the shared lighting inputs; an Entity so it can update them once per frame."""
+
+    def __init__(self, light_dir=DEFAULT_LIGHT_DIR, light_color=DEFAULT_LIGHT_COLOR,
+                 ambient_color=DEFAULT_AMBIENT_COLOR, spec_color=DEFAULT_SPEC_COLOR,
+                 shininess=DEFAULT_SHININESS, root=None, **kwargs):
+        global _scene_lighting
+        super().__init__(**kwargs)
+        self._light_dir = PTA_LVecBase3f.empty_array(1)
+        self._light_color = PTA_LVecBase3f.empty_array(1)
+        self._ambient_color = PTA_LVecBase3f.empty_array(1)
+        self._spec_color = PTA_LVecBase3f.empty_array(1)
+        self._shininess = PTA_float.empty_array(1)
+        self.source: Optional[Entity] = None
+
+        self.light_dir = light_dir
+        self.light_color = light_color
+        self.ambient_color = ambient_color
+        self.spec_color = spec_color
+        self.shininess = shininess
+
+        # attach once; from here on only the array contents change
+        self.root = root if root is not None else application.base.render
+        self.root.set_shader_inputs(
+            light_dir=self._light_dir,
+            light_color=self._light_color,
+            ambient_color=self._ambient_color,
+            spec_color=self._spec_color,
+            shininess=self._shininess,
+        )
+        _scene_lighting = self
+
+    @property
+    def light_dir(self):
+        return self._light_dir[0]
+
+    @light_dir.setter
+    def light_dir(self, value):
+        # direction from the surface towards the light, in the shaders' view space
+        self._light_dir[0] = _normalized(value)
+
+    @property
+    def light_color(self):
+        return self._light_color[0]
+
+    @light_color.setter
+    def light_color(self, value):
+        self._light_color[0] = LVecBase3f(*value[:3])
+
+    @property
+    def ambient_color(self):
+        return self._ambient_color[0]
+
+    @ambient_color.setter
+    def ambient_color(self, value):
+        self._ambient_color[0] = LVecBase3f(*value[:3])
+
+    @property
+    def spec_color(self):
+        return self._spec_color[0]
+
+    @spec_color.setter
+    def spec_color(self, value):
+        self._spec_color[0] = LVecBase3f(*value[:3])
+
+    @property
+    def shininess(self):
+        return self._shininess[0]
+
+    @shininess.setter
+    def shininess(self, value):
+        self._shininess[0] = float(value)
+
+    def follow(self, light: Optional[Entity]):
+        """Derive light_dir from a light entity (e.g. DirectionalLight) every frame; None stops."""
+        self.source = light
+
+    def update(self):
+        if self.source is None:
+            return
+        # the light shines along its forward axis; the shaders want surface->light in view space
+        base = application.base
+        self.light_dir = base.cam.get_relative_vector(base.render, -self.source.forward)
+
+    def on_destroy(self):
+        global _scene_lighting
+        for name in ('light_dir', 'light_color', 'ambient_color', 'spec_color', 'shininess'):
+            self.root.clear_shader_input(name)
+        if _scene_lighting is self:
+            _scene_lighting = None
+
+
+_scene_lighting: Optional[SceneLighting] = None
+
+
+def scene_lighting() -> SceneLighting:
+    """The scene's lighting state, created with the default values on first use."""
+    global _scene_lighting
+    if _scene_lighting is None:
+        _scene_lighting = SceneLighting()
+    return _scene_lighting
+
+
+def set_scene_lighting(**values) -> SceneLighting:
+    """Update (or create) the scene lighting; keys are the SceneLighting properties."""
+    lighting = scene_lighting()
+    for name, value in values.items():
+        setattr(lighting, name, value)
+    return lighting
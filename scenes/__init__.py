@@ -0,0 +1,27 @@
+# scenes - Scenes that can be built on demand, without importing the engine up front
+#
+# SCENES maps a scene name to the module that builds it. Importing this package
+# only reads that table: a scene module (and with it Ursina, Panda3D, NumPy and
+# the shaders it needs) is imported the first time build_scene() asks for it.
+# Every scene module provides build(app=None, **options) -> (app, scene).
+#
+# Usage:
+#   from scenes import build_scene, SCENES
+#   app, scene = build_scene('mario_head', render_mode='sdf')
+
+import importlib
+
+SCENES = {
+    'mario_head': 'scenes.mario_head',
+}
+
+
+def scene_module(name: str):
+    if name not in SCENES:
+        raise ValueError(f'unknown scene {name!r}, expected one of {", ".join(SCENES)}')
+    return importlib.import_module(SCENES[name])
+
+
+def build_scene(name: str, app=None, **options):
+    """Import the scene's module if needed and build the scene; returns (app, scene)."""
+    return scene_module(name).build(app=app, **options)
@@ -0,0 +1,125 @@
+# scenes/mario_head.py - The procedural Mario head (gamev0.py and its copies)
+#
+# The head is built from the PARTS table: spheres and a cube parented to one
+# root entity, lit by a shadowed directional light plus ambient fill. It idles
+# with a slow head shake and stretches its nose every few seconds (or on 's');
+# both are tweens in the shared tween engine (tweens.py).
+# How the parts are drawn is picked by render_mode:
+#   'parts'  - every part separately (one draw call each, plus the shadow pass)
+#   'merged' - one merged mesh, one draw call (merged_parts.py); the part
+#              entities stay as invisible transforms, so the nose stretch
+#              still animates them
+#   'sdf'    - one proxy cube raymarching the parts as a smooth signed distance
+#              field (sdf_parts.py); costs per covered pixel instead of per triangle
+# Only the module for the chosen mode gets imported.
+#
+# Usage:
+#   from scenes import build_scene
+#   app, scene = build_scene('mario_head', render_mode='sdf')
+#   app.run()
+
+import math
+
+from ursina import AmbientLight, DirectionalLight, Entity, camera, color, time, window
+from ursina.shaders import lit_with_shadows_shader
+
+from shader_cache import register_shader
+from shadow_manager import ShadowManager
+from tweens import tween_engine
+
+RENDER_MODES = ('parts', 'merged', 'sdf')
+DEFAULT_RENDER_MODE = 'merged'
+
+SKIN_COLOR = color.rgb(254, 209, 176)   # Peach skin tone (Mario’s face)
+HAT_COLOR = color.rgb(238, 28, 37)      # Mario’s hat red color
+
+# name: (parent, model, color, scale, position, rotation); parent None is the head root
+PARTS = {
+    'head': (None, 'sphere', SKIN_COLOR, 1.0, (0, 0, 0), (0, 0, 0)),
+    'nose': (None, 'sphere', SKIN_COLOR, 0.25, (0, 0.0, 0.5), (0, 0, 0)),
+    'ear_left': (None, 'sphere', SKIN_COLOR, 0.2, (0.5, 0.0, 0.0), (0, 0, 0)),
+    'ear_right': (None, 'sphere', SKIN_COLOR, 0.2, (-0.5, 0.0, 0.0), (0, 0, 0)),
+    'eye_left': (None, 'sphere', color.white, 0.15, (0.15, 0.1, 0.5), (0, 0, 0)),
+    'eye_right': (None, 'sphere', color.white, 0.15, (-0.15, 0.1, 0.5), (0, 0, 0)),
+    'pupil_left': ('eye_left', 'sphere', color.black, 0.05, (0, 0, 0.1), (0, 0, 0)),
+    'pupil_right': ('eye_right', 'sphere', color.black, 0.05, (0, 0, 0.1), (0, 0, 0)),
+    'hat_top': (None, 'sphere', HAT_COLOR, (1.2, 0.5, 1.2), (0, 0.3, 0), (0, 0, 0)),
+    'hat_brim': (None, 'cube', HAT_COLOR, (0.8, 0.1, 0.3), (0, 0.2, 0.35), (20, 0, 0)),
+    'moustache_center': (None, 'sphere', color.black, 0.1, (0, -0.15, 0.45), (0, 0, 0)),
+    'moustache_left': (None, 'sphere', color.black, 0.1, (0.15, -0.15, 0.43), (0, 0, 0)),
+    'moustache_right': (None, 'sphere', color.black, 0.1, (-0.15, -0.15, 0.43), (0, 0, 0)),
+}
+
+STRETCH_INTERVAL = 5.0      # seconds between automatic nose stretches
+STRETCH_FACTOR = 1.5
+SHAKE_DEGREES = 5.0
+SHAKE_PERIOD = 4 * math.pi  # seconds per head shake
+
+
+class MarioHeadScene(Entity):
+    """Builds the head, its lights and camera; animates it in update()."""
+
+    def __init__(self, render_mode: str = DEFAULT_RENDER_MODE, **kwargs):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f'unknown render mode {render_mode!r}, expected one of {", ".join(RENDER_MODES)}')
+        super().__init__(**kwargs)
+        window.title = "Mario64 Head - Ursina Engine"
+        window.color = color.black                  # Black background (like SM64 title screen)
+        window.fps_counter.enabled = False
+
+        # One shared program for every part; compiled once and its binary cached on disk
+        shader = register_shader(lit_with_shadows_shader)
+        self.mario = Entity(name='MarioHead')
+        self.parts = {}
+        for name, (parent, model, part_color, scale, position, rotation) in PARTS.items():
+            self.parts[name] = Entity(parent=self.parts[parent] if parent else self.mario, name=name, model=model,
+                                      color=part_color, scale=scale, position=position, rotation=rotation,
+                                      shader=shader)
+        self.nose = self.parts['nose']
+        self.nose_original_scale = self.nose.scale
+
+        self.render_mode = render_mode
+        self.renderer = None
+        if render_mode == 'merged':
+            from merged_parts import merge_parts
+            self.renderer = merge_parts(self.mario)
+        elif render_mode == 'sdf':
+            from sdf_parts import sdf_render_parts
+            self.renderer = sdf_render_parts(self.mario)
+
+        # Key light with shadows, placed above and in front of Mario, plus ambient fill
+        self.sun = DirectionalLight(shadows=True, color=color.white, position=(2, 2, -2))
+        self.sun.look_at(self.mario)
+        self.shadows = ShadowManager(self.sun, casters=[self.mario])
+        self.ambient = AmbientLight(color=color.rgb(64, 64, 64))
+
+        camera.position = (0, 0, -3)
+        camera.look_at(self.mario)
+
+        # Idle animation: slight oscillating rotation (like a slow head shake)
+        self.tweens = tween_engine()
+        self.shake = self.tweens.oscillate(self.mario, 'rotation_y', SHAKE_DEGREES, SHAKE_PERIOD)
+        self.stretch_timer = 0
+
+    def stretch_nose(self):
+        # out, then back once it has held for a moment; the second tween takes over when its delay ends
+        self.tweens.tween(self.nose, 'scale', self.nose_original_scale * STRETCH_FACTOR, duration=0.2)
+        self.tweens.tween(self.nose, 'scale', self.nose_original_scale, duration=0.2, delay=0.3)
+
+    def update(self):
+        self.stretch_timer += time.dt
+        if self.stretch_timer > STRETCH_INTERVAL:
+            self.stretch_nose()
+            self.stretch_timer = 0
+
+    def input(self, key):
+        if key == 's':
+            self.stretch_nose()
+
+
+def build(app=None, render_mode: str = DEFAULT_RENDER_MODE):
+    """Create the app (engine profile from HACKERPY64_PROFILE) unless given, then the scene."""
+    if app is None:
+        from engine_config import create_app
+        app = create_app()
+    return app, MarioHeadScene(render_mode=render_mode)
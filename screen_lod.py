@@ -0,0 +1,118 @@
+# screen_lod.py - Runtime LOD switching by projected screen size, with hysteresis
+#
+# Panda3D's LODNode switches by camera distance, so the same model pops at
+# the same distance whatever the field of view or its scale, and it flips back
+# and forth when something hovers at the switch distance. LODManager instead:
+#   * estimates every registered entity's height on screen (bounding sphere
+#     radius over distance and the camera's vertical fov) in one NumPy pass,
+#   * picks the level whose screen_sizes threshold it's above, but only moves
+#     to a coarser level once it's `hysteresis` below the threshold and back to
+#     a finer one once it's `hysteresis` above it,
+#   * swaps entity.model only when the level changes. Each entity gets its own
+#     NodePaths per level that share the Geoms, so identical heads share one
+#     copy of every level's vertex data.
+#
+# Usage:
+#   from screen_lod import LODManager, load_lod_models
+#   lod_manager = LODManager()
+#   lod_manager.add(head, load_lod_models('marioshead.obj'))
+#   lod_manager.add(other_head, load_lod_models('marioshead.obj'))   # shares the Geoms
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from panda3d.core import NodePath
+from ursina import Entity, application, camera
+
+from mesh_simplify import LOD_RATIOS, load_obj_lods
+from obj_loader import mesh_to_geom_node
+
+# Screen height fractions below which the next coarser level is used; one
+# threshold per switch (len(levels) - 1 of them).
+LOD_SCREEN_SIZES = (0.3, 0.12, 0.05)
+HYSTERESIS = 0.15
+
+_lod_models: Dict[tuple, List[NodePath]] = {}
+
+
+def load_lod_models(path, ratios: Sequence[float] = LOD_RATIOS) -> List[NodePath]:
+    """One model per LOD level for an OBJ; later calls for the same file share the Geoms."""
+    key = (str(path), tuple(ratios))
+    if key not in _lod_models:
+        name = Path(path).name
+        _lod_models[key] = [NodePath(mesh_to_geom_node(mesh, f'{name}_lod{i}'))
+                            for i, mesh in enumerate(load_obj_lods(path, ratios))]
+    return [model.copy_to(NodePath()) for model in _lod_models[key]]
+
+
+class LODManager(Entity):
+    """Picks a level for all registered entities once per frame."""
+
+    def __init__(self, screen_sizes: Sequence[float] = LOD_SCREEN_SIZES, hysteresis: float = HYSTERESIS, **kwargs):
+        super().__init__(**kwargs)
+        self.screen_sizes = tuple(screen_sizes)
+        self.hysteresis = hysteresis
+        self.entities: List[Entity] = []
+        self.models: List[List[NodePath]] = []
+        self._radius = np.zeros(0)             # bounding sphere radius per entity, model space
+        self._thresholds = np.zeros((0, 0))    # (entities, max switches), padded with 0
+        self.levels = np.zeros(0, np.int64)
+
+    def add(self, entity: Entity, models: List[NodePath], screen_sizes: Optional[Sequence[float]] = None):
+        """Register entity with its levels (finest first); it starts at the finest level."""
+        self.remove(entity)
+        sizes = tuple(screen_sizes or self.screen_sizes)[:len(models) - 1]
+        bounds = models[0].get_tight_bounds()
+        radius = (bounds[1] - bounds[0]).length() / 2 if bounds else 1.0
+
+        switches = max(self._thresholds.shape[1], len(sizes))
+        thresholds = np.zeros((len(self.entities) + 1, switches))
+        thresholds[:-1, :self._thresholds.shape[1]] = self._thresholds
+        thresholds[-1, :len(sizes)] = sizes
+        self._thresholds = thresholds
+        self._radius = np.append(self._radius, radius)
+        self.levels = np.append(self.levels, 0)
+        self.entities.append(entity)
+        self.models.append(models)
+        entity.model = models[0]
+
+    def remove(self, entity: Entity):
+        if entity not in self.entities:
+            return
+        i = self.entities.index(entity)
+        del self.entities[i], self.models[i]
+        self._radius = np.delete(self._radius, i)
+        self._thresholds = np.delete(self._thresholds, i, axis=0)
+        self.levels = np.delete(self.levels, i)
+
+    def screen_sizes_now(self) -> np.ndarray:
+        """Projected height of each entity's bounding sphere as a fraction of the screen."""
+        cam = camera.world_position
+        positions = np.array([e.world_position for e in self.entities], dtype=np.float64).reshape(-1, 3)
+        scales = np.array([max(abs(s) for s in e.world_scale) for e in self.entities], dtype=np.float64)
+        distance = np.linalg.norm(positions - np.array(cam), axis=1)
+        if camera.orthographic:
+            return self._radius * scales * 2 / camera.fov
+        half_fov = np.radians(application.base.camLens.get_fov()[1]) / 2
+        return self._radius * scales / (np.maximum(distance, 1e-6) * np.tan(half_fov))
+
+    def update(self):
+        if not self.entities:
+            return
+        size = self.screen_sizes_now()[:, None]
+        # level = number of thresholds the size is below; going coarser must clear
+        # the threshold by the margin, and so must going back to finer
+        coarser = (size < self._thresholds * (1 - self.hysteresis)).sum(axis=1)
+        finer = (size < self._thresholds * (1 + self.hysteresis)).sum(axis=1)
+        levels = np.where(coarser > self.levels, coarser, np.where(finer < self.levels, finer, self.levels))
+
+        for i in np.flatnonzero(levels != self.levels):
+            entity = self.entities[i]
+            if entity:
+                entity.model = self.models[i][levels[i]]
+        self.levels = levels
+
+    def on_destroy(self):
+        self.entities.clear()
+        self.models.clear()
@@ -0,0 +1,352 @@
+# sdf_parts.py - Raymarched signed-distance-field rendering of sphere/cube part models
+#
+# The procedural heads are unions of scaled spheres and cubes, which is exactly
+# what a small SDF describes. SDFParts draws such a part hierarchy without any
+# tessellated geometry:
+#   * the part table (inverse transform, shape, color of every part) is read
+#     from the part entities every frame, so their animations (the nose
+#     stretch) keep working, just like merged_parts.py,
+#   * a single proxy cube around the parts is drawn with a fragment shader that
+#     sphere-traces the smooth union of the parts (`blend` rounds the seams),
+#     shades the hit with the same lighting and shadow-map lookup as
+#     lit_with_shadows_shader and writes the real depth, so it composes with
+#     the rest of the scene and casts exact shadows,
+#   * the rays are unprojected from the fragment's clip position, so the same
+#     shader works for the perspective camera and the orthographic shadow camera,
+#   * distance()/raycast() evaluate the same SDF on the CPU with NumPy, for
+#     picking and for checking the shader against.
+# The cost scales with the pixels the head covers instead of its triangle count.
+#
+# Usage:
+#   from sdf_parts import sdf_render_parts
+#   sdf_head = sdf_render_parts(mario, blend=0.03)    # after all parts are created
+#   hit = sdf_head.mouse_raycast()                     # HitInfo; hit.entity is the part
+#   destroy(sdf_head)                                  # back to separately drawn parts
+
+from typing import List, Optional
+
+import numpy as np
+from panda3d.core import CullFaceAttrib, Mat4, Point2, Point3, PTA_LMatrix4f, PTA_LVecBase4f, Vec4
+from ursina import Entity, Vec3, application, camera, mouse, scene, window
+from ursina.hit_info import HitInfo
+from ursina.shaders import lit_with_shadows_shader
+
+from shader_cache import get_shader
+
+MAX_PARTS = 32
+BLEND = 0.03            # smooth-union radius, in root units
+BOX_PADDING = 1.3       # proxy cube size over the parts' largest extent (room for the nose stretch)
+MAX_STEPS = 96
+HIT_EPSILON = 5e-4
+
+SHAPES = {'sphere': 0, 'cube': 1}
+
+sdf_vertex_shader = '''#version 150
+uniform mat4 p3d_ModelViewProjectionMatrix;
+in vec4 vertex;
+out vec4 clip_pos;
+
+void main() {
+    clip_pos = p3d_ModelViewProjectionMatrix * vertex;
+    gl_Position = clip_pos;
+}
+'''
+
+sdf_fragment_shader = f'''#version 150
+uniform struct {{
+    vec4 position;
+    vec3 color;
+    vec3 attenuation;
+    vec3 spotDirection;
+    float spotCosCutoff;
+    float spotExponent;
+    sampler2DShadow shadowMap;
+    mat4 shadowViewMatrix;
+}} p3d_LightSource[1];
+
+const float M_PI = 3.141592653589793;
+const int MAX_STEPS = {MAX_STEPS};
+const float HIT_EPSILON = {HIT_EPSILON};
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewProjectionMatrixInverse;
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform vec4 p3d_ColorScale;
+uniform vec4 shadow_color;
+
+uniform mat4 part_inverse[{MAX_PARTS}];
+uniform vec4 part_color[{MAX_PARTS}];
+uniform vec4 part_info[{MAX_PARTS}];     // x: shape (0 sphere, 1 cube, -1 off), y: distance scale
+uniform int part_count;
+uniform float blend;
+
+in vec4 clip_pos;
+out vec4 p3d_FragColor;
+
+float part_distance(int i, vec3 p) {{
+    vec3 q = (part_inverse[i] * vec4(p, 1)).xyz;
+    float d;
+    if (part_info[i].x < 0.5) {{
+        d = length(q) - 0.5;
+    }} else {{
+        vec3 b = abs(q) - 0.5;
+        d = length(max(b, 0.0)) + min(max(b.x, max(b.y, b.z)), 0.0);
+    }}
+    return d * part_info[i].y;
+}}
+
+float scene_distance(vec3 point) {{
+    float dist = 1e10;
+    for (int i = 0; i < part_count; ++i) {{
+        if (part_info[i].x < 0.0) continue;
+        float di = part_distance(i, point);
+        // quadratic smooth minimum; min() keeps the 1e10 start exact
+        float h = max(blend - abs(dist - di), 0.0) / blend;
+        dist = min(dist, di) - h * h * blend * 0.25;
+    }}
+    return dist;
+}}
+
+vec4 scene_color(vec3 p) {{
+    // the parts' colors blended over the same smooth seams
+    float d = 1e10;
+    vec4 color = vec4(0);
+    for (int i = 0; i < part_count; ++i) {{
+        if (part_info[i].x < 0.0) continue;
+        float di = part_distance(i, p);
+        color = mix(color, part_color[i], clamp(0.5 + 0.5 * (d - di) / blend, 0.0, 1.0));
+        d = min(d, di);
+    }}
+    return color;
+}}
+
+vec3 scene_normal(vec3 p) {{
+    const vec2 k = vec2(1, -1) * HIT_EPSILON;
+    return normalize(k.xyy * scene_distance(p + k.xyy) + k.yyx * scene_distance(p + k.yyx)
+                   + k.yxy * scene_distance(p + k.yxy) + k.xxx * scene_distance(p + k.xxx));
+}}
+
+void main() {{
+    // the proxy cube draws its back faces: the ray runs from the near plane to this fragment
+    vec2 ndc = clip_pos.xy / clip_pos.w;
+    vec4 near = p3d_ModelViewProjectionMatrixInverse * vec4(ndc, -1, 1);
+    vec4 exit = p3d_ModelViewProjectionMatrixInverse * vec4(ndc, clip_pos.z / clip_pos.w, 1);
+    vec3 origin = near.xyz / near.w;
+    vec3 ray = exit.xyz / exit.w - origin;
+    float t_max = length(ray);
+    vec3 direction = ray / t_max;
+
+    float t = 0.0;
+    bool hit = false;
+    for (int step = 0; step < MAX_STEPS && t < t_max; ++step) {{
+        float d = scene_distance(origin + direction * t);
+        if (d < HIT_EPSILON) {{
+            hit = true;
+            break;
+        }}
+        t += d;
+    }}
+    if (!hit) discard;
+
+    vec3 p = origin + direction * t;
+    vec4 surface_color = scene_color(p);
+    vec4 hit_clip = p3d_ModelViewProjectionMatrix * vec4(p, 1);
+    gl_FragDepth = 0.5 * hit_clip.z / hit_clip.w + 0.5;
+
+    // lighting as in lit_with_shadows_shader
+    vec3 vpos = vec3(p3d_ModelViewMatrix * vec4(p, 1));
+    vec3 N = normalize(p3d_NormalMatrix * scene_normal(p));
+    p3d_FragColor = surface_color * p3d_ColorScale;
+    for (int i = 0; i < p3d_LightSource.length(); ++i) {{
+        vec3 diff = p3d_LightSource[i].position.xyz - vpos * p3d_LightSource[i].position.w;
+        vec3 L = normalize(diff);
+        float NdotL = clamp(dot(N, L), 0.001, 1.0);
+        vec3 color = NdotL * p3d_LightSource[i].color / M_PI;
+        const float bias = 0.001;
+
+        vec4 shadowcoord = p3d_LightSource[i].shadowViewMatrix * vec4(vpos, 1);
+        shadowcoord.z += bias;
+
+        vec3 converted_shadow_color = (vec3(1.,1.,1.) - shadow_color.rgb) * shadow_color.a;
+        p3d_FragColor.rgb *= p3d_LightSource[i].color.rgb;
+        p3d_FragColor.rgb += textureProj(p3d_LightSource[i].shadowMap, shadowcoord) * converted_shadow_color;
+        p3d_FragColor.rgb += color - converted_shadow_color;
+    }}
+}}
+'''
+
+
+def sdf_shader():
+    return get_shader(vertex=sdf_vertex_shader, fragment=sdf_fragment_shader, name='sdf_parts',
+                      default_input={'shadow_color': lit_with_shadows_shader.default_input['shadow_color']})
+
+
+def _sdf_parts(root: Entity) -> List[Entity]:
+    parts = []
+    for child in root.children:
+        if isinstance(child, SDFParts):
+            continue
+        if child.model is not None:
+            parts.append(child)
+        parts.extend(_sdf_parts(child))
+    return parts
+
+
+def _shape_of(part: Entity) -> int:
+    name = getattr(part.model, 'name', None)
+    if name not in SHAPES:
+        raise ValueError(f'{part.name}: SDF rendering supports {", ".join(SHAPES)} models, not {name!r}')
+    return SHAPES[name]
+
+
+class SDFParts(Entity):
+    """Draws root's sphere/cube parts as one raymarched SDF and follows their transforms."""
+
+    def __init__(self, root: Entity, parts: Optional[List[Entity]] = None, blend: float = BLEND, **kwargs):
+        parts = list(parts) if parts is not None else _sdf_parts(root)
+        if len(parts) > MAX_PARTS:
+            raise ValueError(f'{len(parts)} parts, SDF rendering supports at most {MAX_PARTS}')
+        shapes = np.array([_shape_of(part) for part in parts], np.float64)
+
+        # a uniformly scaled cube keeps the SDF space undistorted, so distances stay marchable
+        bounds = root.get_tight_bounds(root)
+        center = (bounds[0] + bounds[1]) / 2 if bounds else Point3(0, 0, 0)
+        size = max(bounds[1] - bounds[0]) * BOX_PADDING if bounds else 1
+        super().__init__(parent=root, model='cube', position=center, scale=size, shader=sdf_shader(), **kwargs)
+        self.set_attrib(CullFaceAttrib.make_reverse())
+        self.root = root
+        self.parts = parts
+        self.blend = blend
+        self.shapes = shapes
+        self.inverse = np.zeros((len(parts), 4, 4))    # SDF space -> part's unit shape space (row vectors)
+        self.distance_scale = np.ones(len(parts))
+        self.colors = np.ones((len(parts), 4))
+
+        self._inverse = PTA_LMatrix4f([Mat4.ident_mat()] * MAX_PARTS)
+        self._colors = PTA_LVecBase4f([Vec4(1)] * MAX_PARTS)
+        self._info = PTA_LVecBase4f([Vec4(-1, 1, 0, 0)] * MAX_PARTS)
+        self.set_shader_input('part_inverse', self._inverse)
+        self.set_shader_input('part_color', self._colors)
+        self.set_shader_input('part_info', self._info)
+        self.set_shader_input('part_count', len(parts))
+
+        for part in parts:
+            part.visible = False
+        self.update()
+
+    @property
+    def blend(self):
+        return self._blend
+
+    @blend.setter
+    def blend(self, value):
+        # blend is in root units; the shader works in the proxy cube's space
+        self._blend = value
+        self.set_shader_input('blend', max(value / self.scale_x, 1e-5))
+
+    def update(self):
+        for i, part in enumerate(self.parts):
+            if not part:
+                self._info[i] = Vec4(-1, 1, 0, 0)
+                continue
+            mat = Mat4(part.get_mat(self))
+            # rows of the upper 3x3 are the scaled part axes: the smallest one bounds the distance
+            axes = np.array(mat, dtype=np.float64).reshape(4, 4)[:3, :3]
+            self.distance_scale[i] = np.linalg.norm(axes, axis=1).min()
+            mat.invert_in_place()
+            self.inverse[i] = np.array(mat, dtype=np.float64).reshape(4, 4)
+            self.colors[i] = tuple(part.color)
+            self._inverse[i] = mat
+            self._colors[i] = Vec4(*part.color)
+            self._info[i] = Vec4(self.shapes[i] if part.enabled else -1, self.distance_scale[i], 0, 0)
+
+    # === CPU evaluation (SDF space = this entity's space) ===
+
+    def part_distances(self, points) -> np.ndarray:
+        """(parts, N) signed distance from every point to every part, in SDF space."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+        q = np.einsum('nj,pjk->pnk', homogeneous, self.inverse)[..., :3]
+        sphere = np.linalg.norm(q, axis=2) - 0.5
+        b = np.abs(q) - 0.5
+        cube = np.linalg.norm(np.maximum(b, 0), axis=2) + np.minimum(b.max(axis=2), 0)
+        return np.where(self.shapes[:, None] == 0, sphere, cube) * self.distance_scale[:, None]
+
+    def distance(self, points, return_part: bool = False):
+        """Smooth-union distance (as in the shader) for (N, 3) points in SDF space.
+
+        With return_part, also the index of the nearest part per point.
+        """
+        per_part = self.part_distances(points)
+        enabled = np.array([bool(part) and part.enabled for part in self.parts], bool)
+        k = max(self._blend / self.scale_x, 1e-5)
+        d = np.full(per_part.shape[1], 1e10)
+        for di in per_part[enabled]:
+            h = np.maximum(k - np.abs(d - di), 0) / k
+            d = np.minimum(d, di) - h * h * k / 4
+        if return_part:
+            return d, np.where(enabled[:, None], per_part, np.inf).argmin(axis=0)
+        return d
+
+    def raycast(self, origin, direction, distance=9999) -> HitInfo:
+        """Sphere-trace a world-space ray against the SDF; hit.entity is the nearest part."""
+        direction = Vec3(*direction).normalized()
+        o = np.array(self.get_relative_point(scene, Vec3(*origin)), dtype=np.float64)
+        v = np.array(self.get_relative_vector(scene, direction), dtype=np.float64)
+        world_per_local = 1 / np.linalg.norm(v)
+        v *= world_per_local
+        max_t = distance / world_per_local
+
+        # start where the ray enters the proxy cube, stop where it leaves it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (-0.5 - o) / v
+            t1 = (0.5 - o) / v
+        t_near = np.nan_to_num(np.minimum(t0, t1), nan=-np.inf).max()
+        t_far = min(np.nan_to_num(np.maximum(t0, t1), nan=np.inf).min(), max_t)
+        t = max(t_near, 0.0)
+        while t <= t_far:
+            d = self.distance(o + v * t)[0]
+            if d < HIT_EPSILON:
+                return self._hit_info(o + v * t, t * world_per_local)
+            t += d
+        return HitInfo(hit=False, distance=distance)
+
+    def _hit_info(self, p, distance) -> HitInfo:
+        e = HIT_EPSILON
+        offsets = np.array([[e, -e, -e], [-e, -e, e], [-e, e, -e], [e, e, e]])
+        normal = (offsets * self.distance(p + offsets)[:, None]).sum(axis=0)
+        normal /= np.linalg.norm(normal) or 1
+        _, part = self.distance(p, return_part=True)
+        entity = self.parts[int(part[0])]
+        point = Vec3(*p)
+        return HitInfo(
+            hit=True,
+            entity=entity,
+            entities=[entity],
+            distance=float(distance),
+            point=Vec3(*entity.get_relative_point(self, point)),
+            world_point=Vec3(*scene.get_relative_point(self, point)),
+            normal=Vec3(*normal),
+            world_normal=Vec3(*scene.get_relative_vector(self, Vec3(*normal)).normalized()),
+        )
+
+    def mouse_raycast(self, distance=9999) -> HitInfo:
+        """The part under the cursor, from the camera."""
+        near, far = Point3(), Point3()
+        lens_point = Point2(mouse.x * 2 / window.aspect_ratio, mouse.y * 2)
+        if not camera.lens.extrude(lens_point, near, far):
+            return HitInfo(hit=False, distance=distance)
+        origin = scene.get_relative_point(application.base.cam, near)
+        direction = scene.get_relative_vector(application.base.cam, far - near)
+        return self.raycast(origin, direction, distance)
+
+    def on_destroy(self):
+        for part in self.parts:
+            if part:
+                part.visible = True
+
+
+def sdf_render_parts(root: Entity, parts: Optional[List[Entity]] = None, blend: float = BLEND) -> SDFParts:
+    """Draw every sphere/cube part under root (or the given ones) as one raymarched SDF."""
+    return SDFParts(root, parts, blend)
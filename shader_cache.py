@@ -0,0 +1,151 @@
+# shader_cache.py - Shared shader registry with on-disk program binary cache
+#
+# Every entry script used to build its own Shader objects from inline source,
+# so identical programs were created (and compiled) again by each script and
+# every launch paid the GLSL compile/link cost on the first frame.
+#
+# The registry:
+#   * deduplicates shaders by their source text (after #include expansion),
+#     so every caller asking for the same program gets the same Shader object,
+#   * writes each unique program to the source cache dir and loads it through
+#     Panda3D's Shader.load, which lets Panda3D's BamCache keep the linked
+#     program binary (model-cache-compiled-shaders) for later launches,
+#   * compiles every registered program once per graphics context on request
+#     (precompile_shaders) and prints the time each one took.
+#
+# Usage:
+#   from shader_cache import get_shader, register_shader, precompile_shaders
+#   my_shader = get_shader(vertex=vertex_src, fragment=fragment_src, name='title')
+#   lit = register_shader(lit_with_shadows_shader)   # adopt an existing Ursina shader
+#   ...
+#   precompile_shaders()    # after the scene is built, before app.run()
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from panda3d.core import BamCache, Filename, Shader as Panda3dShader
+from ursina import Shader
+
+try:
+    from ursina.shader import do_shader_includes
+except ImportError:     # older Ursina without GLSL #include support
+    def do_shader_includes(source):
+        return source
+
+SHADER_CACHE_DIR = Path(os.environ.get(
+    'HACKERPY64_SHADER_CACHE', Path.home() / '.cache' / 'hackerpy64' / 'shaders'))
+
+_STAGE_EXTENSIONS = (('vertex', 'vert'), ('fragment', 'frag'), ('geometry', 'geom'))
+
+
+class ShaderRegistry:
+    def __init__(self, cache_dir: Path = SHADER_CACHE_DIR, use_binary_cache: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.use_binary_cache = use_binary_cache
+        self.shaders: Dict[str, Shader] = {}
+        self._prepared: Set[Tuple[str, int]] = set()   # (source key, id of gsg)
+        if use_binary_cache:
+            # Panda3D's model cache is on by default; this makes it keep linked
+            # GLSL programs too (only for shaders that come from Shader.load).
+            BamCache.get_global_ptr().set_cache_compiled_shaders(True)
+
+    @staticmethod
+    def source_key(language, vertex: str, fragment: str, geometry: str = '') -> str:
+        h = hashlib.sha1()
+        for part in (str(language), vertex or '', fragment or '', geometry or ''):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()[:16]
+
+    def get(self, vertex: str, fragment: str, geometry: str = '', name: Optional[str] = None,
+            language=Shader.GLSL, default_input: Optional[dict] = None) -> Shader:
+        """Return the shared Shader for these sources, creating it on first request."""
+        vertex = do_shader_includes(vertex)
+        fragment = do_shader_includes(fragment)
+        geometry = do_shader_includes(geometry) or ''
+        key = self.source_key(language, vertex, fragment, geometry)
+        if key in self.shaders:
+            shader = self.shaders[key]
+            if default_input:
+                shader.default_input = {**default_input, **shader.default_input}
+            return shader
+
+        shader = Shader(name=name or f'shader_{key}', language=language,
+                        vertex=vertex, fragment=fragment, geometry=geometry,
+                        default_input=dict(default_input or {}))
+        shader._shader = self._load(key, language, vertex, fragment, geometry)
+        shader.compiled = True
+        self.shaders[key] = shader
+        return shader
+
+    def register(self, shader: Shader) -> Shader:
+        """Adopt an existing Ursina Shader; returns the registry's copy of that program."""
+        return self.get(shader.vertex, shader.fragment, shader.geometry, name=shader.name,
+                        language=shader.language, default_input=shader.default_input)
+
+    def _load(self, key, language, vertex, fragment, geometry) -> Panda3dShader:
+        if language != Shader.GLSL or not self.use_binary_cache:
+            return Panda3dShader.make(language, vertex, fragment, geometry)
+
+        # Shader.load (unlike Shader.make) goes through the BamCache, so the
+        # program binary gets stored and reused. Keying the files by source hash
+        # means a changed source can never pick up a stale binary.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        paths = {}
+        for stage, ext in _STAGE_EXTENSIONS:
+            source = {'vertex': vertex, 'fragment': fragment, 'geometry': geometry}[stage]
+            if not source:
+                paths[stage] = Filename()
+                continue
+            path = self.cache_dir / f'{key}.{ext}'
+            if not path.exists() or path.read_text() != source:
+                path.write_text(source)
+            paths[stage] = Filename.from_os_specific(str(path))
+
+        shader = Panda3dShader.load(language, paths['vertex'], paths['fragment'], paths['geometry'])
+        if shader is None:
+            print(f'[shader_cache] could not load {key} from {self.cache_dir}, compiling from source')
+            return Panda3dShader.make(language, vertex, fragment, geometry)
+        return shader
+
+    def precompile(self, gsg=None):
+        """Compile every registered program on the given (default: main window) context now.
+
+        Programs already prepared on that context are skipped. Must be called
+        from the thread that owns the GL context (the main thread unless a
+        threaded draw model is configured).
+        """
+        if gsg is None:
+            from ursina import application
+            gsg = application.base.win.get_gsg()
+        total = 0.0
+        for key, shader in self.shaders.items():
+            if (key, id(gsg)) in self._prepared:
+                continue
+            t0 = time.perf_counter()
+            shader._shader.prepare_now(gsg.get_prepared_objects(), gsg)
+            elapsed = (time.perf_counter() - t0) * 1000
+            total += elapsed
+            self._prepared.add((key, id(gsg)))
+            print(f'[shader_cache] {shader.name}: {elapsed:.1f} ms')
+        return total
+
+
+shader_registry = ShaderRegistry()
+
+
+def get_shader(vertex: str, fragment: str, geometry: str = '', name: Optional[str] = None,
+               language=Shader.GLSL, default_input: Optional[dict] = None) -> Shader:
+    return shader_registry.get(vertex, fragment, geometry, name, language, default_input)
+
+
+def register_shader(shader: Shader) -> Shader:
+    return shader_registry.register(shader)
+
+
+def precompile_shaders(gsg=None) -> float:
+    """Compile all registered shaders now; returns the total time in milliseconds."""
+    return shader_registry.precompile(gsg)
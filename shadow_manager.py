@@ -0,0 +1,223 @@
+# shadow_manager.py - Fitted shadow frustum, adaptive shadow map size and caster-only LODs
+#
+# Ursina's DirectionalLight fits its orthographic shadow camera to the whole
+# scene once, when shadows are switched on, and keeps a fixed 1024x1024 map.
+# Most of the map then covers empty space, and every entity is drawn into it
+# at full detail. ShadowManager, once per frame:
+#   * fits the shadow lens to the bounding spheres of the registered casters
+#     (only those in the camera's view, by default), in the light's space,
+#     with the film offset snapped to whole texels so shadow edges don't
+#     shimmer as things move; Panda3D then culls everything outside it from
+#     the shadow pass,
+#   * picks the shadow map size: about `texels_per_pixel` shadow texels per
+#     screen pixel the casters cover, rounded to a power of two and kept inside
+#     the quality preset's budget. A new size must hold for RESIZE_DELAY seconds
+#     before the map is reallocated,
+#   * draws casters that have a caster LOD with that (coarser) model in the
+#     shadow pass and their real model only in the main view.
+#
+# Usage:
+#   from shadow_manager import ShadowManager
+#   sun = DirectionalLight(shadows=True)
+#   shadows = ShadowManager(sun, casters=[mario], quality='medium')
+#   shadows.set_caster_lod(head, low_poly_model)     # shadow pass only
+#   shadows.quality = 'low'                           # e.g. from a settings menu
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+from panda3d.core import BitMask32, BoundingSphere, NodePath
+from ursina import Entity, application, camera, scene, window
+
+# ursina.lights.DirectionalLight gives its shadow camera this mask
+SHADOW_CAMERA_MASK = BitMask32.bit(0)
+RESIZE_DELAY = 0.5      # seconds a new shadow map size has to be wanted before reallocating
+
+
+@dataclass(frozen=True)
+class ShadowQuality:
+    min_resolution: int
+    max_resolution: int
+    texels_per_pixel: float
+
+
+QUALITY = {
+    'low': ShadowQuality(256, 1024, 0.5),
+    'medium': ShadowQuality(512, 2048, 1.0),
+    'high': ShadowQuality(1024, 4096, 1.5),
+}
+
+
+def _next_power_of_two(value: float) -> int:
+    return 1 << max(0, int(np.ceil(np.log2(max(value, 1)))))
+
+
+class ShadowManager(Entity):
+    def __init__(self, light, casters: Sequence[Entity] = (), quality: str = 'medium',
+                 cull_to_view: bool = True, margin: float = 0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.light = light
+        self.lens = light._light.get_lens()
+        self.light_np = light.find('+DirectionalLight')     # the lens node under the Ursina entity
+        self.casters: List[Entity] = list(casters)
+        self.quality = quality
+        self.cull_to_view = cull_to_view
+        self.margin = margin                          # relative padding around the fitted casters
+        self.resolution = int(light.shadow_map_resolution[0])
+        self._wanted_resolution = self.resolution
+        self._wanted_for = 0.0
+        self._caster_lods: Dict[Entity, tuple] = {}  # entity -> (shadow-only proxy, model hidden from shadows)
+        self.visible_casters: List[Entity] = []
+        self._screen_pixels = 0.0
+
+    @property
+    def quality(self) -> str:
+        return self._quality
+
+    @quality.setter
+    def quality(self, value: str):
+        if value not in QUALITY:
+            raise ValueError(f'unknown shadow quality {value!r}, expected one of {", ".join(QUALITY)}')
+        self._quality = value
+
+    # === Casters ===
+
+    def add_caster(self, entity: Entity):
+        if entity not in self.casters:
+            self.casters.append(entity)
+
+    def remove_caster(self, entity: Entity):
+        if entity in self.casters:
+            self.casters.remove(entity)
+        self.clear_caster_lod(entity)
+
+    def set_caster_lod(self, entity: Entity, model):
+        """Draw model instead of entity.model in the shadow pass (and only there)."""
+        self.clear_caster_lod(entity)
+        self.add_caster(entity)
+        # the main camera must not see shadow-only geometry
+        cam_node = application.base.cam.node()
+        cam_node.set_camera_mask(cam_node.get_camera_mask() & ~SHADOW_CAMERA_MASK)
+
+        proxy = model.copy_to(entity) if isinstance(model, NodePath) else NodePath(model).copy_to(entity)
+        proxy.hide(BitMask32.all_on())
+        proxy.show(SHADOW_CAMERA_MASK)
+        entity.model.hide(SHADOW_CAMERA_MASK)
+        self._caster_lods[entity] = (proxy, entity.model)
+
+    def clear_caster_lod(self, entity: Entity):
+        proxy, model = self._caster_lods.pop(entity, (None, None))
+        if proxy is None:
+            return
+        proxy.remove_node()
+        if model is not None and not model.is_empty():
+            model.show(SHADOW_CAMERA_MASK)
+
+    def _sync_caster_lods(self):
+        # something else (e.g. LODManager) may have swapped the model since
+        for entity, (proxy, model) in list(self._caster_lods.items()):
+            if not entity:
+                del self._caster_lods[entity]
+            elif entity.model is not model:
+                if model is not None and not model.is_empty():
+                    model.show(SHADOW_CAMERA_MASK)
+                if entity.model is not None:
+                    entity.model.hide(SHADOW_CAMERA_MASK)
+                self._caster_lods[entity] = (proxy, entity.model)
+
+    # === Fitting ===
+
+    def caster_spheres(self, relative_to) -> tuple:
+        """Centers (N, 3) and radii (N,) of the enabled casters' bounds, in relative_to's space."""
+        centers, radii, entities = [], [], []
+        for entity in self.casters:
+            if not entity or not entity.enabled:
+                continue
+            bounds = entity.get_bounds()
+            if bounds.is_empty() or bounds.is_infinite():
+                continue
+            # get_bounds() is in the parent's space
+            parent = entity.get_parent()
+            mat = np.array(parent.get_mat(relative_to), dtype=np.float64).reshape(4, 4)
+            center = np.array(bounds.get_center(), dtype=np.float64)
+            centers.append(center @ mat[:3, :3] + mat[3, :3])
+            radii.append(bounds.get_radius() * np.linalg.norm(mat[:3, :3], axis=1).max())
+            entities.append(entity)
+        return np.array(centers).reshape(-1, 3), np.array(radii), entities
+
+    def _in_view(self, centers, radii) -> np.ndarray:
+        hull = application.base.camLens.make_bounds()
+        hull.xform(application.base.cam.get_mat(scene))
+        return np.array([bool(hull.contains(BoundingSphere(tuple(c), r)))
+                         for c, r in zip(centers, radii)], dtype=bool)
+
+    def fit(self):
+        """Fit the shadow lens to the casters; returns the covered (width, height) or None."""
+        centers, radii, entities = self.caster_spheres(scene)
+        if self.cull_to_view and len(centers):
+            visible = self._in_view(centers, radii)
+            centers, radii = centers[visible], radii[visible]
+            entities = [e for e, v in zip(entities, visible) if v]
+        self.visible_casters = entities
+        if not len(centers):
+            return None
+
+        # light space: the lens looks down +z with its film in the xy plane (y-up-left)
+        mat = np.array(scene.get_mat(self.light_np), dtype=np.float64).reshape(4, 4)
+        local = centers @ mat[:3, :3] + mat[3, :3]
+        bmin = (local - radii[:, None]).min(axis=0)
+        bmax = (local + radii[:, None]).max(axis=0)
+        pad = (bmax - bmin) * self.margin
+        bmin, bmax = bmin - pad, bmax + pad
+
+        size = np.maximum(bmax[:2] - bmin[:2], 1e-3)
+        texel = size / self.resolution
+        offset = np.round((bmin[:2] + bmax[:2]) / 2 / texel) * texel
+        self.lens.set_film_size(*size)
+        self.lens.set_film_offset(*offset)
+        self.lens.set_near_far(bmin[2], bmax[2])
+        self._screen_pixels = self._screen_coverage(centers, radii, size.max())
+        return tuple(size)
+
+    def _screen_coverage(self, centers, radii, extent) -> float:
+        """Roughly how many screen pixels tall the shadowed area appears."""
+        if camera.orthographic:
+            fraction = extent / camera.fov
+        else:
+            distance = np.linalg.norm(centers.mean(axis=0) - np.array(camera.world_position))
+            half_fov = np.radians(application.base.camLens.get_fov()[1]) / 2
+            fraction = extent / (2 * max(distance - radii.max(), 1e-3) * np.tan(half_fov))
+        return min(fraction, 4) * window.size[1]
+
+    def target_resolution(self) -> int:
+        preset = QUALITY[self.quality]
+        wanted = _next_power_of_two(self._screen_pixels * preset.texels_per_pixel)
+        return int(np.clip(wanted, preset.min_resolution, preset.max_resolution))
+
+    def set_resolution(self, resolution: int):
+        self.resolution = resolution
+        self.light.shadow_map_resolution = (resolution, resolution)
+        if getattr(self.light, '_shadows', False):
+            self.light._light.set_shadow_caster(True, resolution, resolution)
+
+    def update(self):
+        self._sync_caster_lods()
+        if self.fit() is None:
+            return
+        wanted = self.target_resolution()
+        if wanted == self.resolution:
+            self._wanted_for = 0.0
+            return
+        # reallocating the map is expensive: only once the new size has been stable for a while
+        if wanted != self._wanted_resolution:
+            self._wanted_resolution, self._wanted_for = wanted, 0.0
+        self._wanted_for += time.dt      # Ursina keeps the frame delta on the time module
+        if self._wanted_for >= RESIZE_DELAY:
+            self.set_resolution(wanted)
+            self._wanted_for = 0.0
+
+    def on_destroy(self):
+        for entity in list(self._caster_lods):
+            self.clear_caster_lod(entity)
@@ -7,9 +7,15 @@
 # Inspired by early tech stages used internally by Nintendo (1995-96).
 # -------------------------------------------------------------
 from ursina import *
+from engine_config import create_app
 from random import uniform
+from texture_cache import load_cached_texture
+from bvh_collider import raycast  # also hits the baked level's collider
+from static_batching import bake_static
+from profiler import enable_profiler, profiler_scope
 
-app = Ursina()
+app = create_app()
+profiler = enable_profiler(overlay=False)  # F3: per-scope frame timings
 
 # -------------------------------------------------------------
 # WINDOW SETTINGS
@@ -29,7 +35,7 @@ directional_light = DirectionalLight(direction=Vec3(-1, -1, -1), color=color.whi
 
 ground = Entity(
     model='plane',
-    texture='white_cube',
+    texture=load_cached_texture('white_cube'),
     texture_scale=(40, 40),
     scale=(80, 1, 80),
     color=color.rgb(100, 200, 100),
@@ -67,18 +73,19 @@ class Mario(Entity):
         move = move.x * camera.right + move.z * camera.forward
         self.position += move * time.dt * self.speed
 
-        # Apply gravity
-        self.vertical_velocity -= self.gravity * time.dt
-        self.y += self.vertical_velocity * time.dt
+        with profiler_scope('physics'):  # gravity and the ground raycast
+            # Apply gravity
+            self.vertical_velocity -= self.gravity * time.dt
+            self.y += self.vertical_velocity * time.dt
 
-        # Ground check
-        hit_info = raycast(self.world_position + (0, 0.5, 0), Vec3(0, -1, 0), distance=1, ignore=(self,))
-        if hit_info.hit:
-            if self.vertical_velocity < 0:
-                self.y = hit_info.world_point.y + 0.01
-                self.vertical_velocity = 0
-                self.is_jumping = False
-                self.triple_jump_count = 0
+            # Ground check
+            hit_info = raycast(self.world_position + (0, 0.5, 0), Vec3(0, -1, 0), distance=1, ignore=(self,))
+            if hit_info.hit:
+                if self.vertical_velocity < 0:
+                    self.y = hit_info.world_point.y + 0.01
+                    self.vertical_velocity = 0
+                    self.is_jumping = False
+                    self.triple_jump_count = 0
 
         # Jump (single / double / triple)
         if held_keys['space'] and not self.is_jumping:
@@ -101,8 +108,9 @@ camera.rotation = (10, 0, 0)
 camera_pivot = Entity(parent=player, y=2)
 
 def camera_follow():
-    camera.look_at(camera_pivot)
-    camera.rotation_y += (held_keys['q'] - held_keys['e']) * 60 * time.dt
+    with profiler_scope('camera'):
+        camera.look_at(camera_pivot)
+        camera.rotation_y += (held_keys['q'] - held_keys['e']) * 60 * time.dt
 
 camera.update = camera_follow
 
@@ -175,6 +183,9 @@ for i in range(3):
     )
     platforms.append(p)
 
+# The stage never moves: one mesh per material, one collision BVH (prints draw calls before/after)
+level = bake_static([ground, *platforms])
+
 # -------------------------------------------------------------
 # UPDATE LOOP
 # -------------------------------------------------------------
@@ -0,0 +1,187 @@
+# static_batching.py - Bake static level geometry into a few meshes and one collision structure
+#
+# A stage built from Entity blocks costs one draw call per block (two with
+# the shadow pass) and one Panda3D collision solid per collider, so a level
+# of a few thousand cubes is draw-call bound long before the GPU is busy.
+# bake_static() takes the entities that never move and:
+#   * groups them by material (texture, shader, double sided, unlit) and,
+#     with chunk_size > 0, by the grid cell of their center so every batch
+#     can still be frustum culled,
+#   * bakes every group into one vertex buffer in world space, with each
+#     entity's color as vertex color and its texture_scale/offset folded
+#     into the UVs, and draws it as a single Entity,
+#   * moves their collision (the entities that had a collider, or the
+#     collision list) into one world space triangle BVH: a BVHCollider
+#     on an invisible entity (so bvh_collider.raycast and mouse_raycast keep
+#     finding the level) whose MeshBVH is also what character_controller.py
+#     sweeps against,
+#   * disables the original entities (they stay valid references) and
+#     prints the scene's draw calls before and after.
+#
+# Usage:
+#   from static_batching import bake_static
+#   level = bake_static([ground, *platforms])   # after the level is built
+#   level = bake_static(blocks, collision=blocks, chunk_size=32)  # no colliders of their own
+#   hit = raycast(origin, (0, -1, 0))           # bvh_collider.raycast
+#   controller = CapsuleController(level.bvh, radius=0.4, height=1)
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from panda3d.core import (Geom, GeomEnums, GeomNode, GeomTriangles, GeomVertexArrayFormat, GeomVertexData,
+                          GeomVertexFormat, InternalName, NodePath)
+from ursina import Entity, scene
+
+from bvh import MeshBVH
+from bvh_collider import BVHCollider, primitive_indices, static_bvh
+
+_array = GeomVertexArrayFormat()
+_array.add_column(InternalName.get_vertex(), 3, Geom.NT_float32, Geom.C_point)
+_array.add_column(InternalName.get_normal(), 3, Geom.NT_float32, Geom.C_normal)
+_array.add_column(InternalName.get_color(), 4, Geom.NT_float32, Geom.C_color)
+_array.add_column(InternalName.get_texcoord(), 2, Geom.NT_float32, Geom.C_texcoord)
+BATCH_FORMAT = GeomVertexFormat.register_format(_array)
+_FLOATS_PER_VERTEX = 12
+
+
+def count_draw_calls(root=scene) -> int:
+    """Geoms under root that are drawn (not stashed or hidden); one draw call each, before culling."""
+    paths = list(root.find_all_matches('**/+GeomNode'))
+    if isinstance(root.node(), GeomNode):
+        paths.insert(0, root)
+    return sum(path.node().get_num_geoms() for path in paths if not path.is_hidden())
+
+
+def material_key(entity: Entity) -> tuple:
+    """Entities with equal keys render identically apart from color, so they can share a batch."""
+    texture = entity.texture._texture if entity.texture is not None else None    # wrappers may differ, the image not
+    return texture, entity.shader, entity.double_sided, getattr(entity, 'unlit', False)
+
+
+def _entity_vertices(entity: Entity):
+    """Interleaved BATCH_FORMAT rows and triangle indices of one entity, in world space."""
+    rows, triangles, offset = [], [], 0
+    geom_nodes = list(entity.model.find_all_matches('**/+GeomNode'))
+    if isinstance(entity.model.node(), GeomNode):
+        geom_nodes.insert(0, entity.model)
+    color = np.array(entity.color, dtype=np.float32)
+    uv_scale = np.array(entity.texture_scale, dtype=np.float32)
+    uv_offset = np.array(entity.texture_offset, dtype=np.float32)
+
+    for node_path in geom_nodes:
+        mat = np.array(node_path.get_mat(scene), dtype=np.float64).reshape(4, 4)
+        # Panda3D matrices are row-major with row vectors: p' = p @ M, n' = n @ inv(M)^T
+        normal_mat = np.linalg.inv(mat[:3, :3]).T
+        flip = np.linalg.det(mat[:3, :3]) < 0
+        for geom in node_path.node().get_geoms():
+            geom = geom.decompose()
+            source = geom.get_vertex_data()
+            if not source.has_column('vertex'):
+                continue
+            vdata = source.convert_to(BATCH_FORMAT)
+            data = np.frombuffer(vdata.get_array(0).get_handle().get_data(), np.float32)
+            data = data.reshape(-1, _FLOATS_PER_VERTEX).copy()
+            data[:, 0:3] = data[:, 0:3] @ mat[:3, :3] + mat[3, :3]
+            if source.has_column('normal'):
+                normals = data[:, 3:6] @ normal_mat
+                data[:, 3:6] = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+            data[:, 6:10] = data[:, 6:10] * color if source.has_column('color') else color
+            data[:, 10:12] = data[:, 10:12] * uv_scale + uv_offset
+
+            for i in range(geom.get_num_primitives()):
+                prim = geom.get_primitive(i)
+                if prim.get_primitive_type() == GeomEnums.PT_polygons:
+                    tris = primitive_indices(prim).reshape(-1, 3)
+                    # a mirroring transform turns the winding inside out
+                    triangles.append((tris[:, ::-1] if flip else tris) + offset)
+            rows.append(data)
+            offset += len(data)
+    return rows, triangles
+
+
+def build_batch_geom(entities: Sequence[Entity], name: str = 'static_batch') -> GeomNode:
+    """Bake entities (in their current world transforms) into a single Geom in world space."""
+    rows, triangles, offset = [], [], 0
+    for entity in entities:
+        entity_rows, entity_triangles = _entity_vertices(entity)
+        rows.extend(entity_rows)
+        triangles.extend(t + offset for t in entity_triangles)
+        offset += sum(len(r) for r in entity_rows)
+    vertices = np.concatenate(rows) if rows else np.zeros((0, _FLOATS_PER_VERTEX), np.float32)
+    indices = np.concatenate(triangles) if triangles else np.zeros((0, 3), np.int64)
+
+    vdata = GeomVertexData(name, BATCH_FORMAT, Geom.UH_static)
+    vdata.unclean_set_num_rows(len(vertices))
+    memoryview(vdata.modify_array(0)).cast('B')[:] = np.ascontiguousarray(vertices, np.float32).tobytes()
+    prim = GeomTriangles(Geom.UH_static)
+    prim.set_index_type(Geom.NT_uint32)
+    index_array = prim.modify_vertices()
+    index_array.unclean_set_num_rows(indices.size)
+    memoryview(index_array).cast('B')[:] = np.ascontiguousarray(indices, np.uint32).tobytes()
+
+    geom = Geom(vdata)
+    geom.add_primitive(prim)
+    node = GeomNode(name)
+    node.add_geom(geom)
+    return node
+
+
+class StaticLevel:
+    """The baked batches, the level's collision and the entities they replaced."""
+
+    def __init__(self, entities: Sequence[Entity], collision: Optional[Sequence[Entity]] = None,
+                 chunk_size: float = 0, name: str = 'static_level'):
+        self.entities = [e for e in entities if e.model is not None]
+        if not self.entities:
+            raise ValueError('bake_static: the entities have no geometry')
+        draw_calls_before = count_draw_calls()
+        if collision is None:
+            collision = [e for e in self.entities if e.collider is not None]
+
+        self.collision = None
+        if collision:
+            bvh = static_bvh(collision)
+            self.collision = Entity(name=f'{name}_collision')
+            self.collision.collider = BVHCollider(self.collision, positions=bvh.positions, triangles=bvh.triangles)
+
+        groups: Dict[tuple, List[Entity]] = defaultdict(list)
+        for entity in self.entities:
+            key = material_key(entity)
+            if chunk_size > 0:
+                key += tuple(np.floor(np.array(entity.world_position) / chunk_size).astype(int))
+            groups[key].append(entity)
+
+        self.batches: List[Entity] = []
+        for i, group in enumerate(groups.values()):
+            first = group[0]
+            batch = Entity(name=f'{name}_{i}', model=NodePath(build_batch_geom(group, f'{name}_{i}')),
+                           double_sided=first.double_sided)
+            if first.shader is not None:
+                batch.shader = first.shader
+            if first.texture is not None:
+                batch.texture = first.texture
+            if getattr(first, 'unlit', False):
+                batch.unlit = True
+            self.batches.append(batch)
+
+        for entity in self.entities:
+            entity.collider = None
+            entity.enabled = False
+
+        self.draw_calls: Tuple[int, int] = (draw_calls_before, count_draw_calls())
+        print(f'[static_batching] {len(self.entities)} entities -> {len(self.batches)} batches, '
+              f'draw calls {self.draw_calls[0]} -> {self.draw_calls[1]}')
+
+    @property
+    def bvh(self) -> MeshBVH:
+        """World space triangles of every baked collider, for character_controller.CapsuleController."""
+        if self.collision is None:
+            raise ValueError('bake_static: none of the entities collide')
+        return self.collision.collider.bvh
+
+
+def bake_static(entities: Sequence[Entity], collision: Optional[Sequence[Entity]] = None,
+                chunk_size: float = 0, name: str = 'static_level') -> StaticLevel:
+    """Draw static entities as one mesh per material (and chunk) and collide with them through one BVH."""
+    return StaticLevel(entities, collision, chunk_size, name)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from bvh import MeshBVH
+from character_controller import CapsuleController
+
+GRAVITY = 20.0
+DT = 1 / 60
+
+
+def _box(lo, hi):
+    """Positions and outward wound triangles (front faces clockwise, as in Ursina's left-handed world)."""
+    lo, hi = np.asarray(lo, float), np.asarray(hi, float)
+    corners = np.array([(x, y, z) for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    quads = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    triangles = np.array([t for q in quads for t in ((q[0], q[1], q[2]), (q[0], q[2], q[3]))])
+    a, b, c = (corners[triangles[:, i]] for i in range(3))
+    inward = np.einsum('ij,ij->i', np.cross(c - a, b - a), (a + b + c) / 3 - corners.mean(axis=0)) < 0
+    triangles[inward] = triangles[inward][:, ::-1]
+    return corners, triangles
+
+
+def _walk_onto_step(step: float, speed: float, frames: int = 60) -> np.ndarray:
+    """Feet after walking at speed (units per second, 60 fps, with gravity) towards a step at x = 2."""
+    floor, block = _box((-10, -1, -10), (10, 0, 10)), _box((2, 0, -5), (6, step, 5))
+    bvh = MeshBVH(np.concatenate([floor[0], block[0]]), np.concatenate([floor[1], block[1] + len(floor[0])]))
+    controller = CapsuleController(bvh, radius=0.4, height=1.8, step_height=0.3)
+    controller.grounded, controller.ground_normal = True, np.array([0.0, 1.0, 0.0])
+    feet, fall = np.zeros(3), 0.0
+    for _ in range(frames):
+        fall -= GRAVITY * DT
+        result = controller.move(feet, (speed * DT, fall * DT, 0))
+        feet = result.position
+        if result.grounded:
+            fall = 0.0
+    return feet
+
+
+def test_walks_up_a_step():
+    for speed in (4, 5):
+        feet = _walk_onto_step(0.25, speed)
+        assert feet[0] > 3 and abs(feet[1] - 0.25) < 0.02
+
+
+def test_fast_move_does_not_climb_a_step_too_high():
+    feet = _walk_onto_step(0.35, 15)
+    assert feet[0] < 2 and abs(feet[1]) < 0.02
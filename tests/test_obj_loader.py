@@ -0,0 +1,31 @@
+import numpy as np
+
+from obj_loader import parse_obj
+
+QUAD = b'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nvt 0 0\nvt 1 1\nvn 0 0 1\n'
+
+
+def _parse(tmp_path, data: bytes):
+    path = tmp_path / 'mesh.obj'
+    path.write_bytes(data)
+    return parse_obj(path)
+
+
+def test_mixed_face_formats(tmp_path):
+    for faces in (b'f 1/1/1 2/1/1 3/1/1\nf 1 3 4\n', b'f 1 3 4\nf 1/1/1 2/1/1 3/1/1\n'):
+        mesh = _parse(tmp_path, QUAD + faces)
+        assert mesh.triangle_count == 2
+        assert len(np.unique(mesh.positions[mesh.triangles].reshape(-1, 3), axis=0)) == 4
+
+
+def test_all_corner_layouts_in_one_face(tmp_path):
+    mesh = _parse(tmp_path, QUAD + b'f 1 2/2 3//1 4/1/1\n')
+    assert mesh.triangle_count == 2
+    assert mesh.vertex_count == 4
+
+
+def test_crlf_line_endings(tmp_path):
+    mesh = _parse(tmp_path, (QUAD + b'f 1//1 2//1 3//1 4//1\n').replace(b'\n', b'\r\n'))
+    assert mesh.triangle_count == 2
+    assert mesh.vertex_count == 4
+    assert np.allclose(mesh.normals, [0, 0, 1])
@@ -0,0 +1,414 @@
+# text3d.py - Extruded 3D bitmap text for Ursina
+#
+# Glyphs are stored as grids of filled cells (the same representation the
+# MARIO64 title in clientv0.py uses). Each glyph's mesh is generated once per
+# font/depth/detail level and then drawn with hardware instancing: a string is
+# laid out into per-instance offsets and colors, and every distinct glyph in it
+# becomes a single instanced draw. Far away text switches to a front-face-only
+# variant of the same glyphs through a Panda3D LODNode.
+#
+# Usage:
+#   from text3d import Text3D
+#   sign = Text3D('PEACH CASTLE', char_colors=color.red, position=(0, 3, 10))
+#   sign.text = 'BOB-OMB BATTLEFIELD'     # re-lays out, no new meshes
+#
+# Fonts:
+#   default_font()            built-in 5-row font (A-Z, 0-9, punctuation)
+#   BitmapFont.from_bdf(path) any BDF bitmap font
+#   font.extended({...})      override/add glyphs, e.g. the title letters
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from panda3d.core import BoundingBox, LODNode, NodePath, Point3
+from ursina import Entity, Mesh, Vec4, color
+
+from scene_lighting import scene_lighting
+from shader_cache import get_shader
+
+MAX_INSTANCES = 256   # size of the per-instance uniform arrays in the shader
+LOD_DISTANCE = 40.0   # switch to front-face-only glyphs beyond this distance
+
+
+@dataclass(frozen=True)
+class Glyph:
+    """A glyph as a width x height grid; cells are (x, y) with origin bottom-left."""
+    width: int
+    height: int
+    cells: FrozenSet[Tuple[int, int]]
+
+    @classmethod
+    def from_rows(cls, rows: List[str]) -> 'Glyph':
+        """Build a glyph from text rows (top row first), '#' marks a filled cell."""
+        height = len(rows)
+        width = max((len(row) for row in rows), default=0)
+        cells = frozenset(
+            (x, height - 1 - y)
+            for y, row in enumerate(rows)
+            for x, ch in enumerate(row) if ch == '#'
+        )
+        return cls(width, height, cells)
+
+
+# Built-in font: 5 rows per glyph, rows separated by '/', top row first.
+# Lowercase letters fall back to their uppercase glyph.
+_DEFAULT_FONT_ROWS = {
+    'A': '.##./#..#/####/#..#/#..#',
+    'B': '###./#..#/###./#..#/###.',
+    'C': '.###/#.../#.../#.../.###',
+    'D': '###./#..#/#..#/#..#/###.',
+    'E': '####/#.../###./#.../####',
+    'F': '####/#.../###./#.../#...',
+    'G': '.###/#.../#.##/#..#/.###',
+    'H': '#..#/#..#/####/#..#/#..#',
+    'I': '###/.#./.#./.#./###',
+    'J': '..##/...#/...#/#..#/.##.',
+    'K': '#..#/#.#./##../#.#./#..#',
+    'L': '#.../#.../#.../#.../####',
+    'M': '#...#/##.##/#.#.#/#...#/#...#',
+    'N': '#...#/##..#/#.#.#/#..##/#...#',
+    'O': '.##./#..#/#..#/#..#/.##.',
+    'P': '###./#..#/###./#.../#...',
+    'Q': '.##./#..#/#..#/#.#./.#.#',
+    'R': '###./#..#/###./#.#./#..#',
+    'S': '.###/#.../.##./...#/###.',
+    'T': '#####/..#../..#../..#../..#..',
+    'U': '#..#/#..#/#..#/#..#/.##.',
+    'V': '#...#/#...#/#...#/.#.#./..#..',
+    'W': '#...#/#...#/#.#.#/##.##/#...#',
+    'X': '#...#/.#.#./..#../.#.#./#...#',
+    'Y': '#...#/.#.#./..#../..#../..#..',
+    'Z': '####/...#/.##./#.../####',
+    '0': '.##./#.##/#..#/##.#/.##.',
+    '1': '.#./##./.#./.#./###',
+    '2': '###./...#/.##./#.../####',
+    '3': '###./...#/.##./...#/###.',
+    '4': '#..#/#..#/####/...#/...#',
+    '5': '####/#.../###./...#/###.',
+    '6': '.##./#.../###./#..#/.##.',
+    '7': '####/...#/..#./.#../.#..',
+    '8': '.##./#..#/.##./#..#/.##.',
+    '9': '.##./#..#/.###/...#/.##.',
+    ' ': '.../.../.../.../...',
+    '.': '././././#',
+    ',': './././#/#',
+    '!': '#/#/#/./#',
+    '?': '###./...#/.##./..../.#..',
+    '-': '.../.../###/.../...',
+    '+': '.../.#./###/.#./...',
+    '=': '.../###/.../###/...',
+    '_': '.../.../.../.../###',
+    ':': './#/./#/.',
+    "'": '#/#/././.',
+    '"': '#.#/#.#/.../.../...',
+    '/': '..#/..#/.#./#../#..',
+    '(': '.#/#./#./#./.#',
+    ')': '#./.#/.#/.#/#.',
+    '<': '..#/.#./#../.#./..#',
+    '>': '#../.#./..#/.#./#..',
+    '*': '#.#/.#./#.#/.../...',
+}
+
+
+class BitmapFont:
+    """A set of glyph grids plus the meshes generated from them (built lazily, once)."""
+
+    def __init__(self, glyphs: Dict[str, Glyph], fallback: str = '?'):
+        self.glyphs = dict(glyphs)
+        self.fallback = fallback
+        self.height = max((g.height for g in self.glyphs.values()), default=0)
+        self._meshes: Dict[Tuple[str, float, bool], Mesh] = {}
+
+    def resolve(self, char: str) -> str:
+        """The key of the glyph used to draw char (itself, its uppercase, or the fallback)."""
+        if char in self.glyphs:
+            return char
+        return char.upper() if char.upper() in self.glyphs else self.fallback
+
+    def glyph(self, char: str) -> Glyph:
+        return self.glyphs[self.resolve(char)]
+
+    def extended(self, glyphs: Dict[str, object]) -> 'BitmapFont':
+        """Return a copy with extra/replaced glyphs.
+
+        Values may be Glyph objects or (width, height, cells) tuples, the format
+        of the `letters` table in clientv0.py.
+        """
+        merged = dict(self.glyphs)
+        for char, g in glyphs.items():
+            merged[char] = g if isinstance(g, Glyph) else Glyph(g[0], g[1], frozenset(g[2]))
+        return BitmapFont(merged, self.fallback)
+
+    @classmethod
+    def from_bdf(cls, path: str) -> 'BitmapFont':
+        """Load every glyph of a BDF bitmap font into cell grids."""
+        glyphs = {}
+        font_ascent, font_descent = 0, 0
+        encoding, bbx, bitmap = None, None, None
+        with open(path, 'r', encoding='latin-1') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                key = parts[0]
+                if key == 'FONT_ASCENT':
+                    font_ascent = int(parts[1])
+                elif key == 'FONT_DESCENT':
+                    font_descent = int(parts[1])
+                elif key == 'ENCODING':
+                    encoding = int(parts[1])
+                elif key == 'BBX':
+                    bbx = [int(p) for p in parts[1:5]]
+                elif key == 'BITMAP':
+                    bitmap = []
+                elif key == 'ENDCHAR':
+                    if encoding is not None and encoding >= 0 and bbx is not None:
+                        glyphs[chr(encoding)] = _bdf_glyph(bbx, bitmap, font_ascent, font_descent)
+                    encoding, bbx, bitmap = None, None, None
+                elif bitmap is not None:
+                    bitmap.append((int(key, 16), len(key) * 4))
+        fallback = '?' if '?' in glyphs else next(iter(glyphs))
+        return cls(glyphs, fallback)
+
+    def mesh(self, char: str, depth: float = 0.5, low_detail: bool = False) -> Mesh:
+        """The glyph's mesh, generated on first use and shared by every Text3D after that."""
+        char = self.resolve(char)
+        key = (char, depth, low_detail)
+        if key not in self._meshes:
+            self._meshes[key] = build_glyph_mesh(self.glyphs[char], depth, low_detail)
+        return self._meshes[key]
+
+
+def _bdf_glyph(bbx, bitmap, font_ascent, font_descent) -> Glyph:
+    w, h, x_off, y_off = bbx
+    height = font_ascent + font_descent
+    cells = set()
+    for row, (bits, nbits) in enumerate(bitmap):
+        y = (h - 1 - row) + y_off + font_descent   # baseline sits font_descent above the bottom
+        for x in range(w):
+            if bits & (1 << (nbits - 1 - x)):
+                cells.add((x + max(x_off, 0), y))
+    cells = frozenset((x, y) for x, y in cells if 0 <= y < height)
+    return Glyph(w + max(x_off, 0), height, cells)
+
+
+_default_font = None
+
+def default_font() -> BitmapFont:
+    global _default_font
+    if _default_font is None:
+        _default_font = BitmapFont({ch: Glyph.from_rows(rows.split('/'))
+                                    for ch, rows in _DEFAULT_FONT_ROWS.items()})
+    return _default_font
+
+
+def build_glyph_mesh(glyph: Glyph, depth: float = 0.5, low_detail: bool = False) -> Mesh:
+    """Extrude a glyph grid into a mesh (front face at z=0, back face at z=depth).
+
+    Front and back faces are merged into horizontal runs of cells; side faces are
+    only emitted where a cell has no neighbour. With low_detail only the front
+    faces are generated.
+    """
+    vertices, triangles, normals = [], [], []
+
+    def add_face(v0, v1, v2, v3, normal_vec):
+        start_index = len(vertices)
+        vertices.extend([v0, v1, v2, v3])
+        normals.extend([normal_vec] * 4)
+        triangles.extend([start_index, start_index + 1, start_index + 2,
+                          start_index, start_index + 2, start_index + 3])
+
+    z_front, z_back = 0.0, depth
+    cells = glyph.cells
+    for y in range(glyph.height):
+        x = 0
+        while x < glyph.width:
+            if (x, y) not in cells:
+                x += 1
+                continue
+            x_start = x
+            while (x, y) in cells:
+                x += 1
+            x0, x1, y0, y1 = x_start, x, y, y + 1
+            add_face((x0, y1, z_front), (x0, y0, z_front), (x1, y0, z_front), (x1, y1, z_front), (0, 0, -1))
+            if not low_detail:
+                add_face((x0, y0, z_back), (x0, y1, z_back), (x1, y1, z_back), (x1, y0, z_back), (0, 0, 1))
+
+    if not low_detail:
+        for (cx, cy) in cells:
+            x0, x1, y0, y1 = cx, cx + 1, cy, cy + 1
+            if (cx - 1, cy) not in cells:
+                add_face((x0, y1, z_back), (x0, y0, z_back), (x0, y0, z_front), (x0, y1, z_front), (-1, 0, 0))
+            if (cx + 1, cy) not in cells:
+                add_face((x1, y0, z_back), (x1, y1, z_back), (x1, y1, z_front), (x1, y0, z_front), (1, 0, 0))
+            if (cx, cy - 1) not in cells:
+                add_face((x0, y0, z_front), (x0, y0, z_back), (x1, y0, z_back), (x1, y0, z_front), (0, -1, 0))
+            if (cx, cy + 1) not in cells:
+                add_face((x0, y1, z_back), (x0, y1, z_front), (x1, y1, z_front), (x1, y1, z_back), (0, 1, 0))
+
+    return Mesh(vertices=vertices, triangles=triangles, normals=normals,
+                colors=[color.white] * len(vertices), static=True)
+
+
+def layout(text: str, font: BitmapFont, spacing: int = 1, line_spacing: int = 1
+           ) -> List[Tuple[int, str, float, float]]:
+    """Place each visible character as (char_index, char, x, y).
+
+    char_index counts characters excluding newlines. Lines are centered on x=0
+    and the last line sits on y=0.
+    """
+    lines = text.split('\n')
+    placed = []
+    char_index = 0
+    for line_index, line in enumerate(lines):
+        widths = [font.glyph(ch).width for ch in line]
+        total_width = sum(widths) + spacing * max(len(line) - 1, 0)
+        x = -total_width / 2.0
+        y = (len(lines) - 1 - line_index) * (font.height + line_spacing)
+        for ch, w in zip(line, widths):
+            if font.glyph(ch).cells:
+                placed.append((char_index, ch, x, y))
+            x += w + spacing
+            char_index += 1
+    return placed
+
+
+# Instanced version of the lit shader from clientv0.py: each instance reads its
+# offset and color from uniform arrays indexed by gl_InstanceID.
+text3d_vertex_shader = """
+#version 330 core
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform vec4 instance_offsets[%d];
+uniform vec4 instance_colors[%d];
+in vec3 vertex;
+in vec3 normal;
+in vec4 color;
+out vec3 v_normal;
+out vec4 v_color;
+void main() {
+    vec4 p = vec4(vertex + instance_offsets[gl_InstanceID].xyz, 1.0);
+    gl_Position = p3d_ModelViewProjectionMatrix * p;
+    v_normal = p3d_NormalMatrix * normal;
+    v_color = color * instance_colors[gl_InstanceID];
+}
+""" % (MAX_INSTANCES, MAX_INSTANCES)
+
+text3d_fragment_shader = """
+#version 330 core
+uniform vec3 light_dir;
+uniform vec3 light_color;
+uniform vec3 ambient_color;
+uniform vec4 p3d_ColorScale;
+in vec3 v_normal;
+in vec4 v_color;
+out vec4 fragColor;
+void main() {
+    float diff = max(dot(normalize(v_normal), normalize(light_dir)), 0.0);
+    vec3 lit_color = (ambient_color + light_color * diff) * v_color.rgb * p3d_ColorScale.rgb;
+    fragColor = vec4(lit_color, v_color.a * p3d_ColorScale.a);
+}
+"""
+
+# lighting uniforms come from the shared scene_lighting inputs, not per entity
+text3d_shader = get_shader(vertex=text3d_vertex_shader, fragment=text3d_fragment_shader,
+                           name='text3d_shader')
+
+
+class Text3D(Entity):
+    """Extruded 3D text built from shared, instanced glyph meshes.
+
+    char_colors can be a single color, a dict mapping characters to colors, or a
+    sequence with one color per character of the text (newlines excluded).
+    The shader must read instance_offsets/instance_colors like text3d_shader does.
+    """
+
+    def __init__(self, text: str = '', font: Optional[BitmapFont] = None, char_colors=None,
+                 depth: float = 0.5, spacing: int = 1, lod_distance: Optional[float] = LOD_DISTANCE,
+                 shader=None, **kwargs):
+        super().__init__(**kwargs)
+        scene_lighting()    # make sure the shared light inputs exist
+        self.font = font or default_font()
+        self.depth = depth
+        self.spacing = spacing
+        self.lod_distance = lod_distance
+        self._char_colors = char_colors
+        self._text = ''
+        self._root: Optional[NodePath] = None
+        self.shader = shader or text3d_shader
+        self.text = text
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, value: str):
+        self._text = value
+        self._rebuild()
+
+    @property
+    def char_colors(self):
+        return self._char_colors
+
+    @char_colors.setter
+    def char_colors(self, value):
+        self._char_colors = value
+        self._rebuild()
+
+    def _color_for(self, index: int, char: str) -> Vec4:
+        c = self._char_colors
+        if c is None:
+            return Vec4(1, 1, 1, 1)
+        if isinstance(c, dict):
+            return Vec4(*c.get(char, c.get(char.upper(), color.white)))
+        if isinstance(c, (list, tuple)) and c and not isinstance(c[0], (int, float)):
+            return Vec4(*c[index % len(c)])
+        return Vec4(*c)
+
+    def _rebuild(self):
+        if self._root is not None:
+            self._root.remove_node()
+            self._root = None
+        placed = layout(self._text, self.font, self.spacing)
+        if not placed:
+            return
+
+        # one instance list per distinct glyph
+        instances: Dict[str, List[Tuple[Vec4, Vec4]]] = {}
+        for char_index, ch, x, y in placed:
+            instances.setdefault(self.font.resolve(ch), []).append(
+                (Vec4(x, y, 0, 0), self._color_for(char_index, ch)))
+
+        xs = [x for _, _, x, _ in placed]
+        ys = [y for _, _, _, y in placed]
+        bounds_min = Point3(min(xs), min(ys), 0)
+        bounds_max = Point3(max(xs) + max(self.font.glyph(ch).width for _, ch, _, _ in placed),
+                            max(ys) + self.font.height, self.depth)
+
+        self._root = self.attach_new_node('text3d')
+        if self.lod_distance is None:
+            self._add_batches(self._root, instances, False, bounds_min, bounds_max)
+            return
+
+        lod = LODNode('text3d_lod')
+        lod.set_center((bounds_min + bounds_max) * 0.5)
+        lod_np = self._root.attach_new_node(lod)
+        lod.add_switch(self.lod_distance, 0)
+        self._add_batches(lod_np.attach_new_node('full'), instances, False, bounds_min, bounds_max)
+        lod.add_switch(1e9, self.lod_distance)
+        self._add_batches(lod_np.attach_new_node('low'), instances, True, bounds_min, bounds_max)
+
+    def _add_batches(self, parent, instances, low_detail, bounds_min, bounds_max):
+        for ch, items in instances.items():
+            mesh = self.font.mesh(ch, self.depth, low_detail)
+            for start in range(0, len(items), MAX_INSTANCES):
+                chunk = items[start:start + MAX_INSTANCES]
+                batch = parent.attach_new_node(f'glyph_{ch}')
+                mesh.instance_to(batch)
+                batch.set_instance_count(len(chunk))
+                batch.set_shader_input('instance_offsets', [offset for offset, _ in chunk])
+                batch.set_shader_input('instance_colors', [col for _, col in chunk])
+                # the instanced geometry's own bounds only cover one glyph at the origin
+                batch.node().set_bounds(BoundingBox(bounds_min, bounds_max))
+                batch.node().set_final(True)
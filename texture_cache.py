@@ -0,0 +1,144 @@
+# texture_cache.py - Textures converted once into mipmapped (optionally DXT) .txo files
+#
+# Loading a PNG means decoding it on the CPU, and a mipmapped sampler then
+# makes the driver build the mip chain at upload, on every run. This module
+# converts each source image once into Panda3D's native texture object format
+# (.txo) with the whole mip chain already in it, optionally block-compressed
+# (DXT1 for opaque, DXT5 for images with alpha, 4-8x less texture memory).
+# Later loads read the .txo straight into the texture's RAM images and upload
+# them as-is: no PNG decode, no mip generation, no compression at runtime.
+#
+# The converted files live in TEXTURE_CACHE_DIR, named
+# '<stem>-<source path and options hash>-<size and mtime hash>.txo', so editing
+# the source image (or asking for another compression) produces a fresh file;
+# writing it removes the stale versions of the same source and options.
+#
+# Usage:
+#   from texture_cache import load_cached_texture
+#   ground = Entity(model='cube', texture=load_cached_texture('white_cube'))
+#   head.texture = load_cached_texture('marioshead_diffuse.png', compression='auto')
+
+import hashlib
+import os
+from copy import copy
+from pathlib import Path
+from typing import Dict, Optional
+
+from panda3d.core import Filename, Texture as PandaTexture
+from ursina import Texture, application
+
+TEXTURE_CACHE_DIR = Path(os.environ.get(
+    'HACKERPY64_TEXTURE_CACHE', Path.home() / '.cache' / 'hackerpy64' / 'textures'))
+
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg', '.tif', '.tga', '.bmp', '.gif')
+COMPRESSION_MODES = {
+    None: PandaTexture.CM_off,
+    'dxt1': PandaTexture.CM_dxt1,
+    'dxt5': PandaTexture.CM_dxt5,
+}
+
+_loaded: Dict[tuple, Texture] = {}
+
+
+def find_texture_file(name) -> Optional[Path]:
+    """Resolve a texture name the way Ursina does (asset folder, then built-in textures)."""
+    path = Path(name)
+    if path.is_file():
+        return path
+    for folder in (application.asset_folder, application.internal_textures_folder):
+        folder = Path(folder)
+        pattern = f'**/{name}' if path.suffix else f'**/{name}.*'
+        for filename in folder.glob(pattern):
+            if filename.suffix.lower() in IMAGE_TYPES:
+                return filename.resolve()
+    return None
+
+
+def _compression_for(texture: PandaTexture, compression) -> Optional[str]:
+    if compression == 'auto':
+        return 'dxt5' if texture.get_num_components() == 4 else 'dxt1'
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f'unknown texture compression: {compression!r}')
+    return compression
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def cache_path_for(source: Path, compression: Optional[str]) -> Path:
+    stat = source.stat()
+    identity = _hash(f'{source.resolve()}|{compression}')
+    return TEXTURE_CACHE_DIR / f'{source.stem}-{identity}-{_hash(f"{stat.st_size}|{stat.st_mtime_ns}")}.txo'
+
+
+def _prune_stale(dest: Path):
+    """Remove older versions of dest (same source and options, other size/mtime)."""
+    stem, identity, _ = dest.stem.rsplit('-', 2)
+    for path in dest.parent.glob(f'{stem}-{identity}-*.txo'):
+        if path != dest:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def convert_texture(source: Path, dest: Path, compression: Optional[str] = None) -> PandaTexture:
+    """Decode source, build its mip chain (and compress it), write it to dest as .txo."""
+    texture = PandaTexture(source.stem)
+    if not texture.read(Filename.from_os_specific(str(source))):
+        raise IOError(f'could not read texture {source}')
+    texture.generate_ram_mipmap_images()
+    compression = _compression_for(texture, compression)
+    if compression and not texture.compress_ram_image(COMPRESSION_MODES[compression]):
+        print(f'[texture_cache] {compression} compression unavailable, keeping {source.name} uncompressed')
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix('.tmp.txo')
+    if texture.write(Filename.from_os_specific(str(tmp))):
+        os.replace(tmp, dest)
+        _prune_stale(dest)
+    else:
+        print(f'[texture_cache] could not write {dest}')
+    return texture
+
+
+def cached_panda_texture(source: Path, compression: Optional[str] = None) -> PandaTexture:
+    """Panda3D texture for source with its precomputed mips, converting it on first use.
+
+    Does no scene graph work, so it can run on a loader thread.
+    """
+    source = Path(source)
+    dest = cache_path_for(source, compression)
+    if dest.exists():
+        texture = PandaTexture(source.stem)
+        if texture.read(Filename.from_os_specific(str(dest))):
+            return texture
+        print(f'[texture_cache] {dest.name} is unreadable, converting {source.name} again')
+    return convert_texture(source, dest, compression)
+
+
+def wrap_texture(texture: PandaTexture, source: Path, filtering='mipmap') -> Texture:
+    """An Ursina Texture around a loaded Panda3D texture."""
+    wrapped = Texture(texture, filtering=filtering)
+    wrapped.path = source
+    wrapped._cached_image = None        # Ursina only sets it for paths and PIL images; its __del__ deletes it
+    return wrapped
+
+
+def load_cached_texture(name, compression: Optional[str] = None, filtering='mipmap') -> Optional[Texture]:
+    """Drop-in for Entity(texture=...): an Ursina Texture backed by the .txo cache.
+
+    compression is None, 'dxt1', 'dxt5' or 'auto'. Returns None if no image
+    with that name exists, like ursina.load_texture.
+    """
+    key = (str(name), compression, filtering)
+    if key in _loaded:
+        return copy(_loaded[key])
+
+    source = find_texture_file(name)
+    if source is None:
+        return None
+    texture = wrap_texture(cached_panda_texture(source, compression), source, filtering)
+    _loaded[key] = texture
+    return copy(texture)
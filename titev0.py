@@ -1,126 +1,147 @@
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLU import *
-from dataclasses import dataclass
+from gl_camera import GLCamera
+from face_deform import KDTree, RBFDeformer
+from gl_mesh import GLMesh
+from vecmath import Vec3, Vec3Array
 import numpy as np
-import math
 
-@dataclass
-class Vec3:
-    x: float
-    y: float
-    z: float
-    
-    def __add__(self, other):
-        return Vec3(self.x + other.x, self.y + other.y, self.z + other.z)
-    
-    def __sub__(self, other):
-        return Vec3(self.x - other.x, self.y - other.y, self.z - other.z)
-    
-    def __mul__(self, scalar):
-        return Vec3(self.x * scalar, self.y * scalar, self.z * scalar)
-    
-    def length(self):
-        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+FACE_RESOLUTION = 32    # quads per side of the face grid
+PICK_RADIUS = 0.2       # how close the mouse has to be to grab a control point
+MAX_OFFSET = 1.0        # how far a control point may move from its rest position
+
+def face_grid(resolution):
+    """Vertices and quads (counter-clockwise) of a flat square face from -1 to 1."""
+    steps = np.linspace(-1.0, 1.0, resolution + 1, dtype=np.float32)
+    x, y = np.meshgrid(steps, steps)
+    vertices = np.stack([x.ravel(), y.ravel(), np.zeros(x.size, np.float32)], axis=1)
+    corner = (np.arange(resolution)[:, None] * (resolution + 1) + np.arange(resolution)).ravel()
+    quads = np.stack([corner, corner + 1, corner + resolution + 2, corner + resolution + 1], axis=1)
+    return vertices, quads
 
 class FaceController:
-    def __init__(self):
-        self.vertices = np.array([
-            # Face vertices (simplified for example)
-            [-1.0, -1.0, 0.0],
-            [1.0, -1.0, 0.0],
-            [1.0, 1.0, 0.0],
-            [-1.0, 1.0, 0.0],
-        ], dtype=np.float32)
+    def __init__(self, camera):
+        self.camera = camera
+        # Face mesh: a dense grid, deformed by the control points
+        self.vertices, self.quads = face_grid(FACE_RESOLUTION)
         
-        self.control_points = {
-            'nose': Vec3(0.0, 0.0, 0.0),
-            'left_ear': Vec3(-1.0, 0.0, 0.0),
-            'right_ear': Vec3(1.0, 0.0, 0.0)
-        }
+        self.control_names = ['nose', 'left_ear', 'right_ear']
+        self.control_points = Vec3Array([
+            [0.0, 0.0, 0.0],
+            [-1.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+        ])
         
         self.original_positions = self.control_points.copy()
+        self.deformer = RBFDeformer(self.vertices, self.original_positions.data)
+        self.vertices = self.deformer.vertices      # deformed in place from here on
+        self.control_tree = None                    # rebuilt at the next pick after points moved
         self.selected_point = None
+        # scratch vectors reused by handle_mouse every frame
+        self.mouse_pos = Vec3()
+        self.offset = Vec3()
+        
+        # GPU copies of both arrays; draw() re-uploads only the vertices that changed
+        self.face_mesh = GLMesh(self.vertices, self.quads, mode=GL_QUADS)
+        self.point_mesh = GLMesh(self.control_points.data, mode=GL_POINTS)
         
     def draw(self):
-        glBegin(GL_QUADS)
+        self.face_mesh.sync()
         glColor3f(1.0, 0.0, 0.0)
-        for v in self.vertices:
-            glVertex3f(v[0], v[1], v[2])
-        glEnd()
+        self.face_mesh.draw()
         
         # Draw control points
+        self.point_mesh.sync()
         glPointSize(10.0)
-        glBegin(GL_POINTS)
-        for point in self.control_points.values():
-            glVertex3f(point.x, point.y, point.z)
-        glEnd()
+        self.point_mesh.draw()
     
     def handle_mouse(self, x, y, button_down):
+        """Pick / drag a control point; returns True if the face changed and needs redrawing."""
         if button_down:
-            # Convert screen coordinates to world space
-            modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-            projection = glGetDoublev(GL_PROJECTION_MATRIX)
-            viewport = glGetIntegerv(GL_VIEWPORT)
+            # Convert screen coordinates to world space: the mouse ray hits the face plane (z = 0).
+            # The camera keeps its matrices on the CPU, so this never reads back from GL.
+            world_pos = self.camera.pick_plane(x, y, z=0.0)
+            if world_pos is None:
+                return False
             
-            world_pos = gluUnProject(x, viewport[3] - y, 0.0,
-                                   modelview, projection, viewport)
-            
-            mouse_pos = Vec3(world_pos[0], world_pos[1], 0.0)
+            mouse_pos = self.mouse_pos.set(world_pos[0], world_pos[1], 0.0)
             
             # Find closest control point
-            if not self.selected_point:
-                min_dist = float('inf')
-                for name, point in self.control_points.items():
-                    dist = (Vec3(point.x, point.y, point.z) - mouse_pos).length()
-                    if dist < min_dist and dist < 0.2:  # Threshold for selection
-                        min_dist = dist
-                        self.selected_point = name
+            if self.selected_point is None:
+                if self.control_tree is None:
+                    self.control_tree = KDTree(self.control_points.data)
+                index, _ = self.control_tree.nearest(tuple(mouse_pos), max_distance=PICK_RADIUS)
+                if index >= 0:
+                    self.selected_point = index
             
             # Update selected point position
-            if self.selected_point:
-                point = self.control_points[self.selected_point]
+            if self.selected_point is not None:
                 orig = self.original_positions[self.selected_point]
                 
                 # Limit movement range
-                new_pos = mouse_pos
-                dist = (new_pos - Vec3(orig.x, orig.y, orig.z)).length()
-                if dist > 1.0:
-                    dir = (new_pos - Vec3(orig.x, orig.y, orig.z))
-                    dir = dir * (1.0 / dir.length())
-                    new_pos = Vec3(orig.x, orig.y, orig.z) + dir
+                offset = self.offset.set(mouse_pos.x, mouse_pos.y, mouse_pos.z)
+                offset -= orig
+                dist = offset.length()
+                if dist > MAX_OFFSET:
+                    offset *= MAX_OFFSET / dist
+                offset += orig
                 
-                self.control_points[self.selected_point] = new_pos
+                self.control_points[self.selected_point] = offset
+                self.deformer.move(self.selected_point, offset)
+                self.control_tree = None
+                return True
         else:
             self.selected_point = None
+        return False
 
 def main():
     pygame.init()
     display = (800, 600)
     pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
     
-    gluPerspective(45, (display[0]/display[1]), 0.1, 50.0)
-    glTranslatef(0.0, 0.0, -5)
+    camera = GLCamera(viewport=(0, 0, display[0], display[1]))
+    camera.set_perspective(45, 0.1, 50.0)
+    camera.translate(0.0, 0.0, -5)
+    camera.apply()
     
-    face = FaceController()
+    face = FaceController(camera)
     
+    # Redraw only when something changed; 'c' toggles continuous redrawing (e.g. for profiling)
+    continuous = False
+    dirty = True
     while True:
-        for event in pygame.event.get():
+        if dirty or continuous:
+            events = pygame.event.get()
+        else:
+            # Nothing to draw: sleep until the next event instead of polling
+            events = [pygame.event.wait()] + pygame.event.get()
+        
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
+            
+            # Handle mouse input
+            elif event.type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP) and event.button == 1:
+                dirty |= face.handle_mouse(event.pos[0], event.pos[1], event.type == MOUSEBUTTONDOWN)
+            elif event.type == MOUSEMOTION and event.buttons[0]:
+                dirty |= face.handle_mouse(event.pos[0], event.pos[1], True)
+            
+            # The window was uncovered, restored or resized
+            elif event.type in (VIDEOEXPOSE, VIDEORESIZE, WINDOWEXPOSED, WINDOWRESTORED):
+                dirty = True
+            elif event.type == KEYDOWN and event.key == K_c:
+                continuous = not continuous
         
-        # Handle mouse input
-        mouse_pos = pygame.mouse.get_pos()
-        button_down = pygame.mouse.get_pressed()[0]
-        face.handle_mouse(mouse_pos[0], mouse_pos[1], button_down)
-        
-        # Clear screen and draw
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        face.draw()
-        pygame.display.flip()
-        pygame.time.wait(10)
+        if dirty or continuous:
+            # Clear screen and draw
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            face.draw()
+            pygame.display.flip()
+            dirty = False
+        if continuous:
+            pygame.time.wait(10)
 
 if __name__ == "__main__":
     main()
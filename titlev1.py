@@ -1,9 +1,19 @@
 from ursina import *
+from engine_config import create_app
 from ursina.shaders import lit_with_shadows_shader
+from shader_cache import register_shader, precompile_shaders
+from gpu_picking import enable_gpu_picking
+from drag_manipulator import DragManipulator, PlaneConstraint, SphereConstraint
+from shadow_manager import ShadowManager
+from tweens import tween_engine
+from morph_targets import MorphTargets
+from render_on_demand import enable_render_on_demand
 import numpy as np
 from dataclasses import dataclass
 from typing import Dict, Optional, List
 
+lit_with_shadows_shader = register_shader(lit_with_shadows_shader)
+
 @dataclass
 class FaceConfig:
     HEAD_SCALE: float = 1.0
@@ -11,9 +21,35 @@ class FaceConfig:
     NOSE_HEIGHT: float = 0.3
     NOSE_RADIUS: float = 0.1
     MOUTH_SCALE: tuple = (0.3, 0.1, 0.05)
-    DRAG_PLANE_SCALE: float = 50.0
+    DRAG_CONSTRAINT: str = 'plane'      # 'plane': facing the camera, 'sphere': around the head
+    DRAG_SNAP: float = 0.05             # step while ctrl is held (world units; degrees on the sphere)
     MOUTH_ANIM_SPEED: float = 1.0
     MOUTH_ANIM_AMPLITUDE: float = 0.05
+    MOUTH_SEGMENTS: int = 8             # subdivisions along the mouth, so it can bend
+    MOUTH_SMILE: float = 0.0            # blend shape weights, 0..1
+    MOUTH_OPEN: float = 0.0
+    EXPRESSION_TIME: float = 0.2        # seconds set_expression() blends over
+
+def mouth_mesh(segments: int) -> Mesh:
+    """Unit box split into segments along x; flat-shaded, so each side has its own vertices."""
+    xs = np.linspace(-0.5, 0.5, segments + 1)
+    vertices, triangles, normals = [], [], []
+    # the four long sides: (normal, the two edge corners as (y, z)) in winding order
+    for normal, corners in (((0, 1, 0), ((0.5, 0.5), (0.5, -0.5))), ((0, -1, 0), ((-0.5, -0.5), (-0.5, 0.5))),
+                            ((0, 0, 1), ((-0.5, 0.5), (0.5, 0.5))), ((0, 0, -1), ((0.5, -0.5), (-0.5, -0.5)))):
+        start = len(vertices)
+        for x in xs:
+            vertices += [(x, *corners[0]), (x, *corners[1])]
+        for i in range(segments):
+            a = start + i * 2
+            triangles += [a, a + 2, a + 1, a + 1, a + 2, a + 3]
+        normals += [normal] * (len(vertices) - start)
+    for x, winding in ((-0.5, (0, 1, 2, 0, 2, 3)), (0.5, (0, 2, 1, 0, 3, 2))):
+        start = len(vertices)
+        vertices += [(x, -0.5, -0.5), (x, 0.5, -0.5), (x, 0.5, 0.5), (x, -0.5, 0.5)]
+        triangles += [start + i for i in winding]
+        normals += [(np.sign(x), 0, 0)] * 4
+    return Mesh(vertices=vertices, triangles=triangles, normals=normals)
 
 class FaceController:
     def __init__(self, config: FaceConfig):
@@ -45,7 +81,6 @@ class FaceController:
                 color=color.white,
                 scale=self.config.FEATURE_SCALE,
                 position=(-0.2, 0.2, 0.45),
-                collider='sphere',
                 **feature_props
             ),
             'right_eye': Entity(
@@ -53,7 +88,6 @@ class FaceController:
                 color=color.white,
                 scale=self.config.FEATURE_SCALE,
                 position=(0.2, 0.2, 0.45),
-                collider='sphere',
                 **feature_props
             ),
             'nose': Entity(
@@ -65,75 +99,94 @@ class FaceController:
                 color=color.rgb(255, 200, 200),
                 position=(0, 0.0, 0.5),
                 rotation=(90, 0, 0),
-                collider='mesh',
                 **feature_props
             ),
             'mouth': Entity(
-                model='cube',
+                model=mouth_mesh(self.config.MOUTH_SEGMENTS),
                 color=color.red,
                 scale=self.config.MOUTH_SCALE,
                 position=(0, -0.2, 0.45),
-                collider='box',
                 **feature_props
             )
         }
         
-        # Store initial positions for animation
-        self.initial_positions = {
-            name: Vec3(*feature.position) for name, feature in self.features.items()
-        }
+        # Mouth expressions are blend shapes: the vertex shader mixes them by weight,
+        # so animating the mouth is a uniform per frame and the entity itself stays put
+        lift = 1 / self.config.MOUTH_SCALE[1]       # one unit of weight moves the mouth one head unit
+        self.mouth_morph = MorphTargets(self.features['mouth'], {
+            'lift': lambda rest: np.broadcast_to((0, lift, 0), rest.shape),
+            'smile': lambda rest: 4 * rest[:, :1] ** 2 * (0, 1, 0),        # corners up
+            'open': lambda rest: rest * (0, 2, 0),
+        })
+        self.set_expression(smile=self.config.MOUTH_SMILE, open=self.config.MOUTH_OPEN, duration=0)
+        # Mouth bob: one looping sine tween on the lift weight, evaluated with every other tween in one batch
+        self.mouth_animation = tween_engine().oscillate(
+            self.mouth_morph, 'lift',
+            amplitude=self.config.MOUTH_ANIM_AMPLITUDE,
+            period=1 / self.config.MOUTH_ANIM_SPEED
+        )
+        
+    def set_expression(self, duration: Optional[float] = None, **weights: float):
+        """Blend the mouth towards blend shape weights (smile, open) over duration seconds."""
+        duration = self.config.EXPRESSION_TIME if duration is None else duration
+        for name, weight in weights.items():
+            if duration > 0:
+                tween_engine().tween(self.mouth_morph, name, weight, duration=duration, curve='out_expo')
+            else:
+                setattr(self.mouth_morph, name, weight)
         
     def setup_lighting(self):
         # Optimized lighting setup
         self.sunlight = DirectionalLight(shadows=True)
         self.sunlight.look_at(Vec3(1, -1, 1))
+        # shadow map fitted to the face (features included) and sized to its screen coverage
+        self.shadows = ShadowManager(self.sunlight, casters=[self.head])
         self.ambient = AmbientLight(color=color.dark_gray)
         
     def setup_drag_system(self):
-        self.dragging_feature = None
-        self.drag_plane = None
-        self.animation_time = 0
+        # the mouse ray is intersected with the drag shape directly: no drag plane entity or collider
+        self.drag = DragManipulator()
+        # features are picked from an ID render around the cursor, so they need no colliders
+        self.picker = enable_gpu_picking(tolerance=2)
+        for feature in self.features.values():
+            self.picker.register(feature)
+        self.selection: List[Entity] = []
         
     def handle_input(self, key):
         if key == 'left mouse down':
-            if mouse.hovered_entity in self.features.values():
-                self.start_drag(mouse.hovered_entity)
+            feature = self.picker.hovered_entity
+            if feature is not None:
+                if held_keys['shift']:
+                    # shift+click builds a group that is dragged together
+                    if feature not in self.selection:
+                        self.selection.append(feature)
+                else:
+                    if feature not in self.selection:
+                        self.selection = [feature]
+                    self.start_drag(feature)
+            elif not held_keys['shift']:
+                self.selection = []
         elif key == 'left mouse up':
             self.end_drag()
             
+    def drag_constraint(self, entity):
+        if self.config.DRAG_CONSTRAINT == 'sphere':
+            center = self.head.world_position
+            return SphereConstraint(center, distance(center, entity.world_position))
+        return PlaneConstraint(entity.world_position, camera.forward)
+            
     def start_drag(self, entity):
-        self.dragging_feature = entity
-        self.dragging_feature.collision = False
-        self.drag_plane = Entity(
-            model='quad',
-            collider='mesh',
-            position=entity.world_position,
-            rotation=camera.world_rotation,
-            scale=self.config.DRAG_PLANE_SCALE,
-            visible=False
-        )
+        # the mouth's bob is a blend shape, so it keeps playing while the mouth is dragged
+        self.drag.begin(self.selection, self.drag_constraint(entity))
         
     def end_drag(self):
-        if self.dragging_feature:
-            self.dragging_feature.collision = True
-            self.dragging_feature = None
-            destroy(self.drag_plane)
-            self.drag_plane = None
+        self.drag.end()
             
     def update(self, dt):
-        if self.dragging_feature and mouse.world_point is not None:
-            self.dragging_feature.world_position = mouse.world_point
-            
-        # Optimized mouth animation using numpy
-        if self.dragging_feature is not self.features['mouth']:
-            mouth = self.features['mouth']
-            base_pos = self.initial_positions['mouth']
-            self.animation_time += dt
-            mouth.y = base_pos.y + self.config.MOUTH_ANIM_AMPLITUDE * \
-                     np.sin(self.animation_time * 2 * np.pi * self.config.MOUTH_ANIM_SPEED)
+        self.drag.update(snap=self.config.DRAG_SNAP if held_keys['control'] else 0)
 
 def main():
-    app = Ursina()
+    app = create_app()
     window.title = "Ursina 3D Face Manipulator (M1 Optimized)"
     window.color = color.black
     
@@ -147,10 +200,12 @@ def main():
     def input_handler(key):
         controller.handle_input(key)
     
-    # Set up event handlers
-    app.update = update
-    app.input = input_handler
+    # Ursina only calls update/input on entities (and __main__), not on app
+    Entity(name='face_controller', update=update, input=input_handler)
     
+    # Only render while something moves (idle animations freeze after a while without input)
+    enable_render_on_demand()
+    precompile_shaders()
     app.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,370 @@
+# tweens.py - All running property animations evaluated in one NumPy pass per frame
+#
+# Entity.animate_*() builds a Sequence of Func/Wait steps (about 60 per second
+# of animation) and invoke() adds another Sequence, each ticked separately, so
+# a few hundred idle animations cost more than the game logic. TweenEngine
+# keeps every tween in preallocated arrays instead (target, start, end,
+# duration, delay, curve, loop count) and once per frame:
+#   * advances all of them, evaluates their curves per curve kind on whole
+#     arrays and combines them per target property: the newest absolute tween
+#     sets the value, additive tweens (e.g. idle oscillations) are summed on
+#     top of it,
+#   * writes back only the properties whose value changed, so paused tweens
+#     and finished layers cost nothing.
+# Tweens are referred to by integer handles; cancelling, pausing and looping
+# (including ping-pong) only flip entries in the arrays, and freed slots are
+# reused, so steady-state animation allocates nothing per tween. An absolute
+# tween that starts (after its delay) replaces the absolute tween already
+# running on that property, like animate() does; a delayed tween therefore
+# chains after an earlier one. A tween without a start value starts from the
+# property's value at that moment. While the engine is disabled, a new absolute
+# tween drops the queued ones on its property that would start before it, so
+# a timer that keeps calling tween() can't grow the arrays.
+#
+# Usage:
+#   from tweens import tween_engine
+#   tweens = tween_engine()
+#   tweens.tween(nose, 'scale', nose.scale * 1.5, duration=0.2)
+#   tweens.tween(nose, 'scale', nose.scale, duration=0.2, delay=0.3)    # back again
+#   idle = tweens.oscillate(head, 'rotation_y', amplitude=5, period=4)  # loops forever
+#   tweens.pause(idle); tweens.resume(idle); tweens.cancel(idle)
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from ursina import Entity, time
+
+
+def _in_expo(t):
+    return np.power(2.0, 10 * (t - 1))      # ursina.curve.in_expo, the animate() default
+
+
+def _out_expo(t):
+    return 1 - np.power(2.0, -10 * t)
+
+
+# vectorized curves over normalized time t in [0, 1]; 'sine' is one full wave for looping oscillations
+CURVES = {
+    'linear': lambda t: t,
+    'in_quad': lambda t: t * t,
+    'out_quad': lambda t: t * (2 - t),
+    'in_out_sine': lambda t: 0.5 - 0.5 * np.cos(np.pi * t),
+    'in_expo': _in_expo,
+    'out_expo': _out_expo,
+    'sine': lambda t: np.sin(2 * np.pi * t),
+}
+CURVE_NAMES = list(CURVES)
+
+# transform properties written straight to the NodePath, skipping Ursina's property setters
+# (rotation_y alone reads and rebuilds the whole rotation); Ursina's hpr order and signs
+DIRECT_WRITERS = {
+    'x': lambda node, v: node.set_x(v[0]),
+    'y': lambda node, v: node.set_y(v[0]),
+    'z': lambda node, v: node.set_z(v[0]),
+    'position': lambda node, v: node.set_pos(v[0], v[1], v[2]),
+    'rotation_x': lambda node, v: node.set_p(-v[0]),
+    'rotation_y': lambda node, v: node.set_h(-v[0]),
+    'rotation_z': lambda node, v: node.set_r(v[0]),
+    'rotation': lambda node, v: node.set_hpr(-v[1], -v[0], v[2]),
+    'scale': lambda node, v: node.set_scale(*(c if c != 0 else .001 for c in v[:3])),
+}
+
+INITIAL_CAPACITY = 64
+HANDLE_SHIFT = 32           # handle = generation << HANDLE_SHIFT | slot
+FOREVER = 0                 # loops=FOREVER repeats until cancelled
+
+
+class TweenEngine(Entity):
+    """Owns every tween; an Entity so it steps them once per frame."""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, **kwargs):
+        super().__init__(**kwargs)
+        self._count = 0                         # slots in use or freed below this
+        self._free: List[int] = []
+        self._next_order = 0
+        self._alloc_slots(capacity)
+
+        # animated properties: (entity, attribute) -> target index
+        self._targets: Dict[Tuple[Entity, str], int] = {}
+        self._target_keys: List[Optional[Tuple[Entity, str]]] = []
+        self._target_types: List[type] = []
+        self._target_sizes: List[int] = []
+        self._free_targets: List[int] = []
+        self._dirty = set()                     # targets to rewrite even without a running tween
+        self._alloc_targets(capacity)
+
+    def _alloc_slots(self, capacity: int):
+        old = self._count
+        def grow(name, shape, dtype, fill=0):
+            array = np.full(shape, fill, dtype)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        grow('_active', capacity, bool)
+        grow('_paused', capacity, bool)
+        grow('_started', capacity, bool)
+        grow('_capture', capacity, bool)        # take the start value when the tween begins
+        grow('_additive', capacity, bool)
+        grow('_ping_pong', capacity, bool)
+        grow('_target', capacity, np.int64)
+        grow('_curve', capacity, np.int64)
+        grow('_loops', capacity, np.int64)
+        grow('_order', capacity, np.int64)
+        grow('_generation', capacity, np.int64)
+        grow('_elapsed', capacity, np.float64)
+        grow('_delay', capacity, np.float64)
+        grow('_duration', capacity, np.float64, 1.0)
+        grow('_start', (capacity, 4), np.float64)
+        grow('_end', (capacity, 4), np.float64)
+        self._capacity = capacity
+
+    def _alloc_targets(self, capacity: int):
+        count = len(self._target_keys)
+        for name in ('_base', '_written'):
+            array = np.zeros((capacity, 4))
+            if count:
+                array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+        self._target_capacity = capacity
+
+    # === Properties ===
+
+    def _target_index(self, entity: Entity, attr: str) -> int:
+        key = (entity, attr)
+        index = self._targets.get(key)
+        if index is not None:
+            return index
+        value = getattr(entity, attr)
+        kind, size = (float, 1) if np.isscalar(value) else (type(value), len(value))
+        if self._free_targets:
+            index = self._free_targets.pop()
+            self._target_keys[index], self._target_types[index], self._target_sizes[index] = key, kind, size
+        else:
+            index = len(self._target_keys)
+            if index == self._target_capacity:
+                self._alloc_targets(self._target_capacity * 2)
+            self._target_keys.append(key)
+            self._target_types.append(kind)
+            self._target_sizes.append(size)
+        self._targets[key] = index
+        self._base[index] = self._written[index] = self._as_row(value)
+        return index
+
+    @staticmethod
+    def _as_row(value) -> np.ndarray:
+        row = np.zeros(4)
+        values = np.atleast_1d(np.asarray(tuple(value) if not np.isscalar(value) else value, dtype=np.float64))
+        row[:len(values)] = values
+        return row
+
+    def _write(self, index: int, row: np.ndarray) -> bool:
+        key = self._target_keys[index]
+        if key is None or not key[0]:       # released, or the entity was destroyed since
+            return False
+        entity, attr = key
+        values = row.tolist()
+        if attr in DIRECT_WRITERS:
+            DIRECT_WRITERS[attr](entity, values)
+        else:
+            setattr(entity, attr, self._target_types[index](*values[:self._target_sizes[index]]))
+        return True
+
+    def _release_target(self, index: int):
+        del self._targets[self._target_keys[index]]
+        self._target_keys[index] = None
+        self._dirty.discard(index)
+        self._free_targets.append(index)
+
+    # === Tweens ===
+
+    def tween(self, entity: Entity, attr: str, value, duration: float = 0.1, start=None, curve: str = 'in_expo',
+              delay: float = 0.0, loops: int = 1, ping_pong: bool = False, additive: bool = False) -> int:
+        """Animate entity.<attr> to value; returns a handle. loops=FOREVER (0) repeats until cancelled.
+
+        An additive tween animates an offset from start (default 0) to value on top of the property.
+        """
+        if curve not in CURVES:
+            raise ValueError(f'unknown curve {curve!r}, expected one of {", ".join(CURVE_NAMES)}')
+        target = self._target_index(entity, attr)
+        n = self._target_sizes[target]
+        if not self.enabled and not additive:
+            # disabled (frozen by render_on_demand.py): nothing advances, so an absolute tween queued to
+            # start no later than this one never gets to show; drop it instead of piling them up
+            count = self._count
+            self._release(np.flatnonzero(self._active[:count] & ~self._started[:count] & ~self._additive[:count]
+                                         & (self._target[:count] == target)
+                                         & (self._delay[:count] - self._elapsed[:count] <= delay)))
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._count == self._capacity:
+                self._alloc_slots(self._capacity * 2)
+            slot = self._count
+            self._count += 1
+
+        self._active[slot] = True
+        self._paused[slot] = self._started[slot] = False
+        self._additive[slot] = additive
+        self._ping_pong[slot] = ping_pong
+        self._capture[slot] = start is None and not additive
+        self._target[slot] = target
+        self._curve[slot] = CURVE_NAMES.index(curve)
+        self._loops[slot] = loops
+        self._order[slot] = self._next_order
+        self._next_order += 1
+        self._elapsed[slot] = 0.0
+        self._delay[slot] = delay
+        self._duration[slot] = max(duration, 1e-6)
+        self._start[slot] = 0.0
+        self._end[slot] = 0.0
+        self._end[slot, :n] = np.broadcast_to(self._as_row(value)[:n] if not np.isscalar(value) else value, n)
+        if start is not None:
+            self._start[slot, :n] = np.broadcast_to(self._as_row(start)[:n] if not np.isscalar(start) else start, n)
+        return int(self._generation[slot]) << HANDLE_SHIFT | slot
+
+    def oscillate(self, entity: Entity, attr: str, amplitude, period: float, delay: float = 0.0) -> int:
+        """Additive sine wave of the given amplitude around the property's value, until cancelled."""
+        return self.tween(entity, attr, amplitude, duration=period, curve='sine', delay=delay,
+                          loops=FOREVER, additive=True)
+
+    def _slot(self, handle: int) -> Optional[int]:
+        slot = handle & ((1 << HANDLE_SHIFT) - 1)
+        if slot < self._count and self._active[slot] and self._generation[slot] == handle >> HANDLE_SHIFT:
+            return slot
+        return None
+
+    def _release(self, slots):
+        slots = np.atleast_1d(slots)
+        # dropping an additive layer changes the property even if nothing else animates it
+        self._dirty.update(self._target[slots][self._additive[slots]].tolist())
+        self._active[slots] = False
+        self._generation[slots] += 1
+        self._free.extend(slots.tolist())
+
+    @property
+    def animating(self) -> bool:
+        """Whether any tween is running or waiting out its delay (paused ones don't count)."""
+        n = self._count
+        return bool(self.enabled and (self._active[:n] & ~self._paused[:n]).any())
+
+    def is_playing(self, handle: int) -> bool:
+        slot = self._slot(handle)
+        return slot is not None and not self._paused[slot]
+
+    def pause(self, handle: int):
+        slot = self._slot(handle)
+        if slot is not None:
+            self._paused[slot] = True
+
+    def resume(self, handle: int):
+        slot = self._slot(handle)
+        if slot is not None:
+            self._paused[slot] = False
+
+    def cancel(self, handle: int):
+        """Stop a tween where it is; an additive one stops contributing."""
+        slot = self._slot(handle)
+        if slot is not None:
+            self._release(slot)
+
+    def sync(self, entity: Entity, attr: str):
+        """Adopt a change made to an animated property from outside (e.g. a drag); additive layers stay on top."""
+        index = self._targets.get((entity, attr))
+        if index is None:
+            return
+        value = self._as_row(getattr(entity, attr))
+        self._base[index] += value - self._written[index]
+        self._written[index] = value
+
+    def cancel_all(self, entity: Entity, attr: Optional[str] = None):
+        """Stop every tween on entity (or only those on one of its properties)."""
+        for (target_entity, target_attr), target in list(self._targets.items()):
+            if target_entity is entity and attr in (None, target_attr):
+                self._release(np.flatnonzero(self._active[:self._count] & (self._target[:self._count] == target)))
+                self._release_target(target)
+
+    def _begin(self, slots: np.ndarray):
+        """Tweens whose delay just ran out: take their start values and replace older absolute tweens."""
+        n = self._count
+        for slot in slots:
+            target = self._target[slot]
+            if self._capture[slot]:
+                # from the base, not the property: that one includes the additive layers drawn on top
+                entity, attr = self._target_keys[target]
+                if entity:
+                    self.sync(entity, attr)
+                self._start[slot] = self._base[target]
+            if not self._additive[slot]:
+                older = (self._active[:n] & self._started[:n] & ~self._additive[:n]
+                         & (self._target[:n] == target) & (self._order[:n] < self._order[slot]))
+                self._release(np.flatnonzero(older))
+        self._started[slots] = True
+
+    def update(self):
+        n = self._count
+        if not self._active[:n].any() and not self._dirty:
+            return
+        active = self._active[:n]
+        np.add(self._elapsed[:n], time.dt, out=self._elapsed[:n], where=active & ~self._paused[:n])
+        local = (self._elapsed[:n] - self._delay[:n]) / self._duration[:n]
+
+        starting = active & ~self._started[:n] & (local >= 0)
+        if starting.any():
+            self._begin(np.flatnonzero(starting))
+        slots = np.flatnonzero(self._active[:n] & self._started[:n])
+
+        # normalized time within the current cycle; finished tweens are held at their last cycle's end
+        local = local[slots]
+        loops = self._loops[slots]
+        finished = (loops != FOREVER) & (local >= loops)
+        cycle = np.where(finished, loops - 1, np.floor(local))
+        t = np.where(finished, 1.0, local - cycle)
+        t = np.where(self._ping_pong[slots] & (cycle % 2 == 1), 1 - t, t)
+
+        f = np.empty_like(t)
+        curves = self._curve[slots]
+        for curve in np.unique(curves):
+            mask = curves == curve
+            f[mask] = CURVES[CURVE_NAMES[curve]](t[mask])
+        start = self._start[slots]
+        values = start + (self._end[slots] - start) * f[:, None]
+
+        # combine per property: absolute tweens move the base, additive ones are summed on top of it
+        targets = self._target[slots]
+        additive = self._additive[slots]
+        self._base[targets[~additive]] = values[~additive]
+        result = self._base[:len(self._target_keys)].copy()
+        np.add.at(result, targets[additive], values[additive])
+        # a finished additive tween leaves its last offset in the base
+        np.add.at(self._base, targets[additive & finished], values[additive & finished])
+        self._release(slots[finished])
+
+        touched = np.union1d(targets, np.fromiter(self._dirty, np.int64, len(self._dirty)))
+        self._dirty.clear()
+        changed = touched[np.abs(result[touched] - self._written[touched]).max(axis=1) > 0]
+        for target in changed:
+            if self._write(target, result[target]):
+                self._written[target] = result[target]
+            elif self._target_keys[target] is not None:
+                self.cancel_all(self._target_keys[target][0])
+
+    def on_destroy(self):
+        global _tween_engine
+        if _tween_engine is self:
+            _tween_engine = None
+
+
+_tween_engine: Optional[TweenEngine] = None
+
+
+def get_tween_engine() -> Optional[TweenEngine]:
+    return _tween_engine
+
+
+def tween_engine() -> TweenEngine:
+    """The shared tween engine, created on first use (after Ursina())."""
+    global _tween_engine
+    if _tween_engine is None:
+        _tween_engine = TweenEngine()
+    return _tween_engine
@@ -0,0 +1,209 @@
+# vecmath.py - Slotted Vec3 for single vectors, packed Vec3Array for many (no engine dependency)
+#
+# A @dataclass Vec3 carries a per-instance __dict__ and every operator builds
+# a new one, so tool and physics loops spend a visible part of their time
+# allocating vectors. Here:
+#   * Vec3 has __slots__ (no __dict__), the usual operators, and in-place
+#     variants (+=, -=, *=, set()) that reuse the object,
+#   * Vec3Array packs N vectors into one (N, 3) float32 NumPy buffer. Its
+#     in-place operators and normalize() write into that buffer, indexing a
+#     row gives a Vec3 copy and assigning one writes into the buffer, and
+#     np.asarray(array) is the buffer itself, so it can go straight to
+#     NumPy code or a vertex buffer.
+# Pure Python and NumPy, so pygame/OpenGL tools and headless simulation code
+# can both use it.
+#
+# Usage:
+#   from vecmath import Vec3, Vec3Array
+#   offset = Vec3(1, 2, 0) - origin
+#   offset *= 0.5                               # in place
+#   points = Vec3Array.zeros(1000)
+#   points += (0, 1, 0)                         # every row, in place
+#   points[3] = offset
+#   lengths = points.lengths()
+
+import math
+from typing import Iterable
+
+import numpy as np
+
+
+class Vec3:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def set(self, x: float, y: float, z: float) -> 'Vec3':
+        self.x, self.y, self.z = x, y, z
+        return self
+
+    def copy(self) -> 'Vec3':
+        return Vec3(self.x, self.y, self.z)
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y, self.z)[index]
+
+    def __repr__(self):
+        return f'Vec3({self.x}, {self.y}, {self.z})'
+
+    def __eq__(self, other):
+        return isinstance(other, Vec3) and self.x == other.x and self.y == other.y and self.z == other.z
+
+    __hash__ = None         # mutable
+
+    def __add__(self, other: 'Vec3') -> 'Vec3':
+        return Vec3(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other: 'Vec3') -> 'Vec3':
+        return Vec3(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, scalar: float) -> 'Vec3':
+        return Vec3(self.x * scalar, self.y * scalar, self.z * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar: float) -> 'Vec3':
+        return Vec3(self.x / scalar, self.y / scalar, self.z / scalar)
+
+    def __neg__(self) -> 'Vec3':
+        return Vec3(-self.x, -self.y, -self.z)
+
+    def __iadd__(self, other: 'Vec3') -> 'Vec3':
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def __isub__(self, other: 'Vec3') -> 'Vec3':
+        self.x -= other.x
+        self.y -= other.y
+        self.z -= other.z
+        return self
+
+    def __imul__(self, scalar: float) -> 'Vec3':
+        self.x *= scalar
+        self.y *= scalar
+        self.z *= scalar
+        return self
+
+    def dot(self, other: 'Vec3') -> float:
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other: 'Vec3') -> 'Vec3':
+        return Vec3(self.y * other.z - self.z * other.y,
+                    self.z * other.x - self.x * other.z,
+                    self.x * other.y - self.y * other.x)
+
+    def length(self) -> float:
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def normalized(self) -> 'Vec3':
+        length = self.length()
+        return self / length if length > 0 else Vec3()
+
+
+def _operand(value) -> np.ndarray:
+    """A Vec3Array, (N, 3) array, single Vec3 / 3-sequence (broadcast) or scalar as something NumPy can combine."""
+    if isinstance(value, Vec3Array):
+        return value.data
+    if isinstance(value, Vec3):
+        return np.array((value.x, value.y, value.z), np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class Vec3Array:
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1, 3)
+
+    @classmethod
+    def zeros(cls, count: int) -> 'Vec3Array':
+        return cls(np.zeros((count, 3), np.float32))
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable) -> 'Vec3Array':
+        return cls(np.array([tuple(v) for v in vectors], np.float32))
+
+    def copy(self) -> 'Vec3Array':
+        return Vec3Array(self.data.copy())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f'Vec3Array({len(self.data)})'
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            x, y, z = self.data[index].tolist()
+            return Vec3(x, y, z)
+        return Vec3Array(self.data[index])
+
+    def __setitem__(self, index, value):
+        self.data[index] = _operand(value)
+
+    def __iter__(self):
+        for x, y, z in self.data.tolist():
+            yield Vec3(x, y, z)
+
+    # new arrays
+    def __add__(self, other) -> 'Vec3Array':
+        return Vec3Array(self.data + _operand(other))
+
+    def __sub__(self, other) -> 'Vec3Array':
+        return Vec3Array(self.data - _operand(other))
+
+    def _factor(self, other) -> np.ndarray:
+        # only an (N,) ndarray scales row by row; a Vec3 or 3-sequence scales component-wise
+        if isinstance(other, np.ndarray) and other.shape == (len(self.data),):
+            return other.astype(np.float32, copy=False)[:, None]
+        return _operand(other)
+
+    def __mul__(self, other) -> 'Vec3Array':
+        """By a scalar, component-wise by a Vec3 / 3-sequence, or row by row by an (N,) ndarray."""
+        return Vec3Array(self.data * self._factor(other))
+
+    __rmul__ = __mul__
+
+    # in place, into the same buffer
+    def __iadd__(self, other) -> 'Vec3Array':
+        np.add(self.data, _operand(other), out=self.data)
+        return self
+
+    def __isub__(self, other) -> 'Vec3Array':
+        np.subtract(self.data, _operand(other), out=self.data)
+        return self
+
+    def __imul__(self, other) -> 'Vec3Array':
+        np.multiply(self.data, self._factor(other), out=self.data)
+        return self
+
+    def dot(self, other) -> np.ndarray:
+        return (self.data * _operand(other)).sum(axis=1)
+
+    def cross(self, other) -> 'Vec3Array':
+        return Vec3Array(np.cross(self.data, _operand(other)))
+
+    def lengths(self, out: np.ndarray = None) -> np.ndarray:
+        return np.sqrt(np.einsum('ij,ij->i', self.data, self.data), out=out)
+
+    def normalize(self) -> 'Vec3Array':
+        """In place; zero-length rows stay zero."""
+        lengths = self.lengths()
+        np.divide(self.data, lengths[:, None], out=self.data, where=lengths[:, None] > 0)
+        return self